@@ -0,0 +1,81 @@
+"""
+North Medical Portal bench komutları
+"""
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-dealer-access-index")
+@pass_context
+def rebuild_dealer_access_index(context):
+	"""Dealer Warehouse Access indeksini tamamen yeniden oluştur"""
+	import frappe
+
+	from north_medical_portal.utils.access_index import rebuild_access_index
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		row_count = rebuild_access_index()
+		frappe.db.commit()
+		click.echo(f"Dealer Warehouse Access: {row_count} satır oluşturuldu")
+	finally:
+		frappe.destroy()
+
+
+@click.command("rebuild-item-search-index")
+@pass_context
+def rebuild_item_search_index(context):
+	"""Portal ürün arama indeksini tamamen yeniden oluştur"""
+	import frappe
+
+	from north_medical_portal.utils.item_search import rebuild_item_search_index
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		item_count = rebuild_item_search_index()
+		if item_count is None:
+			click.echo("Ürün arama indeksi: başka bir yeniden oluşturma sürüyor")
+		else:
+			click.echo(f"Ürün arama indeksi: {item_count} ürün indekslendi")
+	finally:
+		frappe.destroy()
+
+
+@click.command("benchmark-reorder")
+@click.option("--companies", default=150, type=int, help="Sentetik bayi şirketi sayısı")
+@click.option("--warehouses", default=2, type=int, help="Şirket başına depo sayısı")
+@click.option("--items", default=500, type=int, help="Ürün sayısı")
+@click.option("--low-ratio", default=0.2, type=float, help="Reorder level altında olacak satır oranı")
+@click.option("--seed", default=0, type=int, help="Rastgele tohum")
+@click.option("--keep", is_flag=True, default=False, help="Sentetik veriyi silme")
+@pass_context
+def benchmark_reorder(context, companies, warehouses, items, low_ratio, seed, keep):
+	"""Sentetik bayilerle reorder motorunu dry-run çalıştır ve ölç (sadece test siteleri)"""
+	import json
+
+	import frappe
+
+	from north_medical_portal.utils.reorder_benchmark import run_reorder_benchmark
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		report = run_reorder_benchmark(
+			companies=companies,
+			warehouses=warehouses,
+			items=items,
+			low_ratio=low_ratio,
+			seed=seed,
+			keep=keep
+		)
+		click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+	finally:
+		frappe.destroy()
+
+
+commands = [rebuild_dealer_access_index, rebuild_item_search_index, benchmark_reorder]
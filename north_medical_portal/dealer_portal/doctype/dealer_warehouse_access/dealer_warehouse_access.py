@@ -0,0 +1,19 @@
+"""
+Dealer Warehouse Access controller.
+"""
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class DealerWarehouseAccess(Document):
+	"""Kullanıcı başına yetkili depo satırı - utils.access_index tarafından yönetilir."""
+
+	pass
+
+
+def on_doctype_update():
+	"""Aynı kullanıcı/depo çifti için tek satır olmasını garanti et."""
+	frappe.db.add_unique("Dealer Warehouse Access", ["user", "warehouse"], constraint_name="unique_user_warehouse")
+	frappe.db.add_index("Dealer Warehouse Access", ["company", "user"])
@@ -0,0 +1,18 @@
+"""
+Reorder Level Proposal controller.
+"""
+from __future__ import annotations
+
+import frappe
+from frappe.model.document import Document
+
+
+class ReorderLevelProposal(Document):
+	"""Ürün/depo başına tüketim tahmini önerisi - utils.reorder_forecast tarafından yönetilir."""
+
+	pass
+
+
+def on_doctype_update():
+	"""Aynı ürün/depo çifti için tek öneri olmasını garanti et."""
+	frappe.db.add_unique("Reorder Level Proposal", ["item_code", "warehouse"], constraint_name="unique_item_warehouse")
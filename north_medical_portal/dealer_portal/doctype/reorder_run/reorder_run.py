@@ -0,0 +1,12 @@
+"""
+Reorder Run controller.
+"""
+from __future__ import annotations
+
+from frappe.model.document import Document
+
+
+class ReorderRun(Document):
+	"""Günlük reorder çalışmasının özeti - utils.reorder_scheduler tarafından yönetilir."""
+
+	pass
@@ -0,0 +1,12 @@
+"""
+Reorder Run Company controller.
+"""
+from __future__ import annotations
+
+from frappe.model.document import Document
+
+
+class ReorderRunCompany(Document):
+	"""Reorder çalışmasında tek şirketin sonucu."""
+
+	pass
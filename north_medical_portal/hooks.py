@@ -34,13 +34,107 @@ doc_events = {
 	},
 	"Sales Order": {
 		"on_submit": "north_medical_portal.utils.sales_order.update_material_request_from_sales_order"
+	},
+	# Bayi bağlamı cache'ini (helpers.get_dealer_context) geçersiz kıl ve erişim indeksini güncelle
+	"User": {
+		"on_update": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		],
+		"on_trash": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		]
+	},
+	"Portal User": {
+		"on_update": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		],
+		"on_trash": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		]
+	},
+	"Contact": {
+		"on_update": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		],
+		"on_trash": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		]
+	},
+	"Customer": {
+		"on_update": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		],
+		"on_trash": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		]
+	},
+	"Warehouse": {
+		"on_update": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		],
+		"on_trash": [
+			"north_medical_portal.utils.helpers.invalidate_dealer_context",
+			"north_medical_portal.utils.access_index.update_access_index"
+		]
+	},
+	# Stok snapshot cache'i (utils.stock_cache) - etkilenen deponun versiyonunu artır
+	# ERPNext stok hareketlerinde Bin miktarlarını db.set_value ile yazar ve doc event tetiklenmez;
+	# hareketler versiyonu Stock Ledger Entry on_submit ile artırır. Bin hook'u sadece Bin
+	# dokümanı kaydedildiğinde (ör. yeni Bin eklenince) çalışır.
+	"Bin": {
+		"on_update": [
+			"north_medical_portal.utils.stock_cache.invalidate_stock_snapshot",
+			# Olay tabanlı reorder kontrolü (utils.reorder_events)
+			"north_medical_portal.utils.reorder_events.queue_reorder_check"
+		]
+	},
+	"Stock Ledger Entry": {
+		"on_submit": [
+			"north_medical_portal.utils.stock_cache.invalidate_stock_snapshot",
+			# Açık stok sayfalarına depo başına tek realtime olay (utils.stock_realtime)
+			"north_medical_portal.utils.stock_realtime.queue_stock_update",
+			"north_medical_portal.utils.reorder_events.queue_reorder_check"
+		]
+	},
+	"Item": {
+		"on_update": [
+			"north_medical_portal.utils.stock_cache.invalidate_stock_snapshot",
+			# Portal ürün arama indeksi (utils.item_search)
+			"north_medical_portal.utils.item_search.update_item_search_index"
+		],
+		"after_insert": "north_medical_portal.utils.item_search.update_item_search_index",
+		"on_trash": "north_medical_portal.utils.item_search.update_item_search_index"
+	},
+	# Grup stok hesabı → yaprak hesap cache'i (utils.stock_entry.get_leaf_account)
+	"Account": {
+		"after_insert": "north_medical_portal.utils.stock_entry.clear_leaf_account_cache",
+		"on_update": "north_medical_portal.utils.stock_entry.clear_leaf_account_cache",
+		"on_trash": "north_medical_portal.utils.stock_entry.clear_leaf_account_cache"
+	},
+	"Company": {
+		"after_insert": "north_medical_portal.utils.helpers.invalidate_dealer_context",
+		"on_trash": "north_medical_portal.utils.helpers.invalidate_dealer_context"
 	}
 }
 
 # Scheduled Tasks
 scheduler_events = {
 	"daily": [
-		"north_medical_portal.utils.stock.check_reorder_levels"
+		# Olay tabanlı kontrolün kaçırdıklarını tamamlayan mutabakat taraması - şirket başına paralel işler
+		"north_medical_portal.utils.reorder_scheduler.enqueue_reorder_run"
+	],
+	"daily_long": [
+		# Tüketim tahminine dayalı reorder seviyeleri (Dealer Settings > Tahmin Modu)
+		"north_medical_portal.utils.reorder_forecast.run_reorder_forecast"
 	],
 }
 
@@ -77,6 +171,14 @@ has_website_permission = {
 	"Stock Entry": "north_medical_portal.utils.portal_permissions.has_website_permission_for_stock_entry"
 }
 
+# Permission Query Conditions - şirket kısıtı liste sorgularında SQL seviyesinde uygulanır
+permission_query_conditions = {
+	"Material Request": "north_medical_portal.utils.portal_permissions.get_permission_query_conditions_for_material_request",
+	"Stock Entry": "north_medical_portal.utils.portal_permissions.get_permission_query_conditions_for_stock_entry",
+	"Purchase Order": "north_medical_portal.utils.portal_permissions.get_permission_query_conditions_for_purchase_order",
+	"Purchase Invoice": "north_medical_portal.utils.portal_permissions.get_permission_query_conditions_for_purchase_invoice"
+}
+
 # Portal Menu Items (via hooks - sidebar'a eklenir)
 # Not: Portal Settings'e otomatik eklenmez, setup script ile eklenir
 portal_menu_items = [
@@ -0,0 +1,8 @@
+"""
+Dealer Warehouse Access indeksini ilk kez oluştur
+"""
+from north_medical_portal.utils.access_index import rebuild_access_index
+
+
+def execute():
+	rebuild_access_index()
@@ -0,0 +1,40 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from north_medical_portal.utils.reorder_benchmark import SYNTHETIC_PREFIX, run_reorder_benchmark
+
+
+class TestReorderBenchmark(FrappeTestCase):
+	def test_all_rows_below_reorder_level(self):
+		"""Her (ürün, depo) düşük stokta - depo başına bir Material Request, her satır talep edilir"""
+		result = run_reorder_benchmark(companies=3, warehouses=2, items=5, low_ratio=1)
+
+		self.assertEqual(result["dataset"]["reorder_rows"], 30)
+		self.assertEqual(result["expected_low_stock"], 30)
+		self.assertEqual(result["items_found"], 30)
+		self.assertEqual(result["material_requests_created"], 6)
+		self.assertEqual(result["material_requests_updated"], 0)
+		self.assertEqual(result["items_requested"], 30)
+
+	def test_partial_low_stock(self):
+		"""Sadece düşük stoklu satırlar talep edilir; düşük stoklu her depo için bir Material Request"""
+		result = run_reorder_benchmark(companies=4, warehouses=2, items=20, low_ratio=0.2, seed=7)
+
+		self.assertGreater(result["expected_low_stock"], 0)
+		self.assertEqual(result["items_found"], result["expected_low_stock"])
+		self.assertEqual(result["items_requested"], result["expected_low_stock"])
+		self.assertEqual(result["material_requests_created"], result["expected_material_requests"])
+		self.assertEqual(result["material_requests_updated"], 0)
+
+	def test_no_low_stock(self):
+		result = run_reorder_benchmark(companies=2, warehouses=1, items=5, low_ratio=0)
+
+		self.assertEqual(result["items_found"], 0)
+		self.assertEqual(result["material_requests_created"], 0)
+		self.assertEqual(result["items_requested"], 0)
+
+	def test_synthetic_data_is_removed(self):
+		run_reorder_benchmark(companies=1, warehouses=1, items=3, low_ratio=1)
+
+		self.assertFalse(frappe.db.exists("Company", {"name": ["like", f"{SYNTHETIC_PREFIX}%"]}))
+		self.assertFalse(frappe.db.exists("Bin", {"item_code": ["like", f"{SYNTHETIC_PREFIX}%"]}))
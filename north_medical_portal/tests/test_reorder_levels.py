@@ -0,0 +1,58 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from north_medical_portal.utils.reorder_levels import validate_reorder_rows
+
+TEST_ITEM = "_Test NMP Reorder Item"
+TEST_WAREHOUSE = "_Test NMP Reorder Warehouse"
+
+
+class TestValidateReorderRows(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		if not frappe.db.exists("Item", TEST_ITEM):
+			frappe.get_doc({
+				"doctype": "Item",
+				"item_code": TEST_ITEM,
+				"item_name": TEST_ITEM,
+				"item_group": "All Item Groups",
+				"stock_uom": "Nos",
+				"is_stock_item": 1
+			}).insert(ignore_permissions=True)
+
+	def validate(self, **values):
+		return validate_reorder_rows(
+			[{"item_code": TEST_ITEM, "warehouse": TEST_WAREHOUSE, **values}],
+			{TEST_WAREHOUSE}
+		)
+
+	def test_numeric_values(self):
+		valid_rows, errors = self.validate(reorder_level="10", reorder_qty=25)
+
+		self.assertEqual(errors, [])
+		self.assertEqual(valid_rows[0].reorder_level, 10)
+		self.assertEqual(valid_rows[0].reorder_qty, 25)
+
+	def test_empty_values_keep_current(self):
+		valid_rows, errors = self.validate(reorder_level="", reorder_qty=None)
+
+		self.assertEqual(errors, [])
+		self.assertIsNone(valid_rows[0].reorder_level)
+		self.assertIsNone(valid_rows[0].reorder_qty)
+
+	def test_non_numeric_value_is_rejected(self):
+		"""Sayı olmayan hücre 0 yazılıp mevcut seviyeyi silmek yerine satır hatası olmalı"""
+		for values in ({"reorder_level": "abc"}, {"reorder_level": "10", "reorder_qty": "1O"}, {"reorder_qty": "nan"}):
+			with self.subTest(values=values):
+				valid_rows, errors = self.validate(**values)
+
+				self.assertEqual(valid_rows, [])
+				self.assertEqual(len(errors), 1)
+				self.assertEqual(errors[0]["row"], 0)
+
+	def test_negative_value_is_rejected(self):
+		valid_rows, errors = self.validate(reorder_level="-5", reorder_qty="10")
+
+		self.assertEqual(valid_rows, [])
+		self.assertEqual(len(errors), 1)
@@ -0,0 +1,182 @@
+"""
+Bayi erişim indeksi - Kullanıcı → şirket → müşteri → depo eşlemesini
+`Dealer Warehouse Access` tablosunda materyalize eder
+
+Bayi bağlamındaki depolar (get_user_warehouses) ve liste sorgularındaki şirket koşulu
+(utils.portal_permissions) her çağrıda User / Has Role / Portal User / Contact / Warehouse
+zincirini çözümlemek yerine bu tablodan okunur.
+Tablo doc_events ile artımlı, `bench rebuild-dealer-access-index` ile tamamen yenilenir.
+"""
+import frappe
+from frappe.utils import now
+
+from north_medical_portal.utils.helpers import build_dealer_context
+
+ACCESS_INDEX_DOCTYPE = "Dealer Warehouse Access"
+
+
+def get_indexed_warehouses(user=None, company=None):
+	"""
+	Kullanıcının indeksteki depolarını döndür
+
+	Args:
+		user (str, optional): Kullanıcı, varsayılan oturum kullanıcısı
+		company (str, optional): Sadece bu şirketin depoları
+
+	Returns:
+		list: [{"name", "warehouse_name"}, ...] - get_user_warehouses ile aynı biçimde
+	"""
+	conditions = ["a.user = %(user)s"]
+	if company:
+		conditions.append("a.company = %(company)s")
+
+	return frappe.db.sql(f"""
+		SELECT w.name, w.warehouse_name
+		FROM `tab{ACCESS_INDEX_DOCTYPE}` a
+		INNER JOIN `tabWarehouse` w ON w.name = a.warehouse
+		WHERE {" AND ".join(conditions)}
+		ORDER BY w.warehouse_name ASC
+	""", {"user": user or frappe.session.user, "company": company}, as_dict=True)
+
+
+def get_indexed_company_condition(doctype, user):
+	"""
+	Belgenin şirketini kullanıcının indeksteki şirketleriyle sınırlayan SQL koşulu
+
+	Kullanıcının indekste satırı yoksa None döner.
+	"""
+	if not frappe.db.exists(ACCESS_INDEX_DOCTYPE, {"user": user}):
+		return None
+
+	return f"""`tab{doctype}`.`company` IN (
+		SELECT `company` FROM `tab{ACCESS_INDEX_DOCTYPE}` WHERE `user` = {frappe.db.escape(user)}
+	)"""
+
+
+def rebuild_user_access(user):
+	"""
+	Tek kullanıcının indeks satırlarını yeniden oluştur
+
+	Admin kullanıcılar indekslenmez; izin kontrollerinde zaten bypass edilirler.
+	"""
+	frappe.db.delete(ACCESS_INDEX_DOCTYPE, {"user": user})
+
+	if not user or user in ("Guest", "Administrator"):
+		return 0
+
+	if not frappe.db.get_value("User", user, "enabled"):
+		return 0
+
+	# İndeksin kendisi kaynak kayıtlardan çözümlenir, indeksten okunmaz
+	context = build_dealer_context(user, use_access_index=False)
+	if context.is_admin or not context.company or not context.customer:
+		return 0
+
+	return _insert_rows(user, context.company, context.customer, [w.name for w in context.warehouses])
+
+
+def rebuild_access_index():
+	"""
+	İndeksi tamamen yeniden oluştur
+
+	Customer'a bağlı (Portal User veya Contact üzerinden) tüm kullanıcılar için çalışır.
+
+	Returns:
+		int: Oluşturulan satır sayısı
+	"""
+	frappe.db.delete(ACCESS_INDEX_DOCTYPE)
+
+	users = set(frappe.get_all("Portal User", filters={"parenttype": "Customer"}, pluck="user"))
+	users.update(frappe.db.sql_list("""
+		SELECT DISTINCT c.user
+		FROM `tabContact` c
+		INNER JOIN `tabDynamic Link` dl ON dl.parent = c.name AND dl.parenttype = 'Contact'
+		WHERE dl.link_doctype = 'Customer'
+			AND IFNULL(c.user, '') != ''
+	"""))
+
+	row_count = 0
+	for user in sorted(u for u in users if u):
+		row_count += rebuild_user_access(user)
+
+	return row_count
+
+
+def get_customer_users(customer):
+	"""Customer'a Portal User tablosu veya Contact linki ile bağlı kullanıcılar"""
+	if not customer:
+		return set()
+
+	users = set(frappe.get_all(
+		"Portal User",
+		filters={"parenttype": "Customer", "parent": customer},
+		pluck="user"
+	))
+	users.update(frappe.db.sql_list("""
+		SELECT DISTINCT c.user
+		FROM `tabContact` c
+		INNER JOIN `tabDynamic Link` dl ON dl.parent = c.name AND dl.parenttype = 'Contact'
+		WHERE dl.link_doctype = 'Customer'
+			AND dl.link_name = %(customer)s
+			AND IFNULL(c.user, '') != ''
+	""", {"customer": customer}))
+
+	# Daha önce bu müşteriyle indekslenmiş kullanıcılar (bağlantısı kaldırılmış olabilir)
+	users.update(frappe.get_all(ACCESS_INDEX_DOCTYPE, filters={"customer": customer}, pluck="user", distinct=True))
+
+	return {u for u in users if u}
+
+
+def update_access_index(doc, method=None):
+	"""
+	doc_events hook'u - erişim zincirini etkileyen kayıt değiştiğinde ilgili satırları yenile
+
+	Has Role ve Contact'ın Dynamic Link satırları parent (User / Contact) kaydedildiğinde işlenir.
+	"""
+	if frappe.flags.in_install or frappe.flags.in_migrate:
+		return
+
+	if method == "on_trash":
+		if doc.doctype == "User":
+			frappe.db.delete(ACCESS_INDEX_DOCTYPE, {"user": doc.name})
+			return
+		if doc.doctype == "Warehouse":
+			frappe.db.delete(ACCESS_INDEX_DOCTYPE, {"warehouse": doc.name})
+			return
+
+	users = set()
+
+	if doc.doctype == "User":
+		users.add(doc.name)
+	elif doc.doctype == "Contact":
+		users.add(doc.get("user"))
+		if doc.get_doc_before_save():
+			users.add(doc.get_doc_before_save().get("user"))
+	elif doc.doctype == "Portal User":
+		users.add(doc.get("user"))
+	elif doc.doctype == "Customer":
+		users.update(get_customer_users(doc.name))
+	elif doc.doctype == "Warehouse":
+		# Deponun eski ve yeni müşterisine bağlı kullanıcılar etkilenir
+		users.update(frappe.get_all(ACCESS_INDEX_DOCTYPE, filters={"warehouse": doc.name}, pluck="user"))
+		users.update(get_customer_users(doc.get("bayi_customer")))
+		frappe.db.delete(ACCESS_INDEX_DOCTYPE, {"warehouse": doc.name})
+
+	for user in users:
+		if user:
+			rebuild_user_access(user)
+
+
+def _insert_rows(user, company, customer, warehouse_names):
+	if not warehouse_names:
+		return 0
+
+	timestamp = now()
+	fields = ["name", "user", "company", "customer", "warehouse", "owner", "modified_by", "creation", "modified"]
+	values = [
+		(frappe.generate_hash(length=10), user, company, customer, warehouse, "Administrator", "Administrator", timestamp, timestamp)
+		for warehouse in warehouse_names
+	]
+	frappe.db.bulk_insert(ACCESS_INDEX_DOCTYPE, fields=fields, values=values, ignore_duplicates=True)
+
+	return len(values)
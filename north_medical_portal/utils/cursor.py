@@ -0,0 +1,50 @@
+"""
+Keyset sayfalama cursor'ları - sıralama anahtarı değerlerinin URL güvenli base64 JSON listesi
+
+Liste API'leri (stok durumu, stok hareketleri, malzeme talepleri, stok değişiklikleri)
+sayfanın son satırının anahtarını bu biçimde döndürür ve bir sonraki çağrıda geri alır.
+"""
+import base64
+import json
+
+import frappe
+from frappe import _
+
+
+def encode_cursor(values):
+	"""
+	Sıralama anahtarı değerlerinden cursor üret
+
+	Args:
+		values (list): JSON'a yazılabilir değerler (tarihler çağıran tarafından string'e çevrilir)
+
+	Returns:
+		str: Cursor
+	"""
+	return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def decode_cursor(cursor, lengths, message=None):
+	"""
+	Cursor'u değer listesine çevir; bozuk veya beklenmeyen uzunlukta cursor'da hata ver
+
+	Args:
+		cursor (str): encode_cursor çıktısı
+		lengths (int | tuple): Beklenen eleman sayısı veya sayıları
+		message (str, optional): Hata mesajı, varsayılan "Geçersiz cursor"
+
+	Returns:
+		list: Değerler
+	"""
+	if isinstance(lengths, int):
+		lengths = (lengths,)
+
+	try:
+		values = json.loads(base64.urlsafe_b64decode(str(cursor).encode()).decode())
+	except Exception:
+		values = None
+
+	if not isinstance(values, list) or len(values) not in lengths:
+		frappe.throw(message or _("Geçersiz cursor"))
+
+	return values
@@ -0,0 +1,154 @@
+"""
+Portal CSV/XLSX yüklemelerini satır satır okuma yardımcıları
+
+Dosya belleğe tamamen okunmadan satır satır işlenir; büyük yüklemelerde bellek kullanımı
+satır sayısından bağımsızdır.
+"""
+import codecs
+import csv
+import hashlib
+import os
+
+import frappe
+from frappe import _
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx")
+
+
+def get_uploaded_file(file_url=None):
+	"""
+	Yüklenen dosyayı (dosya nesnesi, dosya adı) olarak döndür
+
+	Öncelik request'teki "file" alanıdır; yoksa file_url ile mevcut bir File kaydı kullanılır.
+
+	Args:
+		file_url (str, optional): File dokümanının file_url değeri
+
+	Returns:
+		tuple: (binary dosya nesnesi, dosya adı)
+	"""
+	uploaded = _get_request_file()
+	if uploaded:
+		return uploaded.stream, uploaded.filename
+
+	if file_url:
+		file_doc = frappe.get_doc("File", {"file_url": file_url})
+		if file_doc.owner != frappe.session.user and frappe.session.user != "Administrator":
+			frappe.throw(_("Bu dosyaya erişim yetkiniz yok"), frappe.PermissionError)
+		return open(file_doc.get_full_path(), "rb"), file_doc.file_name
+
+	frappe.throw(_("Yüklenecek dosya bulunamadı"))
+
+
+def get_uploaded_file_digest(file_url=None, **kwargs):
+	"""
+	Yüklenen dosyanın içeriğinin SHA-256 özeti - idempotency parmak izine eklenir
+
+	Dosya parça parça okunur; request'teki dosyanın akışı başa sarılır ki aynı istekte
+	get_uploaded_file ile tekrar okunabilsin.
+
+	Args:
+		file_url (str, optional): File dokümanının file_url değeri (bkz. get_uploaded_file)
+
+	Returns:
+		str: Özet
+	"""
+	uploaded = _get_request_file()
+	file_obj = uploaded.stream if uploaded else get_uploaded_file(file_url)[0]
+	digest = hashlib.sha256()
+
+	try:
+		for block in iter(lambda: file_obj.read(1024 * 1024), b""):
+			digest.update(block)
+	finally:
+		if uploaded:
+			file_obj.seek(0)
+		else:
+			file_obj.close()
+
+	return digest.hexdigest()
+
+
+def iter_file_rows(file_obj, file_name):
+	"""
+	CSV veya XLSX dosyasını satır satır oku
+
+	İlk satır başlık kabul edilir; başlıklar küçük harfe çevrilip boşluklar alt çizgi yapılır.
+
+	Args:
+		file_obj: Binary dosya nesnesi
+		file_name (str): Uzantıyı belirlemek için dosya adı
+
+	Yields:
+		tuple: (satır numarası, {başlık: değer})
+	"""
+	extension = os.path.splitext(file_name or "")[1].lower()
+	if extension not in SUPPORTED_EXTENSIONS:
+		frappe.throw(_("Desteklenmeyen dosya türü: {0}. CSV veya XLSX yükleyin").format(extension or file_name))
+
+	rows = _iter_xlsx(file_obj) if extension == ".xlsx" else _iter_csv(file_obj)
+
+	header = None
+	for line_no, values in enumerate(rows, start=1):
+		if header is None:
+			header = [_normalize_header(value) for value in values]
+			continue
+
+		if not any(value not in (None, "") for value in values):
+			continue
+
+		yield line_no, {
+			column: _clean(value)
+			for column, value in zip(header, values, strict=False)
+			if column
+		}
+
+
+def chunked(iterable, size):
+	"""Iterable'ı en fazla size elemanlık listeler halinde döndür"""
+	chunk = []
+	for value in iterable:
+		chunk.append(value)
+		if len(chunk) >= size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def _get_request_file():
+	"""Request'teki "file" alanı (werkzeug FileStorage) veya None"""
+	request_files = getattr(frappe.request, "files", None) if getattr(frappe.local, "request", None) else None
+	return request_files.get("file") if request_files else None
+
+
+def _iter_csv(file_obj):
+	sample = file_obj.read(4096).decode("utf-8-sig", errors="ignore")
+	file_obj.seek(0)
+	try:
+		dialect = csv.Sniffer().sniff(sample, delimiters=",;\t") if sample else csv.excel
+	except csv.Error:
+		dialect = csv.excel
+
+	yield from csv.reader(codecs.iterdecode(file_obj, "utf-8-sig"), dialect)
+
+
+def _iter_xlsx(file_obj):
+	from openpyxl import load_workbook
+
+	workbook = load_workbook(file_obj, read_only=True, data_only=True)
+	try:
+		yield from workbook.active.iter_rows(values_only=True)
+	finally:
+		workbook.close()
+
+
+def _normalize_header(value):
+	return "_".join(str(value or "").strip().lower().split())
+
+
+def _clean(value):
+	if isinstance(value, str):
+		value = value.strip()
+		return value or None
+	return value
@@ -5,6 +5,9 @@ import frappe
 from frappe import _
 
 
+DEALER_CONTEXT_CACHE_KEY = "north_medical_portal:dealer_context"
+
+
 def is_admin_user():
 	"""
 	Kullanıcının admin olup olmadığını kontrol et
@@ -12,12 +15,7 @@ def is_admin_user():
 	Returns:
 		bool: Admin kullanıcı ise True
 	"""
-	user = frappe.session.user
-	if user == "Guest":
-		return False
-	
-	user_roles = frappe.get_roles(user)
-	return user == "Administrator" or "System Manager" in user_roles or "Administrator" in user_roles
+	return get_dealer_context().is_admin
 
 
 def get_user_company():
@@ -32,42 +30,7 @@ def get_user_company():
 	Returns:
 		str: Şirket adı veya None
 	"""
-	user = frappe.session.user
-	
-	if user == "Guest":
-		return None
-	
-	# 1. User'ın company field'ını kontrol et
-	user_doc = frappe.get_doc("User", user)
-	if hasattr(user_doc, "company") and user_doc.company:
-		# Company'nin North Medical olmadığından emin ol
-		if user_doc.company != "North Medical":
-			return user_doc.company
-	
-	# 2. User'ın role'lerine göre şirket bul
-	user_roles = frappe.get_roles(user)
-	
-	# Role'lerde şirket adı geçiyorsa (örn: "Dealer Manager - Bayi 1")
-	for role in user_roles:
-		if " - " in role:
-			company_name = role.split(" - ")[-1]
-			company_exists = frappe.db.exists("Company", company_name)
-			if company_exists and company_name != "North Medical":
-				return company_name
-	
-	# 3. User'ın bağlı olduğu Company'yi bul
-	companies = frappe.get_all(
-		"Company",
-		filters={"name": ["!=", "North Medical"]},
-		fields=["name", "company_name"],
-		order_by="creation asc"
-	)
-	
-	if companies:
-		# İlk bayi şirketini döndür (şimdilik)
-		return companies[0].name
-	
-	return None
+	return get_dealer_context().company
 
 
 def get_company_warehouses(company):
@@ -102,76 +65,259 @@ def get_user_customer():
 	Returns:
 		str: Customer adı veya None
 	"""
-	user = frappe.session.user
+	return get_dealer_context().customer
+
+
+def get_user_warehouses(company):
+	"""
+	Kullanıcının yetkili olduğu warehouse'ları döndür
+	Warehouse'daki "bayi_customer" field'ına göre filtreler
+	Admin kullanıcılar için tüm warehouse'ları döndürür
+	
+	Args:
+		company (str): Şirket adı
+		
+	Returns:
+		list: Kullanıcının yetkili olduğu warehouse listesi
+	"""
+	if not company:
+		return []
+	
+	context = get_dealer_context()
+	
+	# Bağlamdaki şirket için önceden çözümlenmiş listeyi kullan
+	# Kopya döndürüyoruz ki çağıranlar cache'teki objeleri değiştirmesin
+	if company == context.company:
+		return [frappe._dict(w) for w in context.warehouses]
+	
+	return _resolve_user_warehouses(company, context.customer, context.is_admin)
+
+
+def get_user_full_names(users):
+	"""Kullanıcı → tam ad eşlemesi, tek sorguda (get_fullname ile aynı geri dönüş: ad yoksa kullanıcı)"""
+	users = [user for user in users if user]
+	if not users:
+		return {}
+	
+	full_names = {user: user for user in users}
+	for user in frappe.get_all("User", filters={"name": ["in", users]}, fields=["name", "full_name"]):
+		full_names[user.name] = user.full_name or user.name
+	
+	return full_names
+
+
+class DealerContext(frappe._dict):
+	"""
+	Bir kullanıcının bayi bağlamı: user, is_admin, company, customer, warehouses
+	
+	Request boyunca frappe.local'da, request'ler arasında Redis'te kullanıcı bazında tutulur.
+	"""
+	
+	def as_cache_value(self):
+		"""Redis'e yazılacak sade dict"""
+		return {
+			"user": self.user,
+			"is_admin": self.is_admin,
+			"company": self.company,
+			"customer": self.customer,
+			"warehouses": [dict(w) for w in self.warehouses],
+		}
+	
+	@classmethod
+	def from_cache_value(cls, value):
+		context = cls(value)
+		context.warehouses = [frappe._dict(w) for w in value.get("warehouses") or []]
+		return context
+
+
+def get_dealer_context(user=None):
+	"""
+	Kullanıcının bayi bağlamını döndür
+	
+	Önce request içi (frappe.local), sonra Redis cache'e bakar; ikisinde de yoksa
+	User, Portal User, Contact ve Warehouse kayıtlarından bir kez çözümler.
+	
+	Args:
+		user (str, optional): Kullanıcı, varsayılan oturum kullanıcısı
+		
+	Returns:
+		DealerContext: Bayi bağlamı
+	"""
+	user = user or frappe.session.user
+	
+	if not hasattr(frappe.local, "dealer_context"):
+		frappe.local.dealer_context = {}
+	
+	context = frappe.local.dealer_context.get(user)
+	if context is not None:
+		return context
 	
 	if user == "Guest":
-		return None
+		context = DealerContext(user=user, is_admin=False, company=None, customer=None, warehouses=[])
+	else:
+		cached = frappe.cache.hget(DEALER_CONTEXT_CACHE_KEY, user)
+		if cached:
+			context = DealerContext.from_cache_value(cached)
+		else:
+			context = build_dealer_context(user)
+			frappe.cache.hset(DEALER_CONTEXT_CACHE_KEY, user, context.as_cache_value())
+	
+	frappe.local.dealer_context[user] = context
+	return context
+
+
+def clear_dealer_context(user=None):
+	"""
+	Bayi bağlamı cache'ini temizle
+	
+	Args:
+		user (str, optional): Sadece bu kullanıcının bağlamını temizle; verilmezse tümü
+	"""
+	if user:
+		frappe.cache.hdel(DEALER_CONTEXT_CACHE_KEY, user)
+		if hasattr(frappe.local, "dealer_context"):
+			frappe.local.dealer_context.pop(user, None)
+	else:
+		frappe.cache.delete_key(DEALER_CONTEXT_CACHE_KEY)
+		frappe.local.dealer_context = {}
+
+
+def invalidate_dealer_context(doc, method=None):
+	"""
+	doc_events hook'u - bayi bağlamını etkileyen kayıtlar değiştiğinde cache'i temizle
+	
+	User ve kullanıcıya bağlı Contact değişikliklerinde sadece ilgili kullanıcı,
+	Customer / Portal User / Warehouse / Company değişikliklerinde tüm bağlamlar temizlenir.
+	"""
+	if doc.doctype == "User":
+		clear_dealer_context(doc.name)
+	elif doc.doctype == "Contact" and doc.get("user"):
+		clear_dealer_context(doc.user)
+	elif doc.doctype == "Portal User" and doc.get("user"):
+		clear_dealer_context(doc.user)
+	else:
+		clear_dealer_context()
+
+
+def build_dealer_context(user, use_access_index=True):
+	"""
+	Bayi bağlamını veritabanından çözümle
+	
+	Bayi depoları önce erişim indeksinden (Dealer Warehouse Access) okunur; indekste satır
+	yoksa Warehouse kayıtlarından çözümlenir.
 	
+	Args:
+		user (str): Kullanıcı
+		use_access_index (bool): İndeksi kullan - indeksi yeniden oluştururken False verilir
+	"""
+	user_roles = frappe.get_roles(user)
+	is_admin = user == "Administrator" or "System Manager" in user_roles or "Administrator" in user_roles
+	
+	company = _resolve_user_company(user, user_roles)
+	customer = _resolve_user_customer(user)
+	warehouses = []
+	
+	if company and customer and use_access_index and not is_admin:
+		from north_medical_portal.utils.access_index import get_indexed_warehouses
+		warehouses = get_indexed_warehouses(user, company)
+	
+	if company and not warehouses:
+		warehouses = _resolve_user_warehouses(company, customer, is_admin)
+	
+	return DealerContext(
+		user=user,
+		is_admin=is_admin,
+		company=company,
+		customer=customer,
+		warehouses=warehouses
+	)
+
+
+def _resolve_user_company(user, user_roles):
+	"""Kullanıcının şirketini çözümle (bkz. get_user_company)"""
+	# 1. User'ın company field'ını kontrol et
+	user_company = frappe.db.get_value("User", user, "company") if frappe.get_meta("User").has_field("company") else None
+	if user_company and user_company != "North Medical":
+		return user_company
+	
+	# 2. User'ın role'lerine göre şirket bul
+	# Role'lerde şirket adı geçiyorsa (örn: "Dealer Manager - Bayi 1")
+	for role in user_roles:
+		if " - " in role:
+			company_name = role.split(" - ")[-1]
+			company_exists = frappe.db.exists("Company", company_name)
+			if company_exists and company_name != "North Medical":
+				return company_name
+	
+	# 3. İlk bayi şirketini döndür (şimdilik)
+	companies = frappe.get_all(
+		"Company",
+		filters={"name": ["!=", "North Medical"]},
+		fields=["name"],
+		order_by="creation asc",
+		limit=1
+	)
+	
+	if companies:
+		return companies[0].name
+	
+	return None
+
+
+def _resolve_user_customer(user):
+	"""Kullanıcının Customer'ını çözümle (bkz. get_user_customer)"""
 	# 1. Önce Portal Users tablosundan kontrol et
 	portal_user_parent = frappe.db.get_value(
 		"Portal User",
-		{"user": user},
-		"parent",
-		as_dict=False
+		{"user": user, "parenttype": "Customer"},
+		"parent"
 	)
 	
-	if portal_user_parent:
-		# Parent'ın Customer olup olmadığını kontrol et
-		if frappe.db.exists("Customer", portal_user_parent):
-			return portal_user_parent
+	if portal_user_parent and frappe.db.exists("Customer", portal_user_parent):
+		return portal_user_parent
 	
 	# 2. Contact üzerinden Customer'ı bul (fallback)
 	from frappe.contacts.doctype.contact.contact import get_contact_name
 	contact_name = get_contact_name(user)
 	
 	if contact_name:
-		contact = frappe.get_doc("Contact", contact_name)
-		for link in contact.links:
-			if link.link_doctype == "Customer":
-				return link.link_name
+		customer = frappe.db.get_value(
+			"Dynamic Link",
+			{
+				"parenttype": "Contact",
+				"parent": contact_name,
+				"link_doctype": "Customer"
+			},
+			"link_name",
+			order_by="idx asc"
+		)
+		if customer:
+			return customer
 	
 	return None
 
 
-def get_user_warehouses(company):
-	"""
-	Kullanıcının yetkili olduğu warehouse'ları döndür
-	Warehouse'daki "bayi_customer" field'ına göre filtreler
-	Admin kullanıcılar için tüm warehouse'ları döndürür
-	
-	Args:
-		company (str): Şirket adı
-		
-	Returns:
-		list: Kullanıcının yetkili olduğu warehouse listesi
-	"""
-	if not company:
-		return []
-	
+def _resolve_user_warehouses(company, customer, is_admin):
+	"""Kullanıcının yetkili warehouse'larını çözümle (bkz. get_user_warehouses)"""
 	# Admin kullanıcılar için tüm warehouse'ları döndür
-	if is_admin_user():
+	if is_admin:
 		return get_company_warehouses(company)
 	
-	# Kullanıcının customer'ını bul
-	user_customer = get_user_customer()
-	
-	if not user_customer:
+	if not customer:
 		# Customer bulunamazsa boş liste döndür
 		return []
 	
 	# Warehouse'ları bayi_customer field'ına göre filtrele
-	warehouses = frappe.get_all(
+	return frappe.get_all(
 		"Warehouse",
 		filters={
 			"company": company,
 			"is_group": 0,
-			"bayi_customer": user_customer
+			"bayi_customer": customer
 		},
 		fields=["name", "warehouse_name"],
 		order_by="warehouse_name asc"
 	)
-	
-	return warehouses
 
 
 def validate_dealer_access(company=None):
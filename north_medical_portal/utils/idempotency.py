@@ -0,0 +1,149 @@
+"""
+Portal mutasyonları için idempotency anahtarları
+
+İstemci aynı işlemi tekrar denerken (timeout, yavaş submit) aynı `idempotency_key`'i gönderir.
+İlk istek sonucu commit sonrası Redis'e yazılır; aynı kullanıcı/metot/anahtar ile gelen tekrar
+istekler işlemi yeniden çalıştırmadan saklanan sonucu döndürür. Böylece tekrar denemeler
+ikinci bir submit edilmiş Stock Entry / Material Request oluşturmaz.
+"""
+import functools
+import hashlib
+import inspect
+
+import frappe
+from frappe import _
+
+IDEMPOTENCY_KEY_PREFIX = "north_medical_portal:idempotency"
+
+# Sonuçların saklanma süresi
+IDEMPOTENCY_TTL = 24 * 60 * 60
+
+# İşlenmekte olan isteğin kilidi - istek bu süreden uzun sürerse tekrar deneme yeniden çalışır
+IDEMPOTENCY_PENDING_TTL = 10 * 60
+
+MAX_KEY_LENGTH = 128
+
+
+def idempotent(fn=None, fingerprint=None):
+	"""
+	Whitelist'li metodu opsiyonel `idempotency_key` parametresiyle idempotent yap
+
+	@frappe.whitelist() ile birlikte kullanılır, whitelist en dışta olmalıdır:
+
+		@frappe.whitelist()
+		@idempotent
+		def create_material_issue(warehouse, items, ...):
+
+	İsteğin argümanlarda olmayan girdileri (örn. yüklenen dosya) parmak izine
+	`fingerprint` ile eklenir; fonksiyon metodun argümanlarıyla çağrılır:
+
+		@frappe.whitelist()
+		@idempotent(fingerprint=get_uploaded_file_digest)
+		def import_stock_movements_file(file_url=None, ...):
+	"""
+	if fn is None:
+		return functools.partial(idempotent, fingerprint=fingerprint)
+
+	@functools.wraps(fn)
+	def wrapper(*args, **kwargs):
+		idempotency_key = kwargs.pop("idempotency_key", None)
+		if not idempotency_key:
+			return fn(*args, **kwargs)
+
+		extra = fingerprint(*args, **kwargs) if fingerprint else None
+		return run_idempotent(f"{fn.__module__}.{fn.__qualname__}", idempotency_key, fn, args, kwargs, extra)
+
+	# frappe.call argümanları imzaya göre süzer - idempotency_key imzada görünmeli
+	signature = inspect.signature(fn)
+	wrapper.__signature__ = signature.replace(parameters=[
+		*signature.parameters.values(),
+		inspect.Parameter("idempotency_key", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=None)
+	])
+
+	return wrapper
+
+
+def run_idempotent(method, idempotency_key, fn, args, kwargs, extra=None):
+	"""
+	fn'i anahtar başına bir kez çalıştır
+
+	Args:
+		method (str): Anahtarın kapsamı (metot yolu)
+		idempotency_key (str): İstemcinin ürettiği anahtar
+		fn: Çalıştırılacak fonksiyon
+		args, kwargs: fn argümanları
+		extra (str, optional): Parmak izine eklenecek, argümanlarda olmayan girdi özeti
+
+	Returns:
+		fn'in sonucu veya önceki isteğin saklanan sonucu
+	"""
+	idempotency_key = str(idempotency_key)
+	if len(idempotency_key) > MAX_KEY_LENGTH:
+		frappe.throw(_("idempotency_key en fazla {0} karakter olabilir").format(MAX_KEY_LENGTH))
+
+	cache_key = frappe.cache.make_key(f"{IDEMPOTENCY_KEY_PREFIX}:{frappe.session.user}:{method}:{idempotency_key}")
+	fingerprint = _fingerprint(args, kwargs, extra)
+
+	# Sonucu sonradan geçersiz kılınmış istek (örn. arka plan submit'i başarısız oldu) yeniden çalışır
+	if frappe.cache.get(f"{cache_key}:invalidated"):
+		frappe.cache.delete(cache_key, f"{cache_key}:invalidated")
+
+	pending = frappe.as_json({"status": "pending", "fingerprint": fingerprint})
+	if not frappe.cache.set(cache_key, pending, nx=True, ex=IDEMPOTENCY_PENDING_TTL):
+		return _replay(cache_key, fingerprint)
+
+	try:
+		frappe.flags.idempotency_cache_key = cache_key
+		result = fn(*args, **kwargs)
+	except Exception:
+		frappe.cache.delete(cache_key)
+		raise
+	finally:
+		frappe.flags.idempotency_cache_key = None
+
+	stored = frappe.as_json({"status": "done", "fingerprint": fingerprint, "result": result})
+
+	# Sonuç ancak işlem commit olursa kalıcıdır; rollback olursa tekrar deneme yeniden çalışır
+	frappe.db.after_commit.add(lambda: frappe.cache.set(cache_key, stored, ex=IDEMPOTENCY_TTL))
+	frappe.db.after_rollback.add(lambda: frappe.cache.delete(cache_key))
+
+	return result
+
+
+def get_idempotency_cache_key():
+	"""Şu an çalışan idempotent isteğin anahtarı - istek idempotency_key ile gelmediyse None"""
+	return frappe.flags.get("idempotency_cache_key")
+
+
+def invalidate_idempotent_result(cache_key):
+	"""
+	Saklanan sonucu geçersiz kıl - aynı anahtarla gelen tekrar deneme işlemi yeniden çalıştırır
+
+	Sonuç istek commit olduktan sonra yazıldığı için anahtar silinmez; ayrı bir işaret bırakılır
+	ve bir sonraki istekte kontrol edilir. Böylece sonucun yazılmasıyla yarışmaz.
+	"""
+	if cache_key:
+		frappe.cache.set(f"{cache_key}:invalidated", 1, ex=IDEMPOTENCY_TTL)
+
+
+def _replay(cache_key, fingerprint):
+	value = frappe.cache.get(cache_key)
+	if not value:
+		# Önceki istek tam bu arada bitti ve başarısız oldu - istemci tekrar denemeli
+		frappe.throw(_("Aynı istek işlenirken bir hata oluştu, lütfen tekrar deneyin"))
+
+	entry = frappe.parse_json(frappe.safe_decode(value))
+
+	if entry.get("fingerprint") != fingerprint:
+		frappe.throw(_("Bu idempotency_key farklı bir istek için kullanılmış"))
+
+	if entry.get("status") != "done":
+		frappe.throw(_("Aynı istek hala işleniyor, lütfen biraz sonra tekrar deneyin"))
+
+	frappe.local.response["idempotent_replay"] = 1
+	return entry.get("result")
+
+
+def _fingerprint(args, kwargs, extra=None):
+	payload = frappe.as_json({"args": args, "kwargs": kwargs, "extra": extra})
+	return hashlib.sha256(payload.encode()).hexdigest()
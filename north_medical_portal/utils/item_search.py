@@ -0,0 +1,351 @@
+"""
+Portal ürün seçicisi için trigram tabanlı ürün arama indeksi
+
+Ürünlerin item_code, item_name ve description alanları Redis'te bir hash olarak tutulur. Hash
+arka plan işinde (rebuild_item_search_index) kilit altında geçici bir anahtara kurulur ve
+RENAME ile tek adımda yerine konur; web isteği indeksi asla kendisi kurmaz, indeks hazır değilse
+arama SQL'e düşer.
+
+Her worker hash'ten bellekte bir trigram → ürün ters indeksi kurar. Item insert/update/trash
+hook'ları tek ürünün kaydını yazar ve değişiklik günlüğüne (sıra numarasıyla bir sorted set)
+ekler; worker'lar sadece kendi sıra numaralarından sonraki değişiklikleri uygular. Tam yükleme
+sadece yeniden oluşturmadan sonra (nesil değişince) yapılır.
+
+Arama her tuş vuruşunda tam tabloyu `LIKE '%txt%'` ile taramak yerine sadece sorgunun
+trigramlarının posting listelerine bakar.
+
+Sıralama: tam kod eşleşmesi > kod öneki > ad öneki > kelime eşleşmesi > açıklama eşleşmesi,
+ardından trigram benzerliği (yazım hatası toleransı).
+"""
+import json
+import re
+
+import frappe
+from frappe.utils import strip_html
+
+from north_medical_portal.utils.file_import import chunked
+from north_medical_portal.utils.locks import redis_lock
+
+ITEM_SEARCH_DOCS_KEY = "north_medical_portal:item_search:docs"
+# Son yeniden oluşturmanın kimliği ve o andaki sıra numarası
+ITEM_SEARCH_GENERATION_KEY = "north_medical_portal:item_search:generation"
+# Tek ürün değişikliklerinin sıra numarası ve günlüğü (ürün kodu → son değişikliğin sırası)
+ITEM_SEARCH_SEQ_KEY = "north_medical_portal:item_search:seq"
+ITEM_SEARCH_CHANGES_KEY = "north_medical_portal:item_search:changes"
+
+ITEM_SEARCH_REBUILD_LOCK = "item_search_rebuild"
+ITEM_SEARCH_REBUILD_LOCK_TIMEOUT = 30 * 60
+
+# Hash'teki "indeks kuruldu" işareti - boş ürün listesinde de RENAME edilecek bir anahtar olsun
+BUILT_MARKER = "__built__"
+
+# Açıklamanın sadece başı indekslenir; uzun HTML açıklamalar indeksi şişirmesin
+DESCRIPTION_LENGTH = 200
+
+WRITE_BATCH_SIZE = 1000
+
+# Kaydı yaz/sil, sıra numarasını artır ve değişikliği günlüğe ekle - tek atomik adım
+_SET_DOC_SCRIPT = """
+if ARGV[2] == '' then
+	redis.call('HDEL', KEYS[1], ARGV[1])
+else
+	redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+local seq = redis.call('INCR', KEYS[2])
+redis.call('ZADD', KEYS[3], seq, ARGV[1])
+return seq
+"""
+
+# Geçici hash'i yerine koy ve o anki sıra numarasını döndür - tek atomik adım
+_SWAP_SCRIPT = """
+redis.call('RENAME', KEYS[1], KEYS[2])
+return tonumber(redis.call('GET', KEYS[3]) or '0')
+"""
+
+_TOKEN_PATTERN = re.compile(r"[^\w]+", re.UNICODE)
+
+# Worker içi indeks - {"generation", "seq", "docs", "trigrams"}
+_index = {}
+
+
+def search_item_codes(txt, item_codes=None):
+	"""
+	Sorguya uyan ürün kodlarını alaka sırasıyla döndür
+
+	Adaylar kesilmeden önce puanlanır; sayfalama çağıranın işidir. item_codes verilirse
+	(örn. bayi depolarında stoğu olan ürünler) adaylar puanlamadan önce bu kümeyle kesiştirilir.
+
+	Args:
+		txt (str): Arama metni
+		item_codes (set, optional): Sadece bu ürünler arasında ara
+
+	Returns:
+		list: Ürün kodları veya indeks kullanılamıyorsa None
+	"""
+	query = _normalize(txt)
+	if not query:
+		return None
+
+	index = _get_index()
+	if index is None:
+		return None
+
+	query_trigrams = _trigrams(query, prefix_only=True)
+	if not query_trigrams:
+		return []
+
+	# Aday ürünler: sorgu trigramlarının en az yarısını paylaşanlar
+	counts = {}
+	for trigram in query_trigrams:
+		for item_code in index["trigrams"].get(trigram, ()):
+			counts[item_code] = counts.get(item_code, 0) + 1
+
+	min_shared = max(1, len(query_trigrams) // 2)
+	candidates = [
+		item_code for item_code, count in counts.items()
+		if count >= min_shared and (item_codes is None or item_code in item_codes)
+	]
+
+	query_tokens = query.split()
+	return sorted(
+		candidates,
+		key=lambda item_code: (
+			-_score(index["docs"][item_code], query, query_tokens),
+			-counts[item_code] / len(query_trigrams),
+			item_code
+		)
+	)
+
+
+def enqueue_item_search_rebuild():
+	"""İndeksin yeniden oluşturulmasını arka plan işine ver (aynı anda tek iş)"""
+	frappe.enqueue(
+		"north_medical_portal.utils.item_search.rebuild_item_search_index",
+		queue="long",
+		job_id="north_medical_portal:item_search_rebuild",
+		deduplicate=True
+	)
+
+
+def rebuild_item_search_index():
+	"""
+	İndeksi Item tablosundan tamamen yeniden oluştur
+
+	Kilit altında geçici bir hash'e yazılır ve atomik olarak yerine konur; okuyanlar yarım
+	kurulmuş bir indeks görmez. Kurulum sırasında değişen ürünler yer değiştirmeden sonra
+	veritabanından yeniden yazılır.
+
+	Returns:
+		int: İndekslenen ürün sayısı veya başka bir yeniden oluşturma sürüyorsa None
+	"""
+	with redis_lock(ITEM_SEARCH_REBUILD_LOCK, timeout=ITEM_SEARCH_REBUILD_LOCK_TIMEOUT) as acquired:
+		if not acquired:
+			return None
+
+		start_seq = _get_seq()
+		items = frappe.get_all(
+			"Item",
+			filters={"disabled": 0},
+			fields=["item_code", "item_name", "description"]
+		)
+
+		build_key = _key(f"{ITEM_SEARCH_DOCS_KEY}:build:{frappe.generate_hash(length=12)}")
+		_redis("HSET", build_key, BUILT_MARKER, "1")
+		for chunk in chunked(items, WRITE_BATCH_SIZE):
+			pipeline = frappe.cache.pipeline(transaction=False)
+			for item in chunk:
+				pipeline.hset(build_key, item.item_code, json.dumps(_make_doc(item)))
+			pipeline.execute()
+
+		swap_seq = int(_redis(
+			"EVAL", _SWAP_SCRIPT, 3,
+			build_key, _key(ITEM_SEARCH_DOCS_KEY), _key(ITEM_SEARCH_SEQ_KEY)
+		))
+
+		# Kurulum sırasında değişen ürünlerin kaydı eski hash'e yazıldı - yeni hash'e tekrar yaz
+		changed = [item_code for item_code, _seq in _get_changes(start_seq, swap_seq)]
+		if changed:
+			current = {
+				item.item_code: item
+				for item in frappe.get_all(
+					"Item",
+					filters={"name": ["in", changed], "disabled": 0},
+					fields=["item_code", "item_name", "description"]
+				)
+			}
+			for item_code in changed:
+				if item_code in current:
+					_redis("HSET", _key(ITEM_SEARCH_DOCS_KEY), item_code, json.dumps(_make_doc(current[item_code])))
+				else:
+					_redis("HDEL", _key(ITEM_SEARCH_DOCS_KEY), item_code)
+
+		# Yeni nesil yayınlanır; worker'lar bir kez tam yükler, günlüğün eski kısmı gereksizleşir
+		_redis("SET", _key(ITEM_SEARCH_GENERATION_KEY), json.dumps({
+			"id": frappe.generate_hash(length=12),
+			"seq": swap_seq
+		}))
+		_redis("ZREMRANGEBYSCORE", _key(ITEM_SEARCH_CHANGES_KEY), "-inf", swap_seq)
+
+		return len(items)
+
+
+def update_item_search_index(doc, method=None):
+	"""doc_events hook'u - Item değiştiğinde indeksteki kaydını commit sonrası güncelle"""
+	item_code = doc.name
+
+	if method == "on_trash" or doc.get("disabled"):
+		frappe.db.after_commit.add(lambda: _set_doc(item_code, None))
+	else:
+		values = _make_doc(doc)
+		frappe.db.after_commit.add(lambda: _set_doc(item_code, values))
+
+
+def _get_index():
+	generation, seq = _redis("MGET", _key(ITEM_SEARCH_GENERATION_KEY), _key(ITEM_SEARCH_SEQ_KEY))
+
+	if not generation:
+		# İlk kullanım - indeksi arka planda kur, bu istek SQL aramasına düşer
+		enqueue_item_search_rebuild()
+		return None
+
+	generation = json.loads(frappe.safe_decode(generation))
+
+	if _index.get("generation") != generation["id"]:
+		if not _load_index(generation):
+			# Hash kaybolmuş (örn. Redis temizlendi) - yeniden kur
+			enqueue_item_search_rebuild()
+			return None
+	elif _index["seq"] < int(seq or 0):
+		_apply_changes()
+
+	return _index
+
+
+def _load_index(generation):
+	"""Hash'ten tam yükleme - sadece yeni nesilde. Hash yoksa False"""
+	docs = {
+		frappe.safe_decode(item_code): value
+		for item_code, value in (_redis("HGETALL", _key(ITEM_SEARCH_DOCS_KEY)) or {}).items()
+	}
+	if docs.pop(BUILT_MARKER, None) is None:
+		return False
+
+	docs = {item_code: json.loads(frappe.safe_decode(value)) for item_code, value in docs.items()}
+
+	trigrams = {}
+	for item_code, doc in docs.items():
+		for trigram in _trigrams(" ".join(doc)):
+			trigrams.setdefault(trigram, set()).add(item_code)
+
+	_index.clear()
+	_index.update({"generation": generation["id"], "seq": generation["seq"], "docs": docs, "trigrams": trigrams})
+
+	# Nesil yayınlandıktan sonra gelen değişiklikler
+	_apply_changes()
+	return True
+
+
+def _apply_changes():
+	"""Worker'ın sıra numarasından sonraki tek ürün değişikliklerini bellekteki indekse uygula"""
+	changes = _get_changes(_index["seq"])
+	if not changes:
+		return
+
+	item_codes = [item_code for item_code, _seq in changes]
+	values = _redis("HMGET", _key(ITEM_SEARCH_DOCS_KEY), *item_codes)
+
+	docs = _index["docs"]
+	trigrams = _index["trigrams"]
+
+	for item_code, value in zip(item_codes, values, strict=True):
+		old_doc = docs.pop(item_code, None)
+		if old_doc:
+			for trigram in _trigrams(" ".join(old_doc)):
+				posting = trigrams.get(trigram)
+				if posting:
+					posting.discard(item_code)
+
+		if value:
+			doc = docs[item_code] = json.loads(frappe.safe_decode(value))
+			for trigram in _trigrams(" ".join(doc)):
+				trigrams.setdefault(trigram, set()).add(item_code)
+
+	_index["seq"] = max(seq for _item_code, seq in changes)
+
+
+def _get_changes(after_seq, until_seq="+inf"):
+	"""Günlükten (after_seq, until_seq] aralığındaki değişiklikler - [(item_code, seq), ...]"""
+	flat = _redis("ZRANGEBYSCORE", _key(ITEM_SEARCH_CHANGES_KEY), f"({after_seq}", until_seq, "WITHSCORES") or []
+	return [
+		(frappe.safe_decode(flat[i]), int(float(flat[i + 1])))
+		for i in range(0, len(flat), 2)
+	]
+
+
+def _get_seq():
+	return int(_redis("GET", _key(ITEM_SEARCH_SEQ_KEY)) or 0)
+
+
+def _score(doc, query, query_tokens):
+	code, name, description = doc
+
+	if code == query:
+		return 5
+	if code.startswith(query):
+		return 4
+	if name.startswith(query):
+		return 3
+
+	words = (code + " " + name).split()
+	if all(any(word.startswith(token) for word in words) for token in query_tokens):
+		return 2
+
+	description_words = description.split()
+	if all(any(word.startswith(token) for word in description_words) for token in query_tokens):
+		return 1
+
+	return 0
+
+
+def _make_doc(item):
+	description = _normalize(strip_html(item.get("description") or ""))[:DESCRIPTION_LENGTH]
+	return (_normalize(item.get("item_code") or item.get("name")), _normalize(item.get("item_name")), description)
+
+
+def _set_doc(item_code, values):
+	_redis(
+		"EVAL", _SET_DOC_SCRIPT, 3,
+		_key(ITEM_SEARCH_DOCS_KEY), _key(ITEM_SEARCH_SEQ_KEY), _key(ITEM_SEARCH_CHANGES_KEY),
+		item_code, json.dumps(values) if values else ""
+	)
+
+
+def _key(name):
+	return frappe.cache.make_key(name)
+
+
+def _redis(*args):
+	# Ham Redis komutu - RedisWrapper'ın pickle'lı hash/anahtar yardımcıları atlanır
+	return frappe.cache.execute_command(*args)
+
+
+def _normalize(value):
+	return " ".join(_TOKEN_PATTERN.sub(" ", (value or "").casefold()).split())
+
+
+def _trigrams(text, prefix_only=False):
+	"""
+	Kelime başına boşlukla doldurulmuş trigramlar - "abc" → "  a", " ab", "abc", "bc "
+
+	prefix_only sorgu tarafında son kelimenin bitişini eklemez; yazılmakta olan kelime
+	bir önek olarak eşleşir.
+	"""
+	trigrams = set()
+	tokens = text.split()
+	for position, token in enumerate(tokens):
+		padded = f"  {token} "
+		if prefix_only and position == len(tokens) - 1:
+			padded = padded[:-1]
+		for i in range(len(padded) - 2):
+			trigrams.add(padded[i : i + 3])
+	return trigrams
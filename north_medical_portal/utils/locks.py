@@ -0,0 +1,45 @@
+"""
+Redis tabanlı dağıtık kilit - farklı worker'larda çalışan işlerin aynı kaynağa
+(örn. bir şirketin günlük Material Request'i) aynı anda yazmasını engeller
+"""
+import time
+from contextlib import contextmanager
+
+import frappe
+
+
+@contextmanager
+def redis_lock(name, timeout=300, wait=0):
+	"""
+	Kilidi almayı dene
+
+	Kilit timeout saniye sonra kendiliğinden düşer; süreç ölürse kaynak kilitli kalmaz.
+
+	Args:
+		name (str): Kilit adı
+		timeout (int): Kilidin en fazla tutulma süresi (saniye)
+		wait (float): Kilit doluysa en fazla bekleme süresi (saniye), 0 ise beklemez
+
+	Yields:
+		bool: Kilit alındıysa True
+	"""
+	key = frappe.cache.make_key(f"north_medical_portal:lock:{name}")
+	token = frappe.generate_hash(length=16)
+	deadline = time.monotonic() + wait
+
+	acquired = bool(frappe.cache.set(key, token, nx=True, ex=timeout))
+	while not acquired and time.monotonic() < deadline:
+		time.sleep(0.2)
+		acquired = bool(frappe.cache.set(key, token, nx=True, ex=timeout))
+
+	try:
+		yield acquired
+	finally:
+		# Sadece kendi aldığımız kilidi bırak - süresi dolup başkası aldıysa dokunma
+		if acquired and frappe.safe_decode(frappe.cache.get(key) or b"") == token:
+			frappe.cache.delete(key)
+
+
+def is_locked(name):
+	"""Kilit şu an tutuluyor mu"""
+	return bool(frappe.cache.exists(frappe.cache.make_key(f"north_medical_portal:lock:{name}")))
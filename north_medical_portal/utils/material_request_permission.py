@@ -3,7 +3,7 @@ Material Request için özel website permission kontrolü
 """
 import frappe
 from frappe import _
-from north_medical_portal.utils.helpers import get_user_company, is_admin_user
+from north_medical_portal.utils.helpers import get_dealer_context
 
 
 def has_website_permission(doc, ptype="read", user=None, verbose=False):
@@ -19,17 +19,14 @@ def has_website_permission(doc, ptype="read", user=None, verbose=False):
 		return False
 	
 	# Admin kullanıcılar tüm Material Request'lere erişebilir
-	if is_admin_user():
+	# Bağlam request içinde memoize edildiği için liste render'ında satır başına sorgu atılmaz
+	context = get_dealer_context(user)
+	if context.is_admin:
 		return True
 	
 	# Kullanıcının şirketini al
-	user_company = get_user_company()
-	if not user_company:
+	if not context.company:
 		return False
 	
 	# Material Request'in şirketi kullanıcının şirketi ile eşleşiyor mu?
-	if doc.company == user_company:
-		return True
-	
-	return False
-
+	return doc.company == context.company
@@ -4,6 +4,9 @@ Portal permissions for admin users - Allow admin to access all documents
 import frappe
 from north_medical_portal.utils.helpers import is_admin_user
 
+# Tedarikçi portalının da kullandığı satın alma belgeleri
+SUPPLIER_DOCTYPES = ("Purchase Order", "Purchase Invoice")
+
 
 def has_website_permission_for_purchase_order(doc, ptype="read", user=None, verbose=False):
 	"""Purchase Order için website permission - Admin tüm belgelere erişebilir"""
@@ -25,12 +28,86 @@ def has_website_permission_for_purchase_invoice(doc, ptype="read", user=None, ve
 
 def has_website_permission_for_stock_entry(doc, ptype="read", user=None, verbose=False):
 	"""Stock Entry için website permission - Admin tüm belgelere erişebilir"""
-	if is_admin_user():
+	from north_medical_portal.utils.helpers import get_dealer_context
+	context = get_dealer_context(user)
+	if context.is_admin:
 		return True
 	# Normal kullanıcılar için şirket kontrolü
-	from north_medical_portal.utils.helpers import get_user_company
-	user_company = get_user_company()
-	if not user_company:
+	if not context.company:
 		return False
-	return doc.company == user_company
+	return doc.company == context.company
+
+
+def get_dealer_company_condition(doctype, user=None):
+	"""
+	Bayi kullanıcıları için şirket kısıtını SQL WHERE koşulu olarak döndür
+
+	has_website_permission_* fonksiyonlarının belge bazında yaptığı şirket kontrolünü
+	liste sorgularında tek seferde uygular. Sadece Customer'a bağlı ve şirketi çözümlenmiş
+	Website User'lar kısıtlanır; admin, desk (System User) ve bayi olmayan portal kullanıcıları
+	(ör. tedarikçiler) ERPNext'in kendi izinlerine bırakılır. Satın alma belgelerinde Supplier'a
+	bağlı kullanıcılar da kısıtlanmaz - tedarikçi portalı kendi belgelerini görür.
+
+	Args:
+		doctype (str): Sorgulanan DocType
+		user (str, optional): Kullanıcı, varsayılan oturum kullanıcısı
+
+	Returns:
+		str: SQL koşulu veya boş string
+	"""
+	from north_medical_portal.utils.access_index import get_indexed_company_condition
+	from north_medical_portal.utils.helpers import get_dealer_context
+
+	user = user or frappe.session.user
+	if user in ("Administrator", "Guest"):
+		return ""
+
+	if frappe.get_cached_value("User", user, "user_type") != "Website User":
+		return ""
+
+	context = get_dealer_context(user)
+	if context.is_admin or not context.customer or not context.company:
+		return ""
+
+	if doctype in SUPPLIER_DOCTYPES and is_supplier_user(user):
+		return ""
+
+	# Şirketler erişim indeksinden okunur; depo ataması olmayan bayi için bağlamdaki şirket
+	return get_indexed_company_condition(doctype, user) or (
+		f"`tab{doctype}`.`company` = {frappe.db.escape(context.company)}"
+	)
+
+
+def is_supplier_user(user):
+	"""Kullanıcı bir Supplier'a Portal User tablosu veya Contact linki ile bağlı mı"""
+	if frappe.db.exists("Portal User", {"user": user, "parenttype": "Supplier"}):
+		return True
+
+	return bool(frappe.db.sql("""
+		SELECT 1
+		FROM `tabContact` c
+		INNER JOIN `tabDynamic Link` dl ON dl.parent = c.name AND dl.parenttype = 'Contact'
+		WHERE c.user = %(user)s
+			AND dl.link_doctype = 'Supplier'
+		LIMIT 1
+	""", {"user": user}))
+
+
+def get_permission_query_conditions_for_material_request(user=None, doctype=None):
+	"""Material Request liste sorguları için şirket koşulu"""
+	return get_dealer_company_condition("Material Request", user)
+
+
+def get_permission_query_conditions_for_stock_entry(user=None, doctype=None):
+	"""Stock Entry liste sorguları için şirket koşulu"""
+	return get_dealer_company_condition("Stock Entry", user)
+
+
+def get_permission_query_conditions_for_purchase_order(user=None, doctype=None):
+	"""Purchase Order liste sorguları için şirket koşulu"""
+	return get_dealer_company_condition("Purchase Order", user)
+
 
+def get_permission_query_conditions_for_purchase_invoice(user=None, doctype=None):
+	"""Purchase Invoice liste sorguları için şirket koşulu"""
+	return get_dealer_company_condition("Purchase Invoice", user)
@@ -0,0 +1,210 @@
+"""
+Reorder motoru için sentetik bayi verisi ve benchmark
+
+Test sitesinde N bayi şirketi, şirket başına M depo ve K ürün (her depo için Item Reorder
+satırı ve kontrollü seviyede Bin) oluşturur, reorder motorunu dry-run modunda çalıştırır ve
+süre, sorgu sayısı ile oluşturulacak Material Request sayılarını raporlar.
+
+Veri doküman kaydetmeden doğrudan bulk_insert ile yazılır (hook'lar, NestedSet ve ERPNext
+şirket kurulumu çalışmaz); tüm kayıtlar SYNTHETIC_PREFIX ile başlar ve cleanup ile silinir.
+"""
+import random
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe import _
+from frappe.utils import now
+
+from north_medical_portal.utils.stock import run_reorder_engine
+
+SYNTHETIC_PREFIX = "NMP-BENCH-"
+
+BULK_CHUNK_SIZE = 5000
+
+
+def run_reorder_benchmark(companies=150, warehouses=2, items=500, low_ratio=0.2, seed=0, keep=False):
+	"""
+	Sentetik veri oluştur, reorder motorunu dry-run çalıştır ve ölç
+
+	Args:
+		companies (int): Bayi şirketi sayısı
+		warehouses (int): Şirket başına depo sayısı
+		items (int): Ürün sayısı - her depoda her ürün için Item Reorder ve Bin
+		low_ratio (float): Reorder level altında olacak (ürün, depo) oranı
+		seed (int): Tekrarlanabilir veri için rastgele tohum
+		keep (bool): True ise sentetik veri silinmez
+
+	Returns:
+		dict: {"dataset", "expected_low_stock", "expected_material_requests", "wall_time", "queries", "items_found",
+			"material_requests_created", "material_requests_updated", "items_requested", "timings"}
+	"""
+	validate_benchmark_site()
+
+	cleanup_synthetic_dealers()
+	dataset = generate_synthetic_dealers(companies, warehouses, items, low_ratio, seed)
+	frappe.db.commit()
+
+	try:
+		with count_queries() as counter:
+			started = time.monotonic()
+			stats = run_reorder_engine(companies=dataset["companies"], dry_run=True)
+			wall_time = round(time.monotonic() - started, 3)
+
+		return {
+			"dataset": {
+				"companies": len(dataset["companies"]),
+				"warehouses": dataset["warehouse_count"],
+				"items": items,
+				"reorder_rows": dataset["reorder_rows"]
+			},
+			"expected_low_stock": dataset["low_stock_rows"],
+			"expected_material_requests": dataset["low_stock_warehouses"],
+			"wall_time": wall_time,
+			"queries": counter["count"],
+			"items_found": stats["items_found"],
+			"material_requests_created": stats["material_requests_created"],
+			"material_requests_updated": stats["material_requests_updated"],
+			"items_requested": stats["items_requested"],
+			"timings": stats["timings"]
+		}
+	finally:
+		if not keep:
+			cleanup_synthetic_dealers()
+			frappe.db.commit()
+
+
+def validate_benchmark_site():
+	"""Sentetik veri sadece geliştirme / test sitelerine yazılabilir"""
+	if not (frappe.conf.developer_mode or frappe.conf.allow_tests):
+		frappe.throw(_("Reorder benchmark sadece developer_mode veya allow_tests açık sitelerde çalıştırılabilir"))
+
+
+def generate_synthetic_dealers(companies, warehouses, items, low_ratio=0.2, seed=0):
+	"""
+	Sentetik bayi şirketleri, depolar, ürünler, Item Reorder ve Bin satırları oluştur
+
+	Returns:
+		dict: {"companies", "warehouse_count", "reorder_rows", "low_stock_rows", "low_stock_warehouses"}
+	"""
+	rng = random.Random(seed)
+	timestamp = now()
+	user = frappe.session.user
+	meta = (user, user, timestamp, timestamp)
+	meta_fields = ["owner", "modified_by", "creation", "modified"]
+	currency = frappe.db.get_default("currency") or "TRY"
+
+	company_names = []
+	company_rows = []
+	warehouse_names = []
+	warehouse_rows = []
+	for company_no in range(1, companies + 1):
+		abbr = f"NB{company_no:04d}"
+		company = f"{SYNTHETIC_PREFIX}Dealer {company_no:04d}"
+		company_names.append(company)
+		company_rows.append((company, company, abbr, currency, *meta))
+
+		for warehouse_no in range(1, warehouses + 1):
+			warehouse = f"{SYNTHETIC_PREFIX}Stores {warehouse_no} - {abbr}"
+			warehouse_names.append(warehouse)
+			warehouse_rows.append((warehouse, f"{SYNTHETIC_PREFIX}Stores {warehouse_no}", company, 0, *meta))
+
+	item_codes = [f"{SYNTHETIC_PREFIX}ITEM-{item_no:05d}" for item_no in range(1, items + 1)]
+	item_rows = [
+		(item_code, item_code, item_code, "All Item Groups", "Nos", 1, 0, *meta)
+		for item_code in item_codes
+	]
+
+	reorder_rows = []
+	bin_rows = []
+	low_stock_rows = 0
+	low_stock_warehouses = set()
+	for item_code in item_codes:
+		for idx, warehouse in enumerate(warehouse_names, start=1):
+			level = rng.randint(5, 50)
+			qty = rng.randint(10, 100)
+			if rng.random() < low_ratio:
+				actual_qty = rng.randint(0, level)
+				low_stock_rows += 1
+				low_stock_warehouses.add(warehouse)
+			else:
+				actual_qty = rng.randint(level + 1, level * 3)
+
+			reorder_rows.append((
+				frappe.generate_hash(length=10), item_code, "Item", "reorder_levels", idx,
+				warehouse, warehouse, "Purchase", level, qty, *meta
+			))
+			bin_rows.append((
+				frappe.generate_hash(length=10), item_code, warehouse, actual_qty, actual_qty, "Nos", *meta
+			))
+
+	frappe.db.bulk_insert(
+		"Company",
+		fields=["name", "company_name", "abbr", "default_currency", *meta_fields],
+		values=company_rows,
+		chunk_size=BULK_CHUNK_SIZE
+	)
+	frappe.db.bulk_insert(
+		"Warehouse",
+		fields=["name", "warehouse_name", "company", "is_group", *meta_fields],
+		values=warehouse_rows,
+		chunk_size=BULK_CHUNK_SIZE
+	)
+	frappe.db.bulk_insert(
+		"Item",
+		fields=["name", "item_code", "item_name", "item_group", "stock_uom", "is_stock_item", "disabled", *meta_fields],
+		values=item_rows,
+		chunk_size=BULK_CHUNK_SIZE
+	)
+	frappe.db.bulk_insert(
+		"Item Reorder",
+		fields=[
+			"name", "parent", "parenttype", "parentfield", "idx",
+			"warehouse", "warehouse_group", "material_request_type",
+			"warehouse_reorder_level", "warehouse_reorder_qty", *meta_fields
+		],
+		values=reorder_rows,
+		chunk_size=BULK_CHUNK_SIZE
+	)
+	frappe.db.bulk_insert(
+		"Bin",
+		fields=["name", "item_code", "warehouse", "actual_qty", "projected_qty", "stock_uom", *meta_fields],
+		values=bin_rows,
+		chunk_size=BULK_CHUNK_SIZE
+	)
+
+	return {
+		"companies": company_names,
+		"warehouse_count": len(warehouse_names),
+		"reorder_rows": len(reorder_rows),
+		"low_stock_rows": low_stock_rows,
+		"low_stock_warehouses": len(low_stock_warehouses)
+	}
+
+
+def cleanup_synthetic_dealers():
+	"""SYNTHETIC_PREFIX ile oluşturulmuş tüm benchmark verisini sil"""
+	pattern = f"{SYNTHETIC_PREFIX}%"
+
+	frappe.db.delete("Bin", {"item_code": ["like", pattern]})
+	frappe.db.delete("Item Reorder", {"parent": ["like", pattern]})
+	frappe.db.delete("Item", {"name": ["like", pattern]})
+	frappe.db.delete("Warehouse", {"name": ["like", pattern]})
+	frappe.db.delete("Company", {"name": ["like", pattern]})
+
+
+@contextmanager
+def count_queries():
+	"""Blok içinde frappe.db.sql ile çalışan sorguları say"""
+	counter = {"count": 0}
+	original_sql = frappe.db.sql
+
+	def counting_sql(*args, **kwargs):
+		counter["count"] += 1
+		return original_sql(*args, **kwargs)
+
+	frappe.db.sql = counting_sql
+	try:
+		yield counter
+	finally:
+		frappe.db.sql = original_sql
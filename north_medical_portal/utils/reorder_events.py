@@ -0,0 +1,118 @@
+"""
+Olay tabanlı (artımlı) reorder kontrolü
+
+Bayi deposunda stok azaldığında (Stock Ledger Entry submit / Bin güncellemesi) etkilenen
+(ürün, depo) çiftleri transaction içinde biriktirilir. Commit sonrası tek sorguyla
+reorder level altına düşenler bulunur ve her çift için tekilleştirilmiş bir arka plan işi
+kuyruğa alınır. İş sadece o çifti değerlendirir ve günün Draft Material Request'ine ekler
+(bkz. utils.stock.create_auto_material_requests). Günlük check_reorder_levels kaçanları
+tamamlayan bir mutabakat taramasına dönüşür.
+
+Dealer Settings > "Reorder Otomasyonu Aktif" (enable_reorder_hook) kapalıysa hiçbir şey yapılmaz.
+"""
+import frappe
+
+from north_medical_portal.utils.stock import MAIN_COMPANY, create_auto_material_requests, get_low_stock_items
+
+
+def queue_reorder_check(doc, method=None):
+	"""doc_events hook'u - stoğu azalan (ürün, depo) çiftini commit sonrası kontrol için biriktir"""
+	if not doc.get("warehouse") or not doc.get("item_code"):
+		return
+
+	# Stok girişleri reorder seviyesini düşüremez
+	if doc.doctype == "Stock Ledger Entry" and (doc.get("actual_qty") or 0) >= 0:
+		return
+
+	pending = getattr(frappe.local, "pending_reorder_checks", None)
+	if pending is None:
+		if not is_reorder_hook_enabled():
+			return
+		pending = frappe.local.pending_reorder_checks = set()
+		frappe.db.after_commit.add(_enqueue_pending_reorder_checks)
+		frappe.db.after_rollback.add(_discard_pending_reorder_checks)
+
+	pending.add((doc.item_code, doc.warehouse))
+
+
+def is_reorder_hook_enabled():
+	"""Olay tabanlı reorder kontrolü açık mı"""
+	return bool(frappe.db.get_single_value("Dealer Settings", "enable_reorder_hook", cache=True))
+
+
+def enqueue_reorder_checks(pairs):
+	"""
+	Reorder level altına düşmüş çiftler için arka plan işi kuyruğa al
+
+	Aynı (ürün, depo) için kuyrukta bekleyen iş varsa yenisi eklenmez.
+
+	Args:
+		pairs (set): {(item_code, warehouse)}
+
+	Returns:
+		int: Kuyruğa alınan iş sayısı
+	"""
+	if not pairs:
+		return 0
+
+	item_codes = list({item_code for item_code, _warehouse in pairs})
+	warehouses = list({warehouse for _item_code, warehouse in pairs})
+
+	# Tek sorgu - çiftlerin çapraz çarpımından fazlası gelirse Python'da elenir
+	low_pairs = frappe.db.sql("""
+		SELECT b.item_code, b.warehouse
+		FROM `tabBin` b
+		INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
+		INNER JOIN `tabItem Reorder` ir ON ir.parent = b.item_code AND ir.parenttype = 'Item' AND ir.warehouse = b.warehouse
+		WHERE b.item_code IN %(item_codes)s
+		AND b.warehouse IN %(warehouses)s
+		AND w.company != %(main_company)s
+		AND ir.warehouse_reorder_level > 0
+		AND b.actual_qty <= ir.warehouse_reorder_level
+		AND b.actual_qty >= 0
+	""", {"item_codes": item_codes, "warehouses": warehouses, "main_company": MAIN_COMPANY})
+
+	count = 0
+	for item_code, warehouse in low_pairs:
+		if (item_code, warehouse) not in pairs:
+			continue
+
+		frappe.enqueue(
+			"north_medical_portal.utils.reorder_events.evaluate_reorder",
+			queue="short",
+			job_id=f"north_medical_portal:reorder:{warehouse}:{item_code}",
+			deduplicate=True,
+			item_code=item_code,
+			warehouse=warehouse
+		)
+		count += 1
+
+	return count
+
+
+def evaluate_reorder(item_code, warehouse):
+	"""
+	Arka plan işi - tek (ürün, depo) çiftini değerlendir ve günün Material Request'ine ekle
+
+	İş kuyrukta beklerken stok tekrar yükselmiş olabilir; seviye yeniden kontrol edilir.
+
+	Returns:
+		dict: create_auto_material_requests istatistikleri
+	"""
+	low_stock_items = get_low_stock_items(warehouses=[warehouse], item_codes=[item_code])
+	return create_auto_material_requests(low_stock_items)
+
+
+def _enqueue_pending_reorder_checks():
+	pending = getattr(frappe.local, "pending_reorder_checks", None) or set()
+	frappe.local.pending_reorder_checks = None
+
+	try:
+		enqueue_reorder_checks(pending)
+	except Exception:
+		# Kontrol hatası stok işlemini etkilememeli, günlük mutabakat taraması yine yakalar
+		frappe.log_error(title="Reorder Event Enqueue Error")
+
+
+def _discard_pending_reorder_checks():
+	frappe.local.pending_reorder_checks = None
@@ -0,0 +1,348 @@
+"""
+Tüketim tahminine dayalı dinamik reorder seviyeleri
+
+Bayi depolarındaki Material Issue hareketleri (Stock Ledger Entry) tek sorguyla günlük
+(ürün, depo, gün) toplamları olarak çekilir ve NumPy ile tüm seriler tek geçişte işlenir:
+
+- Günlük tüketim: son `forecast_window_days` günün hareketli ortalaması
+- Mevsimsellik: haftanın günü katsayıları (gün ortalaması / genel ortalama)
+- Tedarik süresi talebi: önümüzdeki `forecast_lead_time_days` günün katsayılarla ağırlıklı tüketimi
+- Güvenlik stoğu: katsayı × günlük tüketim std. sapması × √tedarik süresi
+
+reorder level = tedarik süresi talebi + güvenlik stoğu
+reorder qty = önümüzdeki `forecast_review_days` günün beklenen tüketimi
+
+Dealer Settings > Tahmin Modu: "Propose" sonuçları Reorder Level Proposal olarak kaydeder,
+"Auto Apply" doğrudan Item Reorder'a yazar (bkz. utils.reorder_levels.upsert_reorder_levels).
+"""
+import time
+
+import frappe
+import numpy as np
+from frappe.utils import add_days, getdate, now, nowdate
+
+from north_medical_portal.utils.reorder_levels import upsert_reorder_levels
+from north_medical_portal.utils.stock import MAIN_COMPANY
+
+PROPOSAL_DOCTYPE = "Reorder Level Proposal"
+
+# Tek bulk_update / bulk_insert'e giden en fazla satır
+APPLY_CHUNK_SIZE = 1000
+
+DEFAULT_FORECAST_SETTINGS = {
+	"forecast_history_days": 90,
+	"forecast_window_days": 28,
+	"forecast_lead_time_days": 7,
+	"forecast_review_days": 14,
+	"forecast_safety_factor": 1.65
+}
+
+
+def run_reorder_forecast():
+	"""Gece çalışan iş - Dealer Settings'teki moda göre önerileri oluştur veya uygula"""
+	mode = frappe.db.get_single_value("Dealer Settings", "reorder_forecast_mode")
+	if mode not in ("Propose", "Auto Apply"):
+		return
+
+	return update_reorder_forecast(apply=mode == "Auto Apply")
+
+
+def update_reorder_forecast(apply=False, settings=None):
+	"""
+	Tüm bayi (ürün, depo) serileri için reorder seviyelerini tahmin et
+
+	Args:
+		apply (bool): True ise öneriler Item Reorder'a da yazılır
+		settings (dict, optional): DEFAULT_FORECAST_SETTINGS anahtarları; verilmezse Dealer Settings
+
+	Returns:
+		dict: {"series", "proposals", "applied", "timings"}
+	"""
+	started = time.monotonic()
+	timings = {}
+	settings = settings or get_forecast_settings()
+
+	today = getdate(nowdate())
+	from_date = add_days(today, -settings["forecast_history_days"])
+
+	keys, matrix = get_consumption_matrix(from_date, settings["forecast_history_days"])
+	timings["query"] = _elapsed(started)
+
+	forecast = forecast_reorder_levels(matrix, getdate(from_date).weekday(), settings)
+	timings["forecast"] = _elapsed(started)
+
+	proposals = build_proposals(keys, forecast)
+	timings["compare"] = _elapsed(started)
+
+	applied = apply_proposals(proposals) if apply else 0
+	save_proposals(proposals, status="Applied" if apply else "Open", forecast_date=today)
+	frappe.db.commit()
+	timings["total"] = _elapsed(started)
+
+	return {
+		"series": len(keys),
+		"proposals": len(proposals),
+		"applied": applied,
+		"timings": timings
+	}
+
+
+def get_forecast_settings():
+	"""Tahmin parametreleri - Dealer Settings'te boş olanlar için varsayılanlar"""
+	values = frappe.db.get_singles_dict("Dealer Settings")
+	settings = {}
+	for fieldname, default in DEFAULT_FORECAST_SETTINGS.items():
+		value = values.get(fieldname)
+		settings[fieldname] = type(default)(value) if value else default
+	return settings
+
+
+def get_consumption_matrix(from_date, days):
+	"""
+	Material Issue tüketimini (seri × gün) matrisine çevir
+
+	Args:
+		from_date: İlk gün (matrisin 0. kolonu)
+		days (int): Gün sayısı - bugün dahil değil
+
+	Returns:
+		tuple: ([(item_code, warehouse, company), ...], np.ndarray shape (seri, gün))
+	"""
+	rows = frappe.db.sql("""
+		SELECT
+			sle.item_code,
+			sle.warehouse,
+			w.company,
+			DATEDIFF(sle.posting_date, %(from_date)s) AS day,
+			SUM(-sle.actual_qty) AS qty
+		FROM `tabStock Ledger Entry` sle
+		INNER JOIN `tabWarehouse` w ON w.name = sle.warehouse
+		INNER JOIN `tabStock Entry` se ON se.name = sle.voucher_no
+		WHERE sle.voucher_type = 'Stock Entry'
+		AND se.purpose = 'Material Issue'
+		AND sle.is_cancelled = 0
+		AND sle.actual_qty < 0
+		AND sle.posting_date >= %(from_date)s
+		AND sle.posting_date < %(to_date)s
+		AND w.company != %(main_company)s
+		GROUP BY sle.item_code, sle.warehouse, w.company, sle.posting_date
+	""", {
+		"from_date": from_date,
+		"to_date": add_days(from_date, days),
+		"main_company": MAIN_COMPANY
+	})
+
+	key_index = {}
+	series = np.empty(len(rows), dtype=np.int64)
+	day = np.empty(len(rows), dtype=np.int64)
+	qty = np.empty(len(rows), dtype=np.float64)
+	for position, (item_code, warehouse, company, row_day, row_qty) in enumerate(rows):
+		series[position] = key_index.setdefault((item_code, warehouse, company), len(key_index))
+		day[position] = row_day
+		qty[position] = row_qty
+
+	matrix = np.zeros((len(key_index), days), dtype=np.float64)
+	np.add.at(matrix, (series, day), qty)
+
+	return list(key_index), matrix
+
+
+def forecast_reorder_levels(matrix, first_weekday, settings):
+	"""
+	Tüketim matrisinden reorder seviyelerini vektörel olarak hesapla
+
+	Args:
+		matrix (np.ndarray): (seri, gün) günlük tüketim - son kolon dün
+		first_weekday (int): 0. kolonun haftanın günü (Pazartesi=0)
+		settings (dict): get_forecast_settings çıktısı
+
+	Returns:
+		dict: Seri başına diziler - avg_daily, std_daily, lead_time_demand, safety_stock,
+			reorder_level, reorder_qty
+	"""
+	series_count, days = matrix.shape
+	lead_time = max(settings["forecast_lead_time_days"], 1)
+	review_days = max(settings["forecast_review_days"], 1)
+	window = min(max(settings["forecast_window_days"], 1), days) if days else 0
+
+	if not series_count or not days:
+		empty = np.zeros(series_count)
+		return {key: empty for key in (
+			"avg_daily", "std_daily", "lead_time_demand", "safety_stock", "reorder_level", "reorder_qty"
+		)}
+
+	avg_daily = matrix[:, -window:].mean(axis=1)
+	std_daily = matrix.std(axis=1, ddof=1) if days > 1 else np.zeros(series_count)
+
+	# Haftanın günü katsayıları - tüketimi olmayan seriler için 1
+	weekdays = (first_weekday + np.arange(days)) % 7
+	overall_mean = matrix.mean(axis=1)
+	weekday_factors = np.ones((series_count, 7))
+	has_consumption = overall_mean > 0
+	for weekday in range(7):
+		columns = weekdays == weekday
+		if columns.any():
+			weekday_factors[has_consumption, weekday] = (
+				matrix[has_consumption][:, columns].mean(axis=1) / overall_mean[has_consumption]
+			)
+
+	# Bugünden itibaren gelecek günlerin haftanın günleri
+	next_weekday = (first_weekday + days) % 7
+	lead_weekdays = (next_weekday + np.arange(lead_time)) % 7
+	review_weekdays = (next_weekday + np.arange(review_days)) % 7
+
+	lead_time_demand = avg_daily * weekday_factors[:, lead_weekdays].sum(axis=1)
+	review_demand = avg_daily * weekday_factors[:, review_weekdays].sum(axis=1)
+	safety_stock = settings["forecast_safety_factor"] * std_daily * np.sqrt(lead_time)
+
+	return {
+		"avg_daily": avg_daily,
+		"std_daily": std_daily,
+		"lead_time_demand": lead_time_demand,
+		"safety_stock": safety_stock,
+		"reorder_level": np.ceil(lead_time_demand + safety_stock),
+		"reorder_qty": np.maximum(np.ceil(review_demand), 1)
+	}
+
+
+def build_proposals(keys, forecast):
+	"""
+	Mevcut Item Reorder değerlerinden farklı olan tahminleri öneri satırlarına çevir
+
+	Son pencerede tüketimi olmayan seriler atlanır (mevcut seviye korunur).
+
+	Returns:
+		list: frappe._dict satırları
+	"""
+	if not keys:
+		return []
+
+	current_levels = {}
+	for row in frappe.get_all(
+		"Item Reorder",
+		filters={
+			"parenttype": "Item",
+			"parent": ["in", list({item_code for item_code, _warehouse, _company in keys})]
+		},
+		fields=["parent", "warehouse", "warehouse_reorder_level", "warehouse_reorder_qty"]
+	):
+		current_levels[(row.parent, row.warehouse)] = row
+
+	proposals = []
+	for position in np.flatnonzero(forecast["avg_daily"] > 0):
+		item_code, warehouse, company = keys[position]
+		current = current_levels.get((item_code, warehouse)) or frappe._dict()
+		reorder_level = float(forecast["reorder_level"][position])
+		reorder_qty = float(forecast["reorder_qty"][position])
+
+		if (current.warehouse_reorder_level, current.warehouse_reorder_qty) == (reorder_level, reorder_qty):
+			continue
+
+		proposals.append(frappe._dict(
+			item_code=item_code,
+			warehouse=warehouse,
+			company=company,
+			current_reorder_level=current.warehouse_reorder_level or 0,
+			current_reorder_qty=current.warehouse_reorder_qty or 0,
+			proposed_reorder_level=reorder_level,
+			proposed_reorder_qty=reorder_qty,
+			avg_daily_consumption=round(float(forecast["avg_daily"][position]), 3),
+			consumption_std=round(float(forecast["std_daily"][position]), 3),
+			lead_time_demand=round(float(forecast["lead_time_demand"][position]), 3),
+			safety_stock=round(float(forecast["safety_stock"][position]), 3)
+		))
+
+	return proposals
+
+
+def apply_proposals(proposals):
+	"""
+	Önerileri Item Reorder'a küme bazında yaz
+
+	Returns:
+		int: Yazılan satır sayısı
+	"""
+	applied = 0
+	for start in range(0, len(proposals), APPLY_CHUNK_SIZE):
+		rows = [
+			frappe._dict(
+				item_code=proposal.item_code,
+				warehouse=proposal.warehouse,
+				reorder_level=proposal.proposed_reorder_level,
+				reorder_qty=proposal.proposed_reorder_qty
+			)
+			for proposal in proposals[start : start + APPLY_CHUNK_SIZE]
+		]
+		results, _errors = upsert_reorder_levels(rows, skip_invalid=True)
+		applied += len(results)
+
+	return applied
+
+
+def save_proposals(proposals, status="Open", forecast_date=None):
+	"""Öneri tablosunu bu çalışmanın sonuçlarıyla değiştir"""
+	frappe.db.delete(PROPOSAL_DOCTYPE)
+	if not proposals:
+		return
+
+	fields = [
+		"item_code", "warehouse", "company",
+		"current_reorder_level", "current_reorder_qty",
+		"proposed_reorder_level", "proposed_reorder_qty",
+		"avg_daily_consumption", "consumption_std", "lead_time_demand", "safety_stock"
+	]
+	timestamp = now()
+	user = frappe.session.user
+	forecast_date = forecast_date or nowdate()
+
+	frappe.db.bulk_insert(
+		PROPOSAL_DOCTYPE,
+		fields=["name", "status", "forecast_date", *fields, "owner", "modified_by", "creation", "modified"],
+		values=[
+			(
+				frappe.generate_hash(length=10), status, forecast_date,
+				*[proposal[fieldname] for fieldname in fields],
+				user, user, timestamp, timestamp
+			)
+			for proposal in proposals
+		],
+		chunk_size=APPLY_CHUNK_SIZE
+	)
+
+
+@frappe.whitelist()
+def apply_reorder_level_proposals(proposals=None):
+	"""
+	Açık önerileri Item Reorder'a uygula (Propose modunda gözden geçirme sonrası)
+
+	Args:
+		proposals (list, optional): Öneri adları; verilmezse tüm açık öneriler
+
+	Returns:
+		dict: {"applied"}
+	"""
+	frappe.only_for("System Manager")
+
+	if isinstance(proposals, str):
+		proposals = frappe.parse_json(proposals)
+
+	filters = {"status": "Open"}
+	if proposals:
+		filters["name"] = ["in", proposals]
+
+	rows = frappe.get_all(
+		PROPOSAL_DOCTYPE,
+		filters=filters,
+		fields=["name", "item_code", "warehouse", "proposed_reorder_level", "proposed_reorder_qty"]
+	)
+
+	applied = apply_proposals(rows)
+	if rows:
+		frappe.db.set_value(PROPOSAL_DOCTYPE, {"name": ["in", [row.name for row in rows]]}, "status", "Applied")
+	frappe.db.commit()
+
+	return {"applied": applied}
+
+
+def _elapsed(started):
+	return round(time.monotonic() - started, 3)
@@ -0,0 +1,182 @@
+"""
+Item Reorder (reorder_levels child tablosu) toplu güncelleme işlemleri
+
+Item dokümanını yükleyip kaydetmek yerine `tabItem Reorder` satırlarını küme bazında
+günceller / ekler; tüm Item validasyonlarını ve child tablo yeniden yazımını atlar.
+"""
+import math
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now
+
+from north_medical_portal.utils.stock_cache import queue_stock_version_bump
+
+
+def validate_reorder_rows(rows, warehouse_names):
+	"""
+	Reorder satırlarını tek geçişte doğrula
+
+	Args:
+		rows (list): [{"item_code", "warehouse", "reorder_level", "reorder_qty"}, ...]
+			reorder_level / reorder_qty None ise mevcut değer korunur
+		warehouse_names (set): Kullanıcının yetkili olduğu depolar
+
+	Returns:
+		tuple: (geçerli satırlar, [{"row": index, "item_code", "warehouse", "error"}, ...])
+	"""
+	item_codes = {row.get("item_code") for row in rows if row.get("item_code")}
+	existing_items = set(frappe.get_all("Item", filters={"name": ["in", list(item_codes)]}, pluck="name")) if item_codes else set()
+
+	valid_rows = []
+	errors = []
+	seen = set()
+
+	for index, row in enumerate(rows):
+		item_code = row.get("item_code")
+		warehouse = row.get("warehouse")
+		error = None
+
+		if not item_code or not warehouse:
+			error = _("Ürün kodu ve depo zorunludur")
+		elif warehouse not in warehouse_names:
+			error = _("Bu depo için yetkiniz bulunmamaktadır")
+		elif item_code not in existing_items:
+			error = _("Ürün bulunamadı: {0}").format(item_code)
+		elif (item_code, warehouse) in seen:
+			error = _("Aynı ürün/depo birden fazla kez verilmiş")
+		else:
+			for field, label in (("reorder_level", _("Min. stok seviyesi")), ("reorder_qty", _("Sipariş miktarı"))):
+				value = row.get(field)
+				if value in (None, ""):
+					continue
+				if not _is_number(value):
+					error = _("{0} sayı olmalıdır: {1}").format(label, value)
+					break
+				if flt(value) < 0:
+					error = _("Negatif değer girilemez")
+					break
+
+		if error:
+			errors.append({"row": index, "item_code": item_code, "warehouse": warehouse, "error": error})
+			continue
+
+		seen.add((item_code, warehouse))
+		valid_rows.append(frappe._dict(
+			item_code=item_code,
+			warehouse=warehouse,
+			reorder_level=_to_value(row.get("reorder_level")),
+			reorder_qty=_to_value(row.get("reorder_qty"))
+		))
+
+	return valid_rows, errors
+
+
+def upsert_reorder_levels(rows, skip_invalid=False):
+	"""
+	Doğrulanmış satırları `tabItem Reorder` tablosuna küme bazında yaz
+
+	Mevcut satırlar tek bulk_update ile güncellenir, eksikler tek bulk_insert ile eklenir.
+	Stok cache versiyonu etkilenen depolar için commit sonrası bir kez artırılır.
+
+	Args:
+		rows (list): validate_reorder_rows'dan dönen geçerli satırlar
+		skip_invalid (bool): True ise hatalı satırlar atlanıp diğerleri yazılır,
+			False ise herhangi bir hata varsa hiçbir şey yazılmaz
+
+	Returns:
+		tuple: (sonuç satırları, hatalar) - reorder_level varken reorder_qty boş kalan satırlar hatadır
+	"""
+	if not rows:
+		return [], []
+
+	item_codes = list({row.item_code for row in rows})
+	existing_rows = frappe.get_all(
+		"Item Reorder",
+		filters={"parenttype": "Item", "parentfield": "reorder_levels", "parent": ["in", item_codes]},
+		fields=["name", "parent", "warehouse", "idx", "warehouse_reorder_level", "warehouse_reorder_qty"]
+	)
+
+	existing = {}
+	max_idx = {}
+	for existing_row in existing_rows:
+		existing[(existing_row.parent, existing_row.warehouse)] = existing_row
+		max_idx[existing_row.parent] = max(max_idx.get(existing_row.parent, 0), existing_row.idx or 0)
+
+	updates = {}
+	inserts = []
+	results = []
+	errors = []
+
+	for index, row in enumerate(rows):
+		current = existing.get((row.item_code, row.warehouse))
+		level = row.reorder_level if row.reorder_level is not None else flt(current.warehouse_reorder_level if current else 0)
+		qty = row.reorder_qty if row.reorder_qty is not None else flt(current.warehouse_reorder_qty if current else 0)
+
+		# Validation: Eğer reorder_level varsa reorder_qty de olmalı
+		if level and not qty:
+			errors.append({
+				"row": index,
+				"item_code": row.item_code,
+				"warehouse": row.warehouse,
+				"error": _("Min. stok seviyesi belirlendiğinde sipariş miktarı da belirlenmelidir")
+			})
+			continue
+
+		if current:
+			updates[current.name] = {"warehouse_reorder_level": level, "warehouse_reorder_qty": qty}
+		else:
+			max_idx[row.item_code] = max_idx.get(row.item_code, 0) + 1
+			inserts.append((row.item_code, row.warehouse, max_idx[row.item_code], level, qty))
+
+		results.append({"item_code": row.item_code, "warehouse": row.warehouse, "reorder_level": level, "reorder_qty": qty})
+
+	if errors and not skip_invalid:
+		return results, errors
+
+	if updates:
+		frappe.db.bulk_update("Item Reorder", updates)
+
+	if inserts:
+		timestamp = now()
+		user = frappe.session.user
+		frappe.db.bulk_insert(
+			"Item Reorder",
+			fields=[
+				"name", "parent", "parenttype", "parentfield", "idx", "docstatus",
+				"warehouse", "warehouse_group", "material_request_type",
+				"warehouse_reorder_level", "warehouse_reorder_qty",
+				"owner", "modified_by", "creation", "modified"
+			],
+			values=[
+				(
+					frappe.generate_hash(length=10), item_code, "Item", "reorder_levels", idx, 0,
+					warehouse, warehouse, "Purchase",
+					level, qty,
+					user, user, timestamp, timestamp
+				)
+				for item_code, warehouse, idx, level, qty in inserts
+			]
+		)
+
+	# Item doküman cache'ini temizle - reorder_levels doğrudan tabloya yazıldı
+	for item_code in item_codes:
+		frappe.clear_document_cache("Item", item_code)
+
+	queue_stock_version_bump({row["warehouse"] for row in results})
+
+	return results, errors
+
+
+def _is_number(value):
+	"""Değer sayıya çevrilebiliyor mu - flt() sayı olmayan metni sessizce 0 yapar"""
+	try:
+		return math.isfinite(float(value))
+	except (TypeError, ValueError):
+		return False
+
+
+def _to_value(value):
+	if value is None or value == "":
+		return None
+	return flt(value)
@@ -0,0 +1,140 @@
+"""
+Günlük reorder kontrolünün şirket başına paralel çalıştırılması
+
+Tek worker'da tek uzun iş yerine her bayi şirketi için `long` kuyruğuna ayrı bir iş alınır.
+İşler Material Request'leri şirket kilidi altında yazar (bkz. utils.stock.create_auto_material_requests);
+çakışan çalışmalar ve manuel `trigger_reorder_check` aynı ürünü iki kez talep edemez.
+
+Sonuçlar tek bir Reorder Run kaydında toplanır: her iş kendi satırını (Reorder Run Company)
+ekler ve toplamları tek bir atomik UPDATE ile artırır; son biten iş çalışmayı kapatır.
+"""
+import time
+
+import frappe
+from frappe.utils import now_datetime
+
+from north_medical_portal.utils.stock import MAIN_COMPANY, create_auto_material_requests, get_low_stock_items
+
+RUN_DOCTYPE = "Reorder Run"
+
+SUMMARY_FIELDS = ("items_found", "material_requests_created", "material_requests_updated", "skipped", "errors")
+
+
+def enqueue_reorder_run(companies=None):
+	"""
+	Günlük zamanlanmış iş - her bayi şirketi için reorder işini kuyruğa al
+
+	Args:
+		companies (list, optional): Sadece bu şirketler; verilmezse ana şirket dışındaki tüm şirketler
+
+	Returns:
+		str: Reorder Run adı veya şirket yoksa None
+	"""
+	if companies is None:
+		companies = frappe.get_all(
+			"Company",
+			filters={"name": ["!=", MAIN_COMPANY]},
+			order_by="name",
+			pluck="name"
+		)
+
+	if not companies:
+		return None
+
+	run = frappe.new_doc(RUN_DOCTYPE)
+	run.status = "Queued"
+	run.started_at = now_datetime()
+	run.total_companies = len(companies)
+	run.flags.ignore_permissions = True
+	run.insert()
+	# İşler kaydı görebilsin
+	frappe.db.commit()
+
+	for idx, company in enumerate(companies, start=1):
+		frappe.enqueue(
+			"north_medical_portal.utils.reorder_scheduler.run_company_reorder",
+			queue="long",
+			job_id=f"north_medical_portal:reorder_run:{run.name}:{company}",
+			deduplicate=True,
+			run_name=run.name,
+			company=company,
+			idx=idx
+		)
+
+	return run.name
+
+
+def run_company_reorder(run_name, company, idx=1):
+	"""
+	Arka plan işi - tek şirketin reorder kontrolünü çalıştır ve sonucu çalışmaya ekle
+
+	Args:
+		run_name (str): Reorder Run adı
+		company (str): Şirket
+		idx (int): Şirket satırının sırası
+	"""
+	started = time.monotonic()
+	result = {"company": company, "status": "Completed", "error": None}
+
+	frappe.db.set_value(RUN_DOCTYPE, {"name": run_name, "status": "Queued"}, "status", "Running", update_modified=False)
+
+	try:
+		low_stock_items = get_low_stock_items([company])
+		stats = create_auto_material_requests(low_stock_items)
+		result.update({field: stats.get(field, 0) for field in SUMMARY_FIELDS if field != "items_found"})
+		result["items_found"] = len(low_stock_items)
+		if stats["locked_companies"]:
+			result["status"] = "Locked"
+			result["errors"] += 1
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(f"Reorder kontrolü hatası ({company}): {str(e)}", "Reorder Run")
+		result.update({"status": "Failed", "error": str(e), "errors": 1})
+
+	result["duration"] = round(time.monotonic() - started, 3)
+	record_company_result(run_name, idx, result)
+
+
+def record_company_result(run_name, idx, result):
+	"""
+	Şirket sonucunu Reorder Run'a yaz
+
+	Paralel işler aynı dokümanı kaydetmeye çalışmaz (TimestampMismatchError olurdu): satır
+	doğrudan eklenir, toplamlar tek bir atomik UPDATE ile artırılır.
+	"""
+	frappe.db.bulk_insert(
+		"Reorder Run Company",
+		fields=[
+			"name", "parent", "parenttype", "parentfield", "idx",
+			"company", "status", "duration", "error", *SUMMARY_FIELDS
+		],
+		values=[(
+			frappe.generate_hash(length=10), run_name, RUN_DOCTYPE, "companies", idx,
+			result["company"], result["status"], result["duration"], result["error"],
+			*[result.get(field) or 0 for field in SUMMARY_FIELDS]
+		)]
+	)
+
+	increments = ", ".join(f"`{field}` = `{field}` + %({field})s" for field in SUMMARY_FIELDS)
+	frappe.db.sql(f"""
+		UPDATE `tabReorder Run`
+		SET completed_companies = completed_companies + 1, {increments}
+		WHERE name = %(name)s
+	""", {"name": run_name, **{field: result.get(field) or 0 for field in SUMMARY_FIELDS}})
+	frappe.db.commit()
+
+	_finish_run_if_complete(run_name)
+
+
+def _finish_run_if_complete(run_name):
+	run = frappe.db.get_value(
+		RUN_DOCTYPE, run_name, ["total_companies", "completed_companies", "errors"], as_dict=True
+	)
+	if not run or run.completed_companies < run.total_companies:
+		return
+
+	frappe.db.set_value(RUN_DOCTYPE, run_name, {
+		"status": "Completed With Errors" if run.errors else "Completed",
+		"finished_at": now_datetime()
+	}, update_modified=False)
+	frappe.db.commit()
@@ -1,35 +1,105 @@
+import time
+
 import frappe
 from frappe.utils import nowdate
 
+from north_medical_portal.utils.locks import redis_lock
+
+# Ana şirket - bayi olmayan tek şirket
+MAIN_COMPANY = "North Medical"
+
+MR_TYPES = ("Purchase", "Material Transfer", "Material Issue", "Manufacture")
+
+# Şirketin günlük Material Request'lerine yazan işler (günlük tarama, olay tabanlı kontrol) bu kilidi paylaşır
+REORDER_LOCK_TIMEOUT = 600
+REORDER_LOCK_WAIT = 30
+
+
 def check_reorder_levels():
-	"""Günlük stok kontrolü - reorder level altına düşen ürünleri tespit et"""
-	# Sadece bayi şirketlerini kontrol et
-	companies = frappe.get_all(
-		"Company",
-		filters={"name": ["!=", "North Medical"]},
-		fields=["name"]
-	)
-	
-	for company in companies:
-		check_company_reorder_levels(company.name)
+	"""Stok kontrolü - reorder level altına düşen ürünleri tespit et
+
+	Düşük stok gün içinde olay tabanlı olarak (utils.reorder_events) zaten talep edilir;
+	bu çalışma kaçan satırları tamamlayan bir mutabakat taramasıdır. Tüm bayi şirketleri
+	tek işte, tek sorguyla değerlendirilir (bkz. run_reorder_engine). Zamanlanmış günlük
+	çalışma şirket başına paralel işler kullanır (utils.reorder_scheduler).
+	"""
+	return run_reorder_engine()
+
 
 def check_company_reorder_levels(company):
 	"""Belirli bir şirket için reorder level kontrolü"""
-	warehouses = frappe.get_all(
-		"Warehouse",
-		filters={"company": company, "is_group": 0},
-		fields=["name"]
-	)
-	
-	if not warehouses:
-		return
-	
-	warehouse_names = [w.name for w in warehouses]
-	
-	# Reorder level altına düşen ürünleri bul
+	return run_reorder_engine(companies=[company])
+
+
+def run_reorder_engine(companies=None, dry_run=False):
+	"""
+	Reorder motoru - düşük stoklu ürünleri bulup Material Request'leri toplu oluştur
+
+	Şirket başına sorgu ve MR başına exists/get_value/commit yerine:
+	1. Tüm bayi depolarındaki düşük stok satırları tek sorguyla çekilir
+	2. Kaynak depo haritası bir kez; bugün zaten talep edilmiş ürünler şirket kilidi altında
+	   şirket başına bir kez okunur
+	3. Material Request'ler bellekte kurulur, savepoint ile ayrı ayrı eklenir ve şirket başına tek commit yapılır
+
+	Args:
+		companies (list, optional): Sadece bu şirketler; verilmezse tüm bayi şirketleri
+		dry_run (bool): True ise Material Request'ler kurulur ama kaydedilmez (bkz. utils.reorder_benchmark)
+
+	Returns:
+		dict: {"companies", "items_found", "material_requests_created", "skipped", "errors", "timings"}
+	"""
+	started = time.monotonic()
+	timings = {}
+
+	low_stock_items = get_low_stock_items(companies)
+	timings["query"] = _elapsed(started)
+
+	stats = create_auto_material_requests(low_stock_items, timings=timings, dry_run=dry_run)
+	timings["total"] = _elapsed(started)
+
+	stats.update({
+		"companies": len({item.company for item in low_stock_items}),
+		"items_found": len(low_stock_items),
+		"timings": timings
+	})
+	return stats
+
+
+def get_low_stock_items(companies=None, warehouses=None, item_codes=None):
+	"""
+	Reorder level altına düşen ürünleri tüm bayi şirketleri için tek sorguda bul
+
+	Args:
+		companies (list, optional): Sadece bu şirketler; verilmezse ana şirket dışındaki tüm şirketler
+		warehouses (list, optional): Sadece bu depolar
+		item_codes (list, optional): Sadece bu ürünler
+
+	Returns:
+		list: company, item_code, item_name, warehouse, actual_qty, projected_qty,
+			warehouse_reorder_level, warehouse_reorder_qty, material_request_type
+	"""
+	if companies is None:
+		# Sadece bayi şirketlerini kontrol et
+		conditions = "w.company != %(main_company)s"
+		values = {"main_company": MAIN_COMPANY}
+	elif companies:
+		conditions = "w.company IN %(companies)s"
+		values = {"companies": list(companies)}
+	else:
+		return []
+
+	for field, filter_values in (("b.warehouse", warehouses), ("b.item_code", item_codes)):
+		if filter_values is not None:
+			if not filter_values:
+				return []
+			key = field.split(".")[1] + "s"
+			conditions += f" AND {field} IN %({key})s"
+			values[key] = list(filter_values)
+
 	# actual_qty kullanıyoruz çünkü stok sayfasında da actual_qty gösteriliyor
-	low_stock_items = frappe.db.sql("""
-		SELECT 
+	return frappe.db.sql(f"""
+		SELECT
+			w.company,
 			b.item_code,
 			i.item_name,
 			b.warehouse,
@@ -39,113 +109,308 @@ def check_company_reorder_levels(company):
 			ir.warehouse_reorder_qty,
 			ir.material_request_type
 		FROM `tabBin` b
+		INNER JOIN `tabWarehouse` w ON w.name = b.warehouse AND w.is_group = 0
 		INNER JOIN `tabItem` i ON i.name = b.item_code
-		INNER JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.warehouse = b.warehouse
-		WHERE b.warehouse IN %(warehouses)s
+		INNER JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.parenttype = 'Item' AND ir.warehouse = b.warehouse
+		WHERE {conditions}
 		AND ir.warehouse_reorder_level > 0
 		AND b.actual_qty <= ir.warehouse_reorder_level
 		AND b.actual_qty >= 0
-	""", {"warehouses": warehouse_names}, as_dict=True)
-	
-	if low_stock_items:
-		# Material Request oluştur
-		create_auto_material_request(company, low_stock_items)
+		ORDER BY w.company, b.warehouse, b.item_code
+	""", values, as_dict=True)
+
 
 def create_auto_material_request(company, items):
 	"""Otomatik Material Request oluştur
 	Returns: Oluşturulan Material Request sayısı
 	"""
-	mr_count = 0
-	
-	# Material Request tipine göre grupla
-	request_type_items = {}
 	for item in items:
-		# Item Reorder'daki material_request_type'ı kullan
-		# "Transfer" -> "Material Transfer", diğerleri aynı kalır
-		mr_type = item.material_request_type or "Purchase"
-		if mr_type == "Transfer":
-			mr_type = "Material Transfer"
-		elif mr_type not in ["Purchase", "Material Transfer", "Material Issue", "Manufacture"]:
-			mr_type = "Purchase"  # Varsayılan olarak Purchase
-		
-		if mr_type not in request_type_items:
-			request_type_items[mr_type] = {}
-		
-		# Warehouse'a göre de grupla
-		warehouse = item.warehouse
-		if warehouse not in request_type_items[mr_type]:
-			request_type_items[mr_type][warehouse] = []
-		request_type_items[mr_type][warehouse].append(item)
-	
-	# Her Material Request tipi ve warehouse için ayrı MR oluştur
-	for mr_type, warehouse_items in request_type_items.items():
-		for warehouse, warehouse_item_list in warehouse_items.items():
-			# Bugün için zaten Material Request var mı kontrol et
-			existing_mr = frappe.db.exists(
-				"Material Request",
-				{
-					"company": company,
-					"material_request_type": mr_type,
-					"schedule_date": nowdate(),
-					"docstatus": ["<", 2]
-				}
-			)
-			
-			if existing_mr:
+		item.setdefault("company", company)
+
+	return create_auto_material_requests(items)["material_requests_created"]
+
+
+def create_auto_material_requests(items, timings=None, dry_run=False):
+	"""
+	Düşük stoklu ürünlerden (şirket, MR tipi, depo) başına günlük Draft Material Request oluştur
+
+	Grup için bugün Draft bir Material Request varsa, içinde olmayan ürünler ona eklenir;
+	submit edilmiş bir Material Request varsa grup atlanır. Her şirketin bugünkü talepleri
+	şirket kilidi altında okunup yazılır; çakışan çalışmalar (günlük tarama, olay tabanlı
+	kontrol, manuel tetikleme) aynı ürünü iki kez talep edemez.
+
+	Args:
+		items (list): get_low_stock_items satırları (company alanı dahil)
+		timings (dict, optional): Süre ölçümlerinin ekleneceği sözlük
+		dry_run (bool): True ise kilit alınmaz, hiçbir şey yazılmaz; sayılar oluşturulacak/güncellenecek
+			Material Request'leri gösterir
+
+	Returns:
+		dict: {"material_requests_created", "material_requests_updated", "material_requests",
+			"items_requested", "skipped", "errors", "locked_companies"}
+	"""
+	stats = {
+		"material_requests_created": 0,
+		"material_requests_updated": 0,
+		"items_requested": 0,
+		"material_requests": [],
+		"skipped": 0,
+		"errors": 0,
+		"locked_companies": []
+	}
+	if not items:
+		return stats
+
+	started = time.monotonic()
+	today = nowdate()
+
+	# şirket -> (tip, depo) grupları
+	groups = {}
+	for item in items:
+		key = (get_material_request_type(item.material_request_type), item.warehouse)
+		groups.setdefault(item.company, {}).setdefault(key, []).append(item)
+
+	source_warehouses = get_source_warehouse_map(list(groups))
+
+	if timings is not None:
+		timings["prepare"] = _elapsed(started)
+	started = time.monotonic()
+
+	for company, company_groups in groups.items():
+		if dry_run:
+			requested_today = get_requested_today([company], today)
+			for (mr_type, warehouse), group_items in company_groups.items():
+				_write_material_request(
+					company, mr_type, warehouse, group_items,
+					requested_today.get((company, mr_type, warehouse)),
+					source_warehouses.get(company), today, stats, dry_run=True
+				)
+			continue
+
+		with redis_lock(get_reorder_lock_name(company), timeout=REORDER_LOCK_TIMEOUT, wait=REORDER_LOCK_WAIT) as acquired:
+			if not acquired:
+				frappe.log_error(f"Reorder kilidi alınamadı: {company}", "Create Auto Material Request")
+				stats["locked_companies"].append(company)
 				continue
-			
-			# Material Request oluştur
-			mr = frappe.new_doc("Material Request")
-			mr.material_request_type = mr_type
-			mr.company = company
-			mr.requested_by = "Administrator"
-			mr.schedule_date = nowdate()
-			mr.transaction_date = nowdate()
-			
-			# Material Transfer ise kaynak depo belirle
-			if mr_type == "Material Transfer":
-				# Ana şirketin ana deposunu kaynak olarak kullan
-				main_company = frappe.db.get_value("Company", {"name": ["!=", company]}, "name", order_by="creation asc")
-				if main_company:
-					# Ana şirketin ana deposunu bul
-					main_warehouse = frappe.db.get_value(
-						"Warehouse",
-						{"company": main_company, "is_group": 0},
-						"name",
-						order_by="creation asc"
-					)
-					if main_warehouse:
-						mr.set_from_warehouse = main_warehouse
-			
-			for item in warehouse_item_list:
-				# actual_qty kullanıyoruz çünkü stok sayfasında da actual_qty gösteriliyor
-				current_qty = item.actual_qty or 0
-				reorder_qty = item.warehouse_reorder_qty or (item.warehouse_reorder_level - current_qty)
-				if reorder_qty > 0:
-					item_dict = {
-						"item_code": item.item_code,
-						"qty": reorder_qty,
-						"warehouse": warehouse,
-						"schedule_date": nowdate()
-					}
-					
-					# Material Transfer ise kaynak depo da ekle
-					if mr_type == "Material Transfer" and mr.set_from_warehouse:
-						item_dict["from_warehouse"] = mr.set_from_warehouse
-					
-					mr.append("items", item_dict)
-			
-			if mr.items:
-				try:
-					mr.flags.ignore_permissions = True
-					mr.insert()
-					# Material Request'i Draft olarak bırak (submit etme)
-					frappe.db.commit()
-					mr_count += 1
-				except Exception as e:
-					frappe.log_error(f"Material Request oluşturma hatası: {str(e)}", "Create Auto Material Request")
-					# Hata olsa bile devam et
-	
-	return mr_count
+
+			# Kilit altında kilitli okuma - kilidi bekleyen çalışma, transaction'ı bölmeden
+			# öncekinin commit ettiklerini görsün
+			requested_today = get_requested_today([company], today, for_update=True)
+
+			# Her Material Request tipi ve warehouse için ayrı MR oluştur
+			for (mr_type, warehouse), group_items in company_groups.items():
+				_write_material_request(
+					company, mr_type, warehouse, group_items,
+					requested_today.get((company, mr_type, warehouse)),
+					source_warehouses.get(company), today, stats
+				)
+
+			# Şirketin çalışması tek commit - kilit bırakılmadan yazılanlar görünür olsun
+			frappe.db.commit()
+
+	if timings is not None:
+		timings["insert"] = _elapsed(started)
+
+	return stats
+
+
+def get_reorder_lock_name(company):
+	"""Şirketin günlük Material Request'lerine yazan işlerin paylaştığı kilit adı"""
+	return f"reorder:{company}"
+
+
+def _write_material_request(
+	company, mr_type, warehouse, items, requested, source_warehouse, today, stats, dry_run=False
+):
+	"""Tek (şirket, tip, depo) grubunu günün Material Request'ine yaz - yeni MR veya Draft MR'a ekleme"""
+	# Bugün için zaten Material Request var mı kontrol et
+	if requested and not requested.draft:
+		stats["skipped"] += 1
+		return
+
+	if requested:
+		items = [item for item in items if item.item_code not in requested.item_codes]
+		if not items:
+			stats["skipped"] += 1
+			return
+
+	if dry_run:
+		rows = [row for row in (get_reorder_item_row(item, warehouse, today) for item in items) if row]
+		if not rows:
+			stats["skipped"] += 1
+			return
+		stats["material_requests_updated" if requested else "material_requests_created"] += 1
+		stats["items_requested"] += len(rows)
+		return
+
+	try:
+		frappe.db.savepoint("auto_material_request")
+
+		if requested:
+			mr = frappe.get_doc("Material Request", requested.draft, for_update=True)
+			rows = [row for row in (get_reorder_item_row(item, warehouse, today) for item in items) if row]
+			if not rows:
+				stats["skipped"] += 1
+				return
+			for item_dict in rows:
+				if mr.get("set_from_warehouse"):
+					item_dict["from_warehouse"] = mr.set_from_warehouse
+				mr.append("items", item_dict)
+			mr.flags.ignore_permissions = True
+			mr.save()
+			stats["material_requests_updated"] += 1
+			stats["items_requested"] += len(rows)
+		else:
+			mr = build_material_request(company, mr_type, warehouse, items, source_warehouse, today)
+			if not mr.items:
+				stats["skipped"] += 1
+				return
+			mr.flags.ignore_permissions = True
+			# Material Request'i Draft olarak bırak (submit etme)
+			mr.insert()
+			stats["material_requests_created"] += 1
+			stats["items_requested"] += len(mr.items)
+
+		stats["material_requests"].append(mr.name)
+	except Exception as e:
+		# Hata olsa bile devam et - sadece bu MR geri alınır
+		frappe.db.rollback(save_point="auto_material_request")
+		frappe.log_error(f"Material Request oluşturma hatası ({company}, {warehouse}): {str(e)}", "Create Auto Material Request")
+		stats["errors"] += 1
+
+
+def build_material_request(company, mr_type, warehouse, items, source_warehouse=None, schedule_date=None):
+	"""Düşük stoklu satırlardan kaydedilmemiş bir Material Request dokümanı kur"""
+	schedule_date = schedule_date or nowdate()
+
+	mr = frappe.new_doc("Material Request")
+	mr.material_request_type = mr_type
+	mr.company = company
+	mr.requested_by = "Administrator"
+	mr.schedule_date = schedule_date
+	mr.transaction_date = schedule_date
+
+	# Material Transfer ise ana şirketin ana deposu kaynak depodur
+	if mr_type == "Material Transfer" and source_warehouse:
+		mr.set_from_warehouse = source_warehouse
+
+	for item in items:
+		item_dict = get_reorder_item_row(item, warehouse, schedule_date)
+		if not item_dict:
+			continue
+
+		# Material Transfer ise kaynak depo da ekle
+		if mr.get("set_from_warehouse"):
+			item_dict["from_warehouse"] = mr.set_from_warehouse
+
+		mr.append("items", item_dict)
+
+	return mr
+
+
+def get_reorder_item_row(item, warehouse, schedule_date):
+	"""Tek düşük stok satırı için Material Request Item değerleri; sipariş miktarı yoksa None"""
+	# actual_qty kullanıyoruz çünkü stok sayfasında da actual_qty gösteriliyor
+	current_qty = item.actual_qty or 0
+	reorder_qty = item.warehouse_reorder_qty or (item.warehouse_reorder_level - current_qty)
+	if reorder_qty <= 0:
+		return None
+
+	return {
+		"item_code": item.item_code,
+		"qty": reorder_qty,
+		"warehouse": warehouse,
+		"schedule_date": schedule_date
+	}
+
+
+def get_material_request_type(reorder_type):
+	"""Item Reorder'daki material_request_type'ı Material Request tipine çevir
+	"Transfer" -> "Material Transfer", bilinmeyenler "Purchase"
+	"""
+	mr_type = reorder_type or "Purchase"
+	if mr_type == "Transfer":
+		return "Material Transfer"
+	if mr_type not in MR_TYPES:
+		return "Purchase"
+	return mr_type
+
+
+def get_requested_today(companies, date=None, for_update=False):
+	"""
+	Bugün için talep edilmiş ürünler - (şirket, tip, depo) başına, tek sorgu
+
+	Args:
+		companies (list): Şirketler
+		date (str, optional): Tarih, varsayılan bugün
+		for_update (bool): Satırları kilitleyerek oku - transaction'ın anlık görüntüsü yerine
+			en son commit edilmiş Material Request'ler okunur
+
+	Returns:
+		dict: {(company, material_request_type, warehouse): {"draft": Draft MR adı veya None, "item_codes": set}}
+			Grup için submit edilmiş bir MR varsa draft None olur
+	"""
+	if not companies:
+		return {}
+
+	rows = frappe.db.sql(f"""
+		SELECT mr.name, mr.docstatus, mr.company, mr.material_request_type, mri.warehouse, mri.item_code
+		FROM `tabMaterial Request` mr
+		INNER JOIN `tabMaterial Request Item` mri ON mri.parent = mr.name
+		WHERE mr.company IN %(companies)s
+		AND mr.schedule_date = %(date)s
+		AND mr.docstatus < 2
+		ORDER BY mr.creation
+		{"FOR UPDATE" if for_update else ""}
+	""", {"companies": list(companies), "date": date or nowdate()}, as_dict=True)
+
+	requested = {}
+	submitted = set()
+	for row in rows:
+		key = (row.company, row.material_request_type, row.warehouse)
+		entry = requested.setdefault(key, frappe._dict(draft=None, item_codes=set()))
+		entry.item_codes.add(row.item_code)
+		if row.docstatus == 1:
+			submitted.add(key)
+		elif not entry.draft:
+			entry.draft = row.name
+
+	for key in submitted:
+		requested[key].draft = None
+
+	return requested
+
+
+def get_source_warehouse_map(companies):
+	"""
+	Material Transfer kaynak deposu - şirket başına, kendisi dışındaki ilk (creation sırasıyla)
+	şirketin ilk grup olmayan deposu
+
+	Returns:
+		dict: {company: warehouse}
+	"""
+	if not companies:
+		return {}
+
+	all_companies = frappe.get_all("Company", order_by="creation asc", pluck="name")
+
+	first_warehouse = {}
+	for row in frappe.get_all(
+		"Warehouse",
+		filters={"is_group": 0},
+		fields=["name", "company"],
+		order_by="creation asc"
+	):
+		first_warehouse.setdefault(row.company, row.name)
+
+	source_warehouses = {}
+	for company in companies:
+		main_company = next((name for name in all_companies if name != company), None)
+		if main_company and first_warehouse.get(main_company):
+			source_warehouses[company] = first_warehouse[main_company]
+
+	return source_warehouses
 
 
+def _elapsed(started):
+	return round(time.monotonic() - started, 3)
@@ -0,0 +1,157 @@
+"""
+Depo bazında versiyonlanmış stok snapshot cache'i
+
+`get_stock_status` sorgusunun (Bin ⋈ Item ⋈ Warehouse ⟕ Item Reorder) sonucu depo başına
+Redis'te tutulur. Her deponun bir versiyon sayacı vardır; Bin / Stock Ledger Entry / Item
+(ürün alanları, reorder seviyeleri) değiştiğinde sadece ilgili depoların sayacı artırılır, böylece
+bir sonraki görüntülemede yalnızca o depolar yeniden hesaplanır.
+"""
+import frappe
+
+STOCK_VERSION_KEY = "north_medical_portal:stock_version"
+STOCK_SNAPSHOT_KEY = "north_medical_portal:stock_snapshot"
+
+# Versiyon artışı kaçsa bile eski snapshot'lar bu süreden sonra yeniden hesaplanır
+STOCK_SNAPSHOT_TTL = 6 * 60 * 60
+
+
+def get_stock_versions(warehouses):
+	"""
+	Depoların güncel versiyonlarını tek Redis çağrısında döndür
+
+	Returns:
+		dict: {warehouse: version}
+	"""
+	keys = [frappe.cache.make_key(f"{STOCK_VERSION_KEY}:{warehouse}") for warehouse in warehouses]
+	values = frappe.cache.mget(keys) if keys else []
+	return {warehouse: int(value or 0) for warehouse, value in zip(warehouses, values, strict=True)}
+
+
+def bump_stock_version(warehouses):
+	"""Depoların versiyon sayaçlarını atomik olarak artır"""
+	warehouses = {warehouse for warehouse in warehouses if warehouse}
+	if not warehouses:
+		return
+
+	pipeline = frappe.cache.pipeline()
+	for warehouse in warehouses:
+		pipeline.incr(frappe.cache.make_key(f"{STOCK_VERSION_KEY}:{warehouse}"))
+	pipeline.execute()
+
+
+def get_stock_snapshot(warehouses):
+	"""
+	Depoların stok satırlarını döndür - güncel snapshot'ı olan depolar Redis'ten,
+	olmayanlar tek SQL sorgusunda hesaplanıp cache'e yazılır
+
+	Args:
+		warehouses (list): Depo adları
+
+	Returns:
+		list: item_code, item_name, item_group, warehouse, warehouse_name, actual_qty,
+			warehouse_reorder_level, warehouse_reorder_qty alanlarını içeren satırlar
+	"""
+	if not warehouses:
+		return []
+
+	versions = get_stock_versions(warehouses)
+
+	rows = []
+	stale_warehouses = []
+	for warehouse in warehouses:
+		cached = frappe.cache.get_value(_snapshot_key(warehouse, versions[warehouse]))
+		if cached is None:
+			stale_warehouses.append(warehouse)
+		else:
+			rows.extend(frappe._dict(row) for row in cached)
+
+	if stale_warehouses:
+		fresh_rows = _query_stock_rows(stale_warehouses)
+
+		rows_by_warehouse = {warehouse: [] for warehouse in stale_warehouses}
+		for row in fresh_rows:
+			rows_by_warehouse[row.warehouse].append(row)
+
+		for warehouse, warehouse_rows in rows_by_warehouse.items():
+			frappe.cache.set_value(
+				_snapshot_key(warehouse, versions[warehouse]),
+				[dict(row) for row in warehouse_rows],
+				expires_in_sec=STOCK_SNAPSHOT_TTL
+			)
+
+		rows.extend(fresh_rows)
+
+	return rows
+
+
+def invalidate_stock_snapshot(doc, method=None):
+	"""
+	doc_events hook'u - etkilenen depoların versiyonunu commit sonrası artır
+
+	Aynı transaction içindeki tüm değişiklikler (ör. 500 satırlık bir Stock Entry'nin SLE'leri)
+	tek bir artışta toplanır.
+	"""
+	warehouses = set()
+
+	if doc.doctype in ("Bin", "Stock Ledger Entry"):
+		warehouses.add(doc.warehouse)
+	elif doc.doctype == "Item":
+		# Snapshot ürün alanlarını (item_name, item_group, ...) da içerir - ürünün Bin'i olan
+		# tüm depolar ve reorder satırı olan depolar etkilenir
+		warehouses.update(frappe.get_all("Bin", filters={"item_code": doc.name}, pluck="warehouse"))
+		warehouses.update(row.warehouse for row in doc.get("reorder_levels") or [])
+		doc_before_save = doc.get_doc_before_save()
+		if doc_before_save:
+			warehouses.update(row.warehouse for row in doc_before_save.get("reorder_levels") or [])
+
+	queue_stock_version_bump(warehouses)
+
+
+def queue_stock_version_bump(warehouses):
+	"""Depoları transaction commit edildiğinde artırılmak üzere biriktir"""
+	warehouses = {warehouse for warehouse in warehouses if warehouse}
+	if not warehouses:
+		return
+
+	pending = getattr(frappe.local, "pending_stock_version_bumps", None)
+	if pending is None:
+		pending = frappe.local.pending_stock_version_bumps = set()
+		frappe.db.after_commit.add(_flush_stock_version_bumps)
+		frappe.db.after_rollback.add(_discard_stock_version_bumps)
+
+	pending.update(warehouses)
+
+
+def _flush_stock_version_bumps():
+	pending = getattr(frappe.local, "pending_stock_version_bumps", None) or set()
+	frappe.local.pending_stock_version_bumps = None
+	bump_stock_version(pending)
+
+
+def _discard_stock_version_bumps():
+	frappe.local.pending_stock_version_bumps = None
+
+
+def _snapshot_key(warehouse, version):
+	return f"{STOCK_SNAPSHOT_KEY}:{warehouse}:{version}"
+
+
+def _query_stock_rows(warehouses):
+	return frappe.db.sql("""
+		SELECT
+			b.item_code,
+			i.item_name,
+			i.item_group,
+			b.warehouse,
+			w.warehouse_name,
+			b.actual_qty,
+			ir.warehouse_reorder_level,
+			ir.warehouse_reorder_qty
+		FROM `tabBin` b
+		INNER JOIN `tabItem` i ON i.name = b.item_code
+		INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
+		LEFT JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.warehouse = b.warehouse
+		WHERE b.warehouse IN %(warehouses)s
+			AND (b.actual_qty > 0 OR b.projected_qty > 0)
+		ORDER BY b.item_code, b.warehouse
+	""", {"warehouses": warehouses}, as_dict=True)
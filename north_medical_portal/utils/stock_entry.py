@@ -0,0 +1,176 @@
+"""
+Stock Entry yardımcıları - portal malzeme çıkışlarında küme bazında stok doğrulama ve
+grup stok hesaplarının yaprak hesaba çözümlenmesi
+"""
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+LEAF_ACCOUNT_CACHE_KEY = "north_medical_portal:leaf_account"
+
+
+def aggregate_item_qtys(items):
+	"""
+	Satırları ürün bazında topla - aynı ürün birden fazla satırda olabilir
+
+	Args:
+		items (list): [{"item_code": "...", "qty": 10}, ...]
+
+	Returns:
+		dict: {item_code: toplam qty} (satır sırasıyla)
+	"""
+	required = {}
+	for item in items:
+		item_code = item.get("item_code")
+		qty = flt(item.get("qty", 0))
+
+		if not item_code or qty <= 0:
+			frappe.throw(_("Geçersiz ürün veya miktar"))
+
+		required[item_code] = required.get(item_code, 0) + qty
+
+	return required
+
+
+def validate_and_lock_stock(warehouse, required):
+	"""
+	Tüm ürünlerin stoğunu tek `SELECT ... FOR UPDATE` ile kilitleyip kontrol et
+
+	Bin satırları transaction sonuna kadar kilitli kalır; aynı ürünü aynı anda çıkaran ikinci
+	istek, ilki submit edilip commit olana kadar bekler ve güncel stokla doğrulanır.
+
+	Args:
+		warehouse (str): Kaynak depo
+		required (dict): aggregate_item_qtys çıktısı
+	"""
+	if not required:
+		return
+
+	available = dict(frappe.db.sql("""
+		SELECT item_code, actual_qty
+		FROM `tabBin`
+		WHERE warehouse = %(warehouse)s
+		AND item_code IN %(item_codes)s
+		FOR UPDATE
+	""", {"warehouse": warehouse, "item_codes": list(required)}))
+
+	for item_code, qty in required.items():
+		if item_code not in available:
+			frappe.throw(_("{0} ürünü için {1} deposunda stok bulunmamaktadır").format(item_code, warehouse))
+
+		available_qty = available[item_code] or 0
+		if qty > available_qty:
+			frappe.throw(_("{0} ürünü için yeterli stok yok. Mevcut: {1}, İstenen: {2}").format(
+				item_code, available_qty, qty
+			))
+
+
+def get_stock_uoms(item_codes):
+	"""
+	Ürünlerin stok birimlerini tek sorguda getir
+
+	Returns:
+		dict: {item_code: stock_uom}
+	"""
+	item_codes = list(set(item_codes))
+	if not item_codes:
+		return {}
+
+	return dict(frappe.get_all(
+		"Item",
+		filters={"name": ["in", item_codes]},
+		fields=["name", "stock_uom"],
+		as_list=True
+	))
+
+
+def get_leaf_account(account, company):
+	"""
+	Hesabın altındaki ilk grup olmayan hesabı bul - hesap zaten yapraksa kendisi
+
+	Alt ağaç nested set (lft/rgt) üzerinden tek sorguda okunur; alt hesaplar her seviyede ada
+	göre sırayla derinlemesine taranır.
+	Sonuç şirket/hesap başına Redis'te tutulur, Account değişince temizlenir.
+
+	Returns:
+		str: Yaprak hesap veya bulunamazsa None
+	"""
+	if not account:
+		return None
+
+	return frappe.cache.hget(
+		LEAF_ACCOUNT_CACHE_KEY,
+		f"{company}::{account}",
+		generator=lambda: _query_leaf_account(account, company)
+	)
+
+
+def use_leaf_stock_account(company, warehouse, account):
+	"""
+	Deponun stok hesabı grup hesapsa bu istek boyunca yaprak hesabı kullan
+
+	ERPNext GL kayıtları için depo hesabını get_warehouse_account_map'ten okur; harita
+	frappe.flags'te istek başına tutulur. Deponun kaydı istek içindeki haritada değiştirilir,
+	Warehouse dokümanı ve diğer istekler etkilenmez.
+
+	Args:
+		company (str): Şirket
+		warehouse (str): Depo
+		account (str): Deponun hesabı (Warehouse.account)
+	"""
+	if not account or not frappe.get_cached_value("Account", account, "is_group"):
+		return
+
+	leaf_account = get_leaf_account(account, company)
+	if not leaf_account:
+		frappe.throw(_("Warehouse {0} için grup hesap {1} altında grup olmayan bir hesap bulunamadı").format(
+			warehouse, account
+		))
+
+	from erpnext.stock import get_warehouse_account_map
+
+	warehouse_account_map = get_warehouse_account_map(company)
+	warehouse_account_map[warehouse] = frappe._dict(
+		warehouse_account_map.get(warehouse) or {},
+		account=leaf_account,
+		account_currency=frappe.get_cached_value("Account", leaf_account, "account_currency")
+	)
+
+
+def clear_leaf_account_cache(doc=None, method=None):
+	"""doc_events hook'u - hesap ağacı değişince yaprak hesap cache'ini temizle"""
+	frappe.cache.delete_key(LEAF_ACCOUNT_CACHE_KEY)
+
+
+def _query_leaf_account(account, company):
+	# Alt ağaç tek sorguda okunur; yaprak, eski find_child_account gibi her seviyede ada göre
+	# sıralı derinlemesine aramayla seçilir ki GL kaydı aynı hesaba düşsün
+	accounts = frappe.db.sql("""
+		SELECT child.name, child.parent_account, child.is_group
+		FROM `tabAccount` parent
+		INNER JOIN `tabAccount` child
+			ON child.lft >= parent.lft AND child.rgt <= parent.rgt AND child.company = parent.company
+		WHERE parent.name = %(account)s
+		AND parent.company = %(company)s
+		ORDER BY child.name
+	""", {"account": account, "company": company}, as_dict=True)
+
+	if not any(row.name == account for row in accounts):
+		return None
+
+	children = {}
+	for row in accounts:
+		if row.name == account:
+			if not row.is_group:
+				return row.name
+		else:
+			children.setdefault(row.parent_account, []).append(row)
+
+	stack = list(reversed(children.get(account, [])))
+	while stack:
+		row = stack.pop()
+		if not row.is_group:
+			return row.name
+		stack.extend(reversed(children.get(row.name, [])))
+
+	return None
@@ -0,0 +1,258 @@
+"""
+Toplu stok hareketi içe aktarma - CSV/XLSX satırlarından Material Receipt / Material Issue
+
+Satırlar dosyadan akış halinde okunup tek geçişte doğrulanır; ürünler ve stok küme bazında
+(tek Item, tek Bin sorgusu) kontrol edilir. Geçerli satırlar (depo, hareket tipi, tarih)
+bazında gruplanıp en fazla `max_items` satırlık taslak Stock Entry'lere bölünür ve her biri
+arka planda submit edilir (bkz. utils.stock_submission).
+"""
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, nowdate
+
+from north_medical_portal.utils.stock_submission import enqueue_stock_entry_submit
+
+ENTRY_TYPES = {
+	"material receipt": "Material Receipt",
+	"receipt": "Material Receipt",
+	"material issue": "Material Issue",
+	"issue": "Material Issue",
+}
+
+# Tek Stock Entry'deki en fazla satır
+STOCK_IMPORT_MAX_ITEMS = 100
+
+# Bir dosyada işlenecek en fazla satır
+MAX_IMPORT_ROWS = 10000
+
+QUERY_BATCH_SIZE = 1000
+
+
+def import_stock_movements(file_rows, company, warehouse_names, max_items=STOCK_IMPORT_MAX_ITEMS, remarks=None):
+	"""
+	Dosya satırlarını doğrula, Stock Entry taslaklarını oluştur ve submit'lerini kuyruğa at
+
+	Args:
+		file_rows: utils.file_import.iter_file_rows çıktısı
+		company (str): Kullanıcının şirketi
+		warehouse_names (set): Kullanıcının yetkili olduğu depolar
+		max_items (int): Tek Stock Entry'deki en fazla satır
+		remarks (str, optional): Oluşturulan Stock Entry'lerin notu
+
+	Returns:
+		list: Satır başına sonuç [{"row", "item_code", "warehouse", "entry_type", "qty",
+			"status" (Queued/Failed), "stock_entry", "job_id", "error"}, ...] (dosya sırasıyla)
+	"""
+	movements, results = read_stock_movements(file_rows, warehouse_names)
+
+	movements = validate_movement_items(movements, results)
+	movements = validate_movement_stock(movements, results)
+
+	for (warehouse, entry_type, posting_date), group in group_movements(movements).items():
+		for start in range(0, len(group), max_items):
+			create_import_stock_entry(
+				company, warehouse, entry_type, posting_date,
+				group[start:start + max_items], results, remarks
+			)
+
+	return sorted(results.values(), key=lambda result: result["row"])
+
+
+def read_stock_movements(file_rows, warehouse_names):
+	"""
+	Satırları okuyup alan bazında doğrula
+
+	Returns:
+		tuple: (geçerli hareketler, {satır: sonuç})
+	"""
+	today = getdate(nowdate())
+	movements = []
+	results = {}
+
+	for line_no, values in file_rows:
+		if len(results) >= MAX_IMPORT_ROWS:
+			frappe.throw(_("Bir dosyada en fazla {0} satır içe aktarılabilir").format(MAX_IMPORT_ROWS))
+
+		item_code = values.get("item_code")
+		warehouse = values.get("warehouse")
+		entry_type = ENTRY_TYPES.get(str(values.get("entry_type") or values.get("type") or "").strip().lower())
+		qty = flt(values.get("qty"))
+
+		result = results[line_no] = frappe._dict(
+			row=line_no,
+			item_code=item_code,
+			warehouse=warehouse,
+			entry_type=entry_type or values.get("entry_type") or values.get("type"),
+			qty=qty,
+			status="Failed",
+			stock_entry=None,
+			job_id=None,
+			error=None
+		)
+
+		try:
+			posting_date = getdate(values.get("posting_date") or today)
+		except Exception:
+			result.error = _("Geçersiz tarih: {0}").format(values.get("posting_date"))
+			continue
+
+		if not item_code or not warehouse:
+			result.error = _("Ürün kodu ve depo zorunludur")
+		elif not entry_type:
+			result.error = _("Geçersiz hareket tipi. 'Material Receipt' veya 'Material Issue' olmalı")
+		elif warehouse not in warehouse_names:
+			result.error = _("Bu depo için yetkiniz bulunmamaktadır")
+		elif qty <= 0:
+			result.error = _("Geçersiz ürün veya miktar")
+		elif posting_date > today:
+			result.error = _("İleri tarihli stok hareketi oluşturulamaz")
+		else:
+			movements.append(frappe._dict(
+				row=line_no,
+				item_code=item_code,
+				warehouse=warehouse,
+				entry_type=entry_type,
+				qty=qty,
+				posting_date=posting_date
+			))
+
+	return movements, results
+
+
+def validate_movement_items(movements, results):
+	"""Ürünleri tek sorgu grubunda doğrula ve stok birimlerini hareketlere ekle"""
+	item_codes = list({movement.item_code for movement in movements})
+	items = {}
+
+	for start in range(0, len(item_codes), QUERY_BATCH_SIZE):
+		for item in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes[start:start + QUERY_BATCH_SIZE]]},
+			fields=["name", "stock_uom", "disabled", "is_stock_item", "has_serial_no", "has_batch_no"]
+		):
+			items[item.name] = item
+
+	valid = []
+	for movement in movements:
+		item = items.get(movement.item_code)
+		error = None
+
+		if not item:
+			error = _("Ürün bulunamadı: {0}").format(movement.item_code)
+		elif item.disabled or not item.is_stock_item:
+			error = _("{0} stok ürünü değil veya devre dışı").format(movement.item_code)
+		elif item.has_serial_no or item.has_batch_no:
+			error = _("Seri/parti takipli ürünler içe aktarılamaz: {0}").format(movement.item_code)
+
+		if error:
+			results[movement.row].error = error
+			continue
+
+		movement.stock_uom = item.stock_uom
+		valid.append(movement)
+
+	return valid
+
+
+def validate_movement_stock(movements, results):
+	"""
+	Çıkış satırlarının stoğunu tek Bin sorgu grubunda doğrula
+
+	Aynı depo/ürün için çıkışlar dosya sırasıyla mevcut stoktan düşülür; stoğu aşan satır
+	hatalı sayılır. Aynı dosyadaki girişler hesaba katılmaz - girişler ve çıkışlar ayrı
+	işlerde submit edildiği için sıraları garanti değildir. Submit işi stoğu kilitleyip
+	yeniden doğrular.
+	"""
+	issues = [movement for movement in movements if movement.entry_type == "Material Issue"]
+	if not issues:
+		return movements
+
+	warehouses = list({movement.warehouse for movement in issues})
+	item_codes = list({movement.item_code for movement in issues})
+	available = {}
+
+	for start in range(0, len(item_codes), QUERY_BATCH_SIZE):
+		for warehouse, item_code, actual_qty in frappe.db.sql("""
+			SELECT warehouse, item_code, actual_qty
+			FROM `tabBin`
+			WHERE warehouse IN %(warehouses)s
+			AND item_code IN %(item_codes)s
+		""", {"warehouses": warehouses, "item_codes": item_codes[start:start + QUERY_BATCH_SIZE]}):
+			available[(warehouse, item_code)] = flt(actual_qty)
+
+	valid = []
+	for movement in movements:
+		if movement.entry_type == "Material Issue":
+			key = (movement.warehouse, movement.item_code)
+			available_qty = available.get(key, 0)
+
+			if movement.qty > available_qty:
+				results[movement.row].error = _("{0} ürünü için yeterli stok yok. Mevcut: {1}, İstenen: {2}").format(
+					movement.item_code, available_qty, movement.qty
+				)
+				continue
+
+			available[key] = available_qty - movement.qty
+
+		valid.append(movement)
+
+	return valid
+
+
+def group_movements(movements):
+	"""Hareketleri (depo, hareket tipi, tarih) bazında dosya sırasıyla grupla"""
+	groups = {}
+	for movement in movements:
+		groups.setdefault((movement.warehouse, movement.entry_type, movement.posting_date), []).append(movement)
+	return groups
+
+
+def create_import_stock_entry(company, warehouse, entry_type, posting_date, movements, results, remarks=None):
+	"""
+	Tek taslak Stock Entry oluştur ve submit'ini kuyruğa at
+
+	Taslak savepoint ile eklenir; hata olursa sadece bu Stock Entry'nin satırları hatalı sayılır.
+	"""
+	stock_entry = frappe.new_doc("Stock Entry")
+	stock_entry.stock_entry_type = entry_type
+	stock_entry.purpose = entry_type
+	stock_entry.company = company
+	stock_entry.posting_date = posting_date
+	stock_entry.set_posting_time = 1 if posting_date != getdate(nowdate()) else 0
+
+	if entry_type == "Material Receipt":
+		stock_entry.to_warehouse = warehouse
+	else:
+		stock_entry.from_warehouse = warehouse
+
+	stock_entry.remarks = remarks or _("Toplu içe aktarma")
+
+	for movement in movements:
+		stock_entry.append("items", {
+			"item_code": movement.item_code,
+			"qty": movement.qty,
+			"uom": movement.stock_uom,
+			"conversion_factor": 1,
+			"t_warehouse" if entry_type == "Material Receipt" else "s_warehouse": warehouse
+		})
+
+	try:
+		frappe.db.savepoint("stock_import_entry")
+		stock_entry.flags.ignore_permissions = True
+		stock_entry.insert()
+	except Exception as e:
+		frappe.db.rollback(save_point="stock_import_entry")
+		frappe.clear_messages()
+		error = str(e) if isinstance(e, frappe.ValidationError) and str(e) else _("Stok hareketi oluşturulamadı")
+		if not isinstance(e, frappe.ValidationError):
+			frappe.log_error(f"Stok hareketi içe aktarma hatası ({warehouse}, {entry_type})", "Stock Movement Import")
+		for movement in movements:
+			results[movement.row].error = error
+		return None
+
+	job_id = enqueue_stock_entry_submit(stock_entry)
+
+	for movement in movements:
+		results[movement.row].update(status="Queued", stock_entry=stock_entry.name, job_id=job_id)
+
+	return stock_entry.name
@@ -0,0 +1,66 @@
+"""
+Bayi depolarındaki stok değişikliklerini açık stok sayfalarına realtime olarak bildir
+
+Stock Ledger Entry submit edildiğinde depo transaction içinde biriktirilir ve commit sonrası
+depo başına tek bir olay yayınlanır; 500 satırlık bir Stock Entry 500 değil, depo başına bir
+olay üretir. Olay, deponun erişim indeksindeki (Dealer Warehouse Access) kullanıcılarına gider;
+istemci olayı alınca değişiklikleri `get_stock_changes` ile çeker.
+"""
+import frappe
+
+STOCK_UPDATE_EVENT = "north_medical_portal_stock_update"
+
+
+def queue_stock_update(doc, method=None):
+	"""doc_events hook'u - SLE'nin deposunu ve ürününü commit sonrası yayın için biriktir"""
+	if not doc.get("warehouse"):
+		return
+
+	pending = getattr(frappe.local, "pending_stock_updates", None)
+	if pending is None:
+		pending = frappe.local.pending_stock_updates = {}
+		frappe.db.after_commit.add(_publish_pending_stock_updates)
+		frappe.db.after_rollback.add(_discard_pending_stock_updates)
+
+	pending.setdefault(doc.warehouse, set()).add(doc.item_code)
+
+
+def publish_stock_updates(updates):
+	"""
+	Depo başına tek olay yayınla
+
+	Args:
+		updates (dict): {warehouse: set(item_code)}
+	"""
+	if not updates:
+		return
+
+	access_rows = frappe.get_all(
+		"Dealer Warehouse Access",
+		filters={"warehouse": ["in", list(updates)]},
+		fields=["warehouse", "user"]
+	)
+
+	users_by_warehouse = {}
+	for row in access_rows:
+		users_by_warehouse.setdefault(row.warehouse, set()).add(row.user)
+
+	for warehouse, users in users_by_warehouse.items():
+		message = {"warehouse": warehouse, "item_codes": sorted(updates[warehouse])}
+		for user in users:
+			frappe.publish_realtime(STOCK_UPDATE_EVENT, message, user=user)
+
+
+def _publish_pending_stock_updates():
+	pending = getattr(frappe.local, "pending_stock_updates", None) or {}
+	frappe.local.pending_stock_updates = None
+
+	try:
+		publish_stock_updates(pending)
+	except Exception:
+		# Bildirim hatası stok işlemini etkilememeli, istemci polling ile yine günceller
+		frappe.log_error(title="Stock Realtime Publish Error")
+
+
+def _discard_pending_stock_updates():
+	frappe.local.pending_stock_updates = None
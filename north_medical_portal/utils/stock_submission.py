@@ -0,0 +1,191 @@
+"""
+Stock Entry'lerin arka planda submit edilmesi
+
+Yüzlerce satırlık bir Stock Entry'nin submit'i (satır başına SLE ve GL kaydı) HTTP isteği
+içinde gunicorn timeout'una takılabilir. Asenkron modda istek doğrulamayı yapıp taslağı kaydeder,
+submit'i kuyruğa atar ve iş kimliğini döner. İşin durumu Redis'te tutulur; istemci
+`get_submission_status` ile sorgular veya realtime olayı dinler. Submit başarısız olursa taslak
+silinir; kullanıcı düzeltip yeniden gönderir.
+"""
+import frappe
+from frappe import _
+from frappe.utils import cint, now_datetime
+
+from north_medical_portal.utils.idempotency import invalidate_idempotent_result
+from north_medical_portal.utils.stock_entry import (
+	aggregate_item_qtys,
+	use_leaf_stock_account,
+	validate_and_lock_stock
+)
+
+# Bu satır sayısından itibaren submit varsayılan olarak arka planda yapılır
+ASYNC_SUBMIT_MIN_ITEMS = 50
+
+SUBMISSION_STATUS_KEY = "north_medical_portal:stock_entry_submission"
+
+# İş durumunun saklanma süresi
+SUBMISSION_STATUS_TTL = 24 * 60 * 60
+
+SUBMISSION_EVENT = "north_medical_portal_stock_entry_submission"
+
+
+def should_submit_async(stock_entry, async_submit=None):
+	"""
+	Stock Entry arka planda mı submit edilmeli
+
+	Args:
+		stock_entry: Stock Entry dokümanı
+		async_submit: İstemcinin tercihi (1/0); boşsa satır sayısına göre karar verilir
+	"""
+	if async_submit not in (None, ""):
+		return bool(cint(async_submit))
+
+	return len(stock_entry.items) >= ASYNC_SUBMIT_MIN_ITEMS
+
+
+def get_submission_job_id(stock_entry_name):
+	return f"north_medical_portal:stock_entry_submit:{stock_entry_name}"
+
+
+def enqueue_stock_entry_submit(stock_entry, idempotency_cache_key=None):
+	"""
+	Taslak Stock Entry'nin submit'ini kuyruğa at
+
+	İş, taslak commit olduktan sonra kuyruğa girer; istek rollback olursa iş de durum da oluşmaz.
+
+	Args:
+		stock_entry: Taslak Stock Entry
+		idempotency_cache_key: İsteğin idempotency anahtarı - submit başarısız olursa saklanan
+			"Queued" sonucu geçersiz kılınır ki tekrar deneme eski job_id'yi döndürmesin
+
+	Returns:
+		str: İş kimliği
+	"""
+	job_id = get_submission_job_id(stock_entry.name)
+	user = frappe.session.user
+	stock_entry_name = stock_entry.name
+
+	frappe.db.after_commit.add(lambda: set_submission_status(job_id, stock_entry_name, user, "Queued"))
+
+	frappe.enqueue(
+		"north_medical_portal.utils.stock_submission.submit_stock_entry_job",
+		queue="long",
+		job_id=job_id,
+		deduplicate=True,
+		enqueue_after_commit=True,
+		stock_entry_name=stock_entry_name,
+		idempotency_cache_key=idempotency_cache_key
+	)
+
+	return job_id
+
+
+def submit_stock_entry_job(stock_entry_name, idempotency_cache_key=None):
+	"""
+	Arka plan işi - taslak Stock Entry'yi doğrulayıp submit et
+
+	İstek ile iş arasında stok değişmiş olabilir; malzeme çıkışlarında stok Bin satırları
+	kilitlenerek yeniden doğrulanır. Hata olursa taslak silinir, isteğin idempotent sonucu
+	geçersiz kılınır ve hata mesajı duruma yazılır.
+	"""
+	job_id = get_submission_job_id(stock_entry_name)
+	user = frappe.session.user
+
+	set_submission_status(job_id, stock_entry_name, user, "Running")
+
+	try:
+		stock_entry = frappe.get_doc("Stock Entry", stock_entry_name)
+
+		if stock_entry.docstatus == 0:
+			prepare_stock_entry_submit(stock_entry)
+			stock_entry.flags.ignore_permissions = True
+			stock_entry.submit()
+			frappe.db.commit()
+		elif stock_entry.docstatus == 2:
+			frappe.throw(_("Stok hareketi {0} iptal edilmiş").format(stock_entry_name))
+
+	except Exception as e:
+		frappe.db.rollback()
+		error = get_submission_error(e, stock_entry_name)
+		discard_failed_draft(stock_entry_name)
+		invalidate_idempotent_result(idempotency_cache_key)
+		status = set_submission_status(job_id, stock_entry_name, user, "Failed", error=error)
+	else:
+		status = set_submission_status(job_id, stock_entry_name, user, "Completed")
+
+	frappe.publish_realtime(SUBMISSION_EVENT, status, user=user)
+	return status
+
+
+def prepare_stock_entry_submit(stock_entry):
+	"""Malzeme çıkışında stoğu kilitleyip doğrula ve yaprak stok hesabını kullan"""
+	if stock_entry.purpose != "Material Issue" or not stock_entry.from_warehouse:
+		return
+
+	required_qtys = aggregate_item_qtys([
+		{"item_code": item.item_code, "qty": item.transfer_qty or item.qty}
+		for item in stock_entry.items
+	])
+	validate_and_lock_stock(stock_entry.from_warehouse, required_qtys)
+
+	account = frappe.db.get_value("Warehouse", stock_entry.from_warehouse, "account")
+	use_leaf_stock_account(stock_entry.company, stock_entry.from_warehouse, account)
+
+
+def discard_failed_draft(stock_entry_name):
+	"""
+	Submit edilemeyen taslağı sil - sadece arka plan submit'i için oluşturulmuştu
+
+	Kullanıcı formu düzeltip yeniden gönderir; geride sahipsiz taslaklar birikmez.
+	"""
+	try:
+		if frappe.db.get_value("Stock Entry", stock_entry_name, "docstatus") == 0:
+			frappe.delete_doc("Stock Entry", stock_entry_name, ignore_permissions=True, force=True)
+			frappe.db.commit()
+	except Exception:
+		frappe.db.rollback()
+		frappe.log_error(
+			f"Başarısız Stock Entry taslağı silinemedi - {stock_entry_name}",
+			reference_doctype="Stock Entry",
+			reference_name=stock_entry_name
+		)
+
+
+def get_submission_error(exc, stock_entry_name):
+	"""Doğrulama hatalarında kullanıcıya gösterilecek mesaj, diğerlerinde loglanıp genel mesaj"""
+	frappe.clear_messages()
+
+	if isinstance(exc, frappe.ValidationError) and str(exc):
+		return str(exc)
+
+	frappe.log_error(
+		f"Stock Entry submit hatası - {stock_entry_name}",
+		reference_doctype="Stock Entry",
+		reference_name=stock_entry_name
+	)
+	return _("Stok hareketi submit edilemedi, lütfen tekrar deneyin")
+
+
+def set_submission_status(job_id, stock_entry_name, user, status, error=None):
+	"""İş durumunu Redis'e yaz"""
+	value = {
+		"job_id": job_id,
+		"stock_entry": stock_entry_name,
+		"user": user,
+		"status": status,
+		"error": error,
+		"modified": str(now_datetime())
+	}
+	frappe.cache.set_value(f"{SUBMISSION_STATUS_KEY}:{job_id}", value, expires_in_sec=SUBMISSION_STATUS_TTL)
+	return value
+
+
+def get_submission_status(job_id):
+	"""
+	İş durumunu getir
+
+	Returns:
+		dict: job_id, stock_entry, user, status (Queued/Running/Completed/Failed), error
+			veya bulunamazsa None
+	"""
+	return frappe.cache.get_value(f"{SUBMISSION_STATUS_KEY}:{job_id}")
@@ -1,9 +1,19 @@
+import json
+
 import frappe
 from frappe import _
-from frappe.utils import nowdate, add_days
-from north_medical_portal.utils.helpers import get_company_warehouses, validate_dealer_access
+from frappe.utils import add_days, cint, get_datetime, nowdate
+from north_medical_portal.utils.cursor import decode_cursor, encode_cursor
+from north_medical_portal.utils.helpers import get_company_warehouses, get_user_full_names, validate_dealer_access
+from north_medical_portal.utils.idempotency import idempotent
+
+MATERIAL_REQUEST_PAGE_LENGTH = 100
+
+MAX_MATERIAL_REQUEST_PAGE_LENGTH = 500
+
 
 @frappe.whitelist()
+@idempotent
 def create_material_request(items, warehouse=None):
 	"""Malzeme talebi oluştur"""
 	# Permission kontrolü ve şirket doğrulama
@@ -25,7 +35,6 @@ def create_material_request(items, warehouse=None):
 	
 	# Items ekle
 	if isinstance(items, str):
-		import json
 		items = json.loads(items)
 	
 	for item in items:
@@ -47,65 +56,137 @@ def create_material_request(items, warehouse=None):
 	}
 
 @frappe.whitelist()
-def get_material_requests():
-	"""Malzeme taleplerini listele - Controller ile tutarlı"""
+def get_material_requests(page_length=MATERIAL_REQUEST_PAGE_LENGTH, cursor=None):
+	"""
+	Malzeme taleplerini listele - Controller ile tutarlı
+	
+	Tek sorgu: sayfadaki talepler seçilir, hedef depo bilgisi kalemlerin farklı depo sayısı
+	üzerinden sayfadaki taleplerle sınırlı gruplu bir alt sorguda toplanıp join edilir.
+	(creation, name) üzerinde keyset sayfalama.
+	
+	Args:
+		page_length: Sayfa boyutu (en fazla MAX_MATERIAL_REQUEST_PAGE_LENGTH)
+		cursor: Önceki sayfanın next_cursor değeri
+	
+	Returns:
+		dict: {"material_requests", "next_cursor", "has_more"}
+	"""
 	# Permission kontrolü ve şirket doğrulama
 	user_company = validate_dealer_access()
 	
-	# Şirketin tüm talepleri (controller ile tutarlı)
-	material_requests = frappe.get_all(
-		"Material Request",
-		filters={"company": user_company},
-		fields=["name", "status", "material_request_type", "schedule_date", "creation", "docstatus", "owner", "transaction_date", "set_warehouse"],
-		order_by="creation desc",
-		limit=100
+	page_length = min(cint(page_length) or MATERIAL_REQUEST_PAGE_LENGTH, MAX_MATERIAL_REQUEST_PAGE_LENGTH)
+	conditions = ["mr.company = %(company)s"]
+	values = {"company": user_company, "limit": page_length + 1}
+	
+	if cursor:
+		values["cursor_creation"], values["cursor_name"] = decode_material_request_cursor(cursor)
+		conditions.append("""(
+			mr.creation < %(cursor_creation)s
+			OR (mr.creation = %(cursor_creation)s AND mr.name < %(cursor_name)s)
+		)""")
+	
+	where_clause = " AND ".join(conditions)
+	
+	# requested_by standart alan değil - sitede yoksa owner kullanılır
+	requested_by = "mr.requested_by" if frappe.get_meta("Material Request").has_field("requested_by") else "NULL"
+	
+	# Sayfadaki talepler - keyset koşuluyla indeks üzerinden
+	page_query = f"""
+		SELECT
+			mr.name, mr.status, mr.material_request_type, mr.schedule_date, mr.creation,
+			mr.docstatus, mr.owner, mr.transaction_date, mr.set_warehouse,
+			{requested_by} as requested_by
+		FROM `tabMaterial Request` mr
+		WHERE {where_clause}
+		ORDER BY mr.creation DESC, mr.name DESC
+		LIMIT %(limit)s
+	"""
+	
+	# Şirketin tüm talepleri (controller ile tutarlı) - kalemlerin depo bilgisi sadece
+	# sayfadaki talepler için kendi GROUP BY alt sorgusunda toplanıp join edilir
+	material_requests = frappe.db.sql(f"""
+		SELECT
+			mr.name,
+			mr.status,
+			mr.material_request_type,
+			mr.schedule_date,
+			mr.creation,
+			mr.docstatus,
+			mr.owner,
+			mr.transaction_date,
+			mr.set_warehouse,
+			mr.requested_by,
+			COALESCE(mri.item_warehouse_count, 0) as item_warehouse_count,
+			mri.item_warehouse
+		FROM ({page_query}) mr
+		LEFT JOIN (
+			SELECT
+				item.parent,
+				COUNT(DISTINCT NULLIF(item.warehouse, '')) as item_warehouse_count,
+				MIN(NULLIF(item.warehouse, '')) as item_warehouse
+			FROM `tabMaterial Request Item` item
+			INNER JOIN ({page_query}) page_mr ON page_mr.name = item.parent
+			WHERE item.parenttype = 'Material Request'
+			GROUP BY item.parent
+		) mri ON mri.parent = mr.name
+		ORDER BY mr.creation DESC, mr.name DESC
+	""", values, as_dict=True)
+	
+	has_more = len(material_requests) > page_length
+	material_requests = material_requests[:page_length]
+	
+	# owner_name ve requested_by_name - tek User sorgusu
+	full_names = get_user_full_names(
+		{request.owner for request in material_requests} | {request.requested_by for request in material_requests}
 	)
 	
-	# Her Material Request için hedef depo ve requested_by bilgilerini ekle
 	for request in material_requests:
 		# Talebi oluşturan kullanıcı bilgisi
 		if request.owner:
-			request.owner_name = frappe.utils.get_fullname(request.owner)
+			request.owner_name = full_names.get(request.owner)
 			# requested_by field'ı varsa onu kullan
-			mr_doc = frappe.get_doc("Material Request", request.name)
-			if hasattr(mr_doc, 'requested_by') and mr_doc.requested_by:
-				request.requested_by_name = frappe.utils.get_fullname(mr_doc.requested_by)
-			else:
-				request.requested_by_name = request.owner_name
+			request.requested_by_name = full_names.get(request.requested_by) or request.owner_name
 		
 		# Hedef depo bilgisini belirle
 		if request.set_warehouse:
 			request.target_warehouse = request.set_warehouse
 			request.target_warehouse_display = request.set_warehouse
+		elif request.item_warehouse_count == 1:
+			# Tüm item'lar aynı depoda
+			request.target_warehouse = request.item_warehouse
+			request.target_warehouse_display = request.item_warehouse
+		elif request.item_warehouse_count > 1:
+			# Farklı depolar var
+			request.target_warehouse = None
+			request.target_warehouse_display = _("Per Item")
 		else:
-			# Item'lardaki warehouse bilgilerini kontrol et
-			items = frappe.get_all(
-				"Material Request Item",
-				filters={"parent": request.name},
-				fields=["warehouse"]
-			)
-			warehouses = set()
-			for item in items:
-				if item.warehouse:
-					warehouses.add(item.warehouse)
-			
-			if len(warehouses) == 1:
-				# Tüm item'lar aynı depoda
-				request.target_warehouse = list(warehouses)[0]
-				request.target_warehouse_display = list(warehouses)[0]
-			elif len(warehouses) > 1:
-				# Farklı depolar var
-				request.target_warehouse = None
-				request.target_warehouse_display = _("Per Item")
-			else:
-				# Hiç depo yok
-				request.target_warehouse = None
-				request.target_warehouse_display = "-"
-	
-	return {"material_requests": material_requests}
+			# Hiç depo yok
+			request.target_warehouse = None
+			request.target_warehouse_display = "-"
+	
+	return {
+		"material_requests": material_requests,
+		"next_cursor": encode_material_request_cursor(material_requests[-1]) if has_more else None,
+		"has_more": has_more
+	}
+
+
+def encode_material_request_cursor(request):
+	"""Sayfanın son talebinden keyset cursor üret"""
+	return encode_cursor([str(request.creation), request.name])
+
+
+def decode_material_request_cursor(cursor):
+	"""Cursor'u (creation, name) değerlerine çevir"""
+	key = decode_cursor(cursor, 2)
+	try:
+		return get_datetime(key[0]), key[1]
+	except Exception:
+		frappe.throw(_("Geçersiz cursor"))
 
 
 @frappe.whitelist()
+@idempotent
 def add_material_request_to_cart(material_request_name):
 	"""Material Request'teki ürünleri webshop sepetine ekle"""
 	user_company = validate_dealer_access()
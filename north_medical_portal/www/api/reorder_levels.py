@@ -0,0 +1,136 @@
+"""
+Reorder Level İçe/Dışa Aktarma API - Bayilerin depo bazında min. stok seviyelerini
+CSV/XLSX ile toplu yönetmesi
+"""
+import csv
+import io
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+from north_medical_portal.utils.file_import import chunked, get_uploaded_file, iter_file_rows
+from north_medical_portal.utils.helpers import get_user_warehouses, validate_dealer_access
+from north_medical_portal.utils.reorder_levels import upsert_reorder_levels, validate_reorder_rows
+from north_medical_portal.www.api.stock import get_stock_status
+
+EXPORT_COLUMNS = [
+	("item_code", "Item Code"),
+	("item_name", "Item Name"),
+	("warehouse", "Warehouse"),
+	("warehouse_name", "Warehouse Name"),
+	("actual_qty", "Actual Qty"),
+	("warehouse_reorder_level", "Reorder Level"),
+	("warehouse_reorder_qty", "Reorder Qty"),
+]
+
+IMPORT_CHUNK_SIZE = 500
+
+# Yanıtta döndürülecek en fazla satır hatası
+MAX_REPORTED_ERRORS = 1000
+
+
+@frappe.whitelist()
+def export_reorder_levels(warehouse=None, file_format="csv"):
+	"""
+	Stok durumu sayfasındaki reorder kolonlarını CSV veya XLSX olarak indir
+	
+	Args:
+		warehouse: Sadece bu depo (opsiyonel)
+		file_format: "csv" veya "xlsx"
+	"""
+	if file_format not in ("csv", "xlsx"):
+		frappe.throw(_("Geçersiz dosya formatı: {0}").format(file_format))
+	
+	stock_data = get_stock_status(warehouse=warehouse).get("stock_data", [])
+	
+	rows = [[label for _fieldname, label in EXPORT_COLUMNS]]
+	for row in stock_data:
+		rows.append([row.get(fieldname) for fieldname, _label in EXPORT_COLUMNS])
+	
+	file_name = f"reorder_levels_{frappe.utils.nowdate()}"
+	
+	if file_format == "xlsx":
+		from frappe.utils.xlsxutils import make_xlsx
+		
+		frappe.response["filename"] = f"{file_name}.xlsx"
+		frappe.response["filecontent"] = make_xlsx(rows, "Reorder Levels").getvalue()
+	else:
+		output = io.StringIO()
+		csv.writer(output).writerows(rows)
+		frappe.response["filename"] = f"{file_name}.csv"
+		frappe.response["filecontent"] = output.getvalue()
+	
+	frappe.response["type"] = "binary"
+
+
+@frappe.whitelist()
+def import_reorder_levels(file_url=None, chunk_size=IMPORT_CHUNK_SIZE):
+	"""
+	CSV/XLSX dosyasından reorder level ve quantity içe aktar
+	
+	Dosya satır satır okunur (sabit bellek), satırlar parçalar halinde doğrulanıp
+	`tabItem Reorder` tablosuna yazılır ve her parça commit edilir. Hatalı satırlar atlanır
+	ve dosyadaki satır numarasıyla raporlanır.
+	
+	Beklenen kolonlar: Item Code, Warehouse, Reorder Level, Reorder Qty
+	(dışa aktarılan dosya doğrudan geri yüklenebilir). Boş reorder hücresi mevcut değeri korur.
+	
+	Args:
+		file_url: Daha önce yüklenmiş File kaydının adresi (request'te "file" yoksa)
+		chunk_size: Bir transaction'da işlenecek satır sayısı
+	
+	Returns:
+		dict: {"message", "updated", "failed", "errors": [{"row", "item_code", "warehouse", "error"}, ...]}
+	"""
+	# update_reorder_levels ile aynı yetkilendirme
+	user_company = validate_dealer_access()
+	warehouse_names = {w.name for w in get_user_warehouses(user_company)}
+	
+	chunk_size = max(1, min(cint(chunk_size) or IMPORT_CHUNK_SIZE, 2000))
+	file_obj, file_name = get_uploaded_file(file_url)
+	
+	updated = 0
+	failed = 0
+	errors = []
+	
+	try:
+		for chunk in chunked(iter_file_rows(file_obj, file_name), chunk_size):
+			line_numbers = [line_no for line_no, _values in chunk]
+			rows = [
+				{
+					"item_code": values.get("item_code"),
+					"warehouse": values.get("warehouse"),
+					"reorder_level": values.get("reorder_level", values.get("warehouse_reorder_level")),
+					"reorder_qty": values.get("reorder_qty", values.get("warehouse_reorder_qty"))
+				}
+				for _line_no, values in chunk
+			]
+			
+			valid_rows, chunk_errors = validate_reorder_rows(rows, warehouse_names)
+			error_indexes = {error["row"] for error in chunk_errors}
+			valid_line_numbers = [
+				line_numbers[index] for index in range(len(rows))
+				if index not in error_indexes
+			]
+			for error in chunk_errors:
+				error["row"] = line_numbers[error["row"]]
+			
+			results, upsert_errors = upsert_reorder_levels(valid_rows, skip_invalid=True)
+			for error in upsert_errors:
+				error["row"] = valid_line_numbers[error["row"]]
+			
+			frappe.db.commit()
+			
+			updated += len(results)
+			failed += len(chunk_errors) + len(upsert_errors)
+			if len(errors) < MAX_REPORTED_ERRORS:
+				errors.extend(sorted(chunk_errors + upsert_errors, key=lambda error: error["row"]))
+	finally:
+		file_obj.close()
+	
+	return {
+		"message": _("{0} satır güncellendi, {1} satır hatalı").format(updated, failed),
+		"updated": updated,
+		"failed": failed,
+		"errors": errors[:MAX_REPORTED_ERRORS]
+	}
@@ -1,61 +1,285 @@
+import hashlib
+import json
+
 import frappe
 from frappe import _
+from frappe.utils import add_to_date, cint, flt, get_datetime, get_datetime_str, now_datetime
+from north_medical_portal.utils.cursor import decode_cursor, encode_cursor
 from north_medical_portal.utils.helpers import get_user_warehouses, validate_dealer_access, is_admin_user
-from north_medical_portal.utils.stock import check_company_reorder_levels, create_auto_material_request
+from north_medical_portal.utils.item_search import search_item_codes
+from north_medical_portal.utils.locks import is_locked
+from north_medical_portal.utils.reorder_levels import upsert_reorder_levels, validate_reorder_rows
+from north_medical_portal.utils.stock import get_reorder_lock_name, run_reorder_engine
+from north_medical_portal.utils.stock_cache import get_stock_snapshot
+
+STOCK_SORT_FIELDS = ("item_code", "item_name", "actual_qty")
+
+MAX_STOCK_PAGE_LENGTH = 500
+
+# Değişiklik token'ının gerisinden tekrar okunan pencere (saniye) - commit'i geç görünen satırlar için
+STOCK_CHANGE_OVERLAP = 600
+
+# Token'da taşınan en fazla gönderilmiş satır özeti
+MAX_CHANGE_TOKEN_SEEN = 1000
+
 
 @frappe.whitelist()
-def get_stock_status():
+def get_stock_status(page_length=None, cursor=None, warehouse=None, item_group=None,
+		below_reorder=0, txt=None, sort_by="item_code", sort_order="asc"):
 	"""Bayi stok durumunu döndür - Sadece kullanıcının yetkili olduğu warehouse'ları gösterir (bayi_customer field'ına göre)
-	Admin kullanıcılar için tüm warehouse'ları gösterir"""
+	Admin kullanıcılar için tüm warehouse'ları gösterir
+	
+	page_length verilmezse eski davranış korunur ve tüm satırlar tek seferde döner.
+	page_length verilirse (sort alanı, item_code, warehouse) üzerinden keyset sayfalama yapılır;
+	bir sonraki sayfa için dönen next_cursor değeri cursor parametresi olarak gönderilir.
+	
+	Args:
+		page_length: Sayfa başına satır (opsiyonel, en fazla 500)
+		cursor: Önceki sayfanın next_cursor değeri
+		warehouse: Sadece bu depo (yetkili depolardan biri olmalı)
+		item_group: Ürün grubu (alt gruplar dahil)
+		below_reorder: 1 ise sadece min. stok seviyesi altındakiler
+		txt: Ürün kodu / adı içinde arama
+		sort_by: item_code, item_name veya actual_qty
+		sort_order: asc veya desc
+	"""
 	# Permission kontrolü ve şirket doğrulama
 	user_company = validate_dealer_access()
 	
 	# Kullanıcının yetkili olduğu warehouse'ları al (bayi_customer field'ına göre)
 	warehouses = get_user_warehouses(user_company)
 	
-	# Kullanıcı kendi warehouse'ları için düzenleme yapabilir
-	# Her müşteri kendi deposu için düzenleme yapabilir
-	can_edit_reorder = True  # Warehouse yetkisi kontrolü API'de yapılıyor
-	
-	if not warehouses:
-		return {
-			"company": user_company,
-			"warehouses": [],
-			"stock_data": [],
-			"can_edit_reorder": can_edit_reorder
-		}
-	
-	warehouse_names = [w.name for w in warehouses]
-	
-	stock_data = frappe.db.sql("""
-		SELECT 
-			b.item_code,
-			i.item_name,
-			b.warehouse,
-			w.warehouse_name,
-			b.actual_qty,
-			ir.warehouse_reorder_level,
-			ir.warehouse_reorder_qty
-		FROM `tabBin` b
-		INNER JOIN `tabItem` i ON i.name = b.item_code
-		INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
-		LEFT JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.warehouse = b.warehouse
-		WHERE b.warehouse IN %(warehouses)s
-			AND w.company = %(company)s
-			AND (b.actual_qty > 0 OR b.projected_qty > 0)
-		ORDER BY b.item_code, b.warehouse
-	""", {"warehouses": warehouse_names, "company": user_company}, as_dict=True)
-	
 	# Her müşteri kendi deposu için düzenleme yapabilir
 	# Warehouse yetkisi kontrolü API'de yapılıyor
 	can_edit_reorder = True
 	
-	return {
+	response = {
 		"company": user_company,
 		"warehouses": [{"name": w.name, "warehouse_name": w.warehouse_name} for w in warehouses],
-		"stock_data": stock_data,
+		"stock_data": [],
 		"can_edit_reorder": can_edit_reorder
 	}
+	
+	if page_length:
+		response.update({"next_cursor": None, "has_more": False})
+	
+	if not warehouses:
+		return response
+	
+	warehouse_names = [w.name for w in warehouses]
+	
+	if warehouse:
+		if warehouse not in warehouse_names:
+			frappe.throw(_("Bu depo için yetkiniz bulunmamaktadır"), frappe.PermissionError)
+		warehouse_names = [warehouse]
+	
+	if sort_by not in STOCK_SORT_FIELDS:
+		frappe.throw(_("Geçersiz sıralama alanı: {0}").format(sort_by))
+	
+	if sort_order not in ("asc", "desc"):
+		frappe.throw(_("Geçersiz sıralama yönü: {0}").format(sort_order))
+	
+	# Depo bazında versiyonlanmış snapshot'tan oku - sadece değişen depolar yeniden hesaplanır
+	stock_data = get_stock_snapshot(warehouse_names)
+	
+	if item_group:
+		item_groups = set(frappe.db.sql_list("""
+			SELECT child.name FROM `tabItem Group` child
+			INNER JOIN `tabItem Group` parent ON child.lft >= parent.lft AND child.rgt <= parent.rgt
+			WHERE parent.name = %s
+		""", item_group))
+		stock_data = [row for row in stock_data if row.item_group in item_groups]
+	
+	if cint(below_reorder):
+		stock_data = [
+			row for row in stock_data
+			if flt(row.warehouse_reorder_level) > 0 and flt(row.actual_qty) <= flt(row.warehouse_reorder_level)
+		]
+	
+	if txt:
+		txt = txt.lower()
+		stock_data = [
+			row for row in stock_data
+			if txt in row.item_code.lower() or txt in (row.item_name or "").lower()
+		]
+	
+	reverse = sort_order == "desc"
+	stock_data.sort(key=lambda row: get_stock_sort_key(sort_by, row), reverse=reverse)
+	
+	if page_length:
+		page_length = min(cint(page_length) or 20, MAX_STOCK_PAGE_LENGTH)
+		
+		if cursor:
+			cursor_key = decode_stock_cursor(sort_by, cursor)
+			if reverse:
+				stock_data = [row for row in stock_data if get_stock_sort_key(sort_by, row) < cursor_key]
+			else:
+				stock_data = [row for row in stock_data if get_stock_sort_key(sort_by, row) > cursor_key]
+		
+		if len(stock_data) > page_length:
+			stock_data = stock_data[:page_length]
+			response["has_more"] = True
+			response["next_cursor"] = encode_stock_cursor(sort_by, stock_data[-1])
+	
+	# item_group sadece filtreleme için snapshot'ta tutuluyor, eski response şeklini koru
+	for row in stock_data:
+		row.pop("item_group", None)
+	
+	response["stock_data"] = stock_data
+	return response
+
+
+def get_stock_sort_key(sort_by, row):
+	"""Sıralama ve keyset cursor için satır anahtarı"""
+	key = (row.item_code, row.warehouse)
+	if sort_by == "item_name":
+		return (row.item_name or "", *key)
+	if sort_by == "actual_qty":
+		return (flt(row.actual_qty), *key)
+	return key
+
+
+def encode_stock_cursor(sort_by, row):
+	"""Sayfanın son satırından keyset cursor üret"""
+	return encode_cursor(get_stock_sort_key(sort_by, row))
+
+
+def decode_stock_cursor(sort_by, cursor):
+	"""Cursor'u sıralama anahtarıyla karşılaştırılabilir tuple'a çevir"""
+	key = decode_cursor(cursor, 2 if sort_by == "item_code" else 3)
+	
+	if sort_by == "actual_qty":
+		key[0] = flt(key[0])
+	
+	return tuple(key)
+
+
+@frappe.whitelist()
+def get_stock_changes(since_token=None, warehouse=None, page_length=1000):
+	"""
+	Verilen token'dan bu yana değişen stok satırlarını döndür - stok sayfasının polling'i için
+	
+	Bin veya Item Reorder satırının modified değeri token'dan büyük olan satırlar döner.
+	Stoğu sıfırlanan satırlar removed=1 ile işaretlenir ki istemci tablodan kaldırabilsin;
+	son STOCK_CHANGE_OVERLAP saniyede oluşturulan Bin'ler is_new=1 ile işaretlenir.
+	since_token verilmezse değişiklik döndürülmez, sadece güncel token verilir.
+	
+	modified commit'ten önce yazılır: uzun bir Stock Entry transaction'ı, daha sonra damgalanmış
+	ama önce commit olmuş bir satırdan sonra görünür hale gelebilir. Bu yüzden token'ın
+	STOCK_CHANGE_OVERLAP saniye gerisinden itibaren tekrar okunur; pencerede zaten gönderilmiş
+	(satır, modified) çiftlerinin özetleri token'da taşınır ve tekrar gönderilmez.
+	
+	Args:
+		since_token: Önceki çağrının token değeri
+		warehouse: Sadece bu depo (opsiyonel)
+		page_length: Tek çağrıda dönecek en fazla satır
+	
+	Returns:
+		dict: {"changes": [...], "token": "...", "has_more": bool}
+	"""
+	user_company = validate_dealer_access()
+	
+	warehouse_names = [w.name for w in get_user_warehouses(user_company)]
+	if warehouse:
+		if warehouse not in warehouse_names:
+			frappe.throw(_("Bu depo için yetkiniz bulunmamaktadır"), frappe.PermissionError)
+		warehouse_names = [warehouse]
+	
+	if not since_token:
+		return {"changes": [], "token": encode_change_token(now_datetime(), ""), "has_more": False}
+	
+	since, since_name, seen = decode_change_token(since_token)
+	
+	if not warehouse_names:
+		return {"changes": [], "token": since_token, "has_more": False}
+	
+	page_length = min(cint(page_length) or 1000, 5000)
+	window_start = add_to_date(since, seconds=-STOCK_CHANGE_OVERLAP)
+	
+	# Penceredeki en fazla len(seen) satır zaten gönderilmiştir - limit bunu karşılar
+	rows = frappe.db.sql("""
+		SELECT *
+		FROM (
+			SELECT
+				b.name AS bin,
+				b.item_code,
+				i.item_name,
+				b.warehouse,
+				w.warehouse_name,
+				b.actual_qty,
+				ir.warehouse_reorder_level,
+				ir.warehouse_reorder_qty,
+				IF(b.actual_qty > 0 OR b.projected_qty > 0, 0, 1) AS removed,
+				IF(b.creation >= %(window_start)s, 1, 0) AS is_new,
+				GREATEST(b.modified, COALESCE(ir.modified, b.modified)) AS change_ts
+			FROM `tabBin` b
+			INNER JOIN `tabItem` i ON i.name = b.item_code
+			INNER JOIN `tabWarehouse` w ON w.name = b.warehouse
+			LEFT JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.warehouse = b.warehouse
+			WHERE b.warehouse IN %(warehouses)s
+				AND (b.modified >= %(window_start)s OR ir.modified >= %(window_start)s)
+		) changed
+		WHERE changed.change_ts >= %(window_start)s
+		ORDER BY changed.change_ts, changed.bin
+		LIMIT %(limit)s
+	""", {
+		"warehouses": warehouse_names,
+		"window_start": window_start,
+		"limit": len(seen) + page_length + 1
+	}, as_dict=True)
+	
+	for row in rows:
+		row.digest = get_change_digest(row.bin, row.change_ts)
+	
+	unseen = [row for row in rows if row.digest not in seen]
+	changes = unseen[:page_length]
+	
+	# Yüksek su işareti sadece ileri gider; pencerede geç commit olan satırlar onu geri almaz
+	high = (get_datetime(since), since_name or "")
+	for row in changes:
+		high = max(high, (get_datetime(row.change_ts), row.bin))
+	
+	# Devamı sadece işaretin ilerisinde satır varsa; penceredeki geç satırlar sonraki poll'da gelir
+	has_more = any((get_datetime(row.change_ts), row.bin) > high for row in unseen[page_length:])
+	
+	# Yeni pencerede kalan, gönderilmiş satırların özetleri
+	new_window_start = add_to_date(high[0], seconds=-STOCK_CHANGE_OVERLAP)
+	sent = {row.digest for row in changes}
+	new_seen = [
+		row.digest for row in rows
+		if (row.digest in seen or row.digest in sent) and get_datetime(row.change_ts) >= new_window_start
+	]
+	
+	token = encode_change_token(high[0], high[1], new_seen)
+	
+	for row in changes:
+		for field in ("change_ts", "bin", "digest"):
+			row.pop(field, None)
+	
+	return {"changes": changes, "token": token, "has_more": has_more}
+
+
+def get_change_digest(bin_name, change_ts):
+	"""(Bin, modified) çiftinin token'da taşınan kısa özeti"""
+	return hashlib.sha1(f"{bin_name}|{get_datetime_str(change_ts)}".encode()).hexdigest()[:8]
+
+
+def encode_change_token(timestamp, name, seen=None):
+	"""(modified, bin adı, pencerede gönderilmiş satır özetleri) keyset token'ı üret"""
+	return encode_cursor([
+		get_datetime_str(timestamp) if not isinstance(timestamp, str) else timestamp,
+		name or "",
+		list(seen or [])[-MAX_CHANGE_TOKEN_SEEN:]
+	])
+
+
+def decode_change_token(token):
+	"""Token'ı (modified, bin adı, gönderilmiş özetler kümesi) üçlüsüne çevir"""
+	value = decode_cursor(token, (2, 3), _("Geçersiz token"))
+	try:
+		return get_datetime(value[0]), value[1], set(value[2]) if len(value) > 2 else set()
+	except Exception:
+		frappe.throw(_("Geçersiz token"))
 
 
 @frappe.whitelist()
@@ -73,67 +297,88 @@ def update_reorder_levels(item_code, warehouse, reorder_level=None, reorder_qty=
 	user_company = validate_dealer_access()
 	
 	# Warehouse'un kullanıcının yetkili olduğu warehouse'lardan biri olduğunu kontrol et
-	warehouses = get_user_warehouses(user_company)
-	warehouse_names = [w.name for w in warehouses]
-	
+	warehouse_names = [w.name for w in get_user_warehouses(user_company)]
 	if warehouse not in warehouse_names:
 		frappe.throw(_("Bu depo için yetkiniz bulunmamaktadır"), frappe.PermissionError)
 	
-	# Item'ı al
-	item = frappe.get_doc("Item", item_code)
+	# Boş değer 0 demek; None ise mevcut değer korunur
+	row = {
+		"item_code": item_code,
+		"warehouse": warehouse,
+		"reorder_level": 0 if reorder_level == "" else reorder_level,
+		"reorder_qty": 0 if reorder_qty == "" else reorder_qty
+	}
 	
-	# Item Reorder kaydını bul veya oluştur
-	reorder_row = None
-	for row in item.get("reorder_levels", []):
-		if row.warehouse == warehouse:
-			reorder_row = row
-			break
+	result = update_reorder_levels_bulk([row])
+	if result["errors"]:
+		frappe.throw(result["errors"][0]["error"])
 	
-	if not reorder_row:
-		# Yeni reorder row oluştur
-		reorder_row = item.append("reorder_levels", {
-			"warehouse": warehouse,
-			"warehouse_group": warehouse,
-			"material_request_type": "Purchase"
-		})
+	updated = result["updated"][0]
+	return {
+		"message": _("Stok seviyeleri güncellendi"),
+		"reorder_level": updated["reorder_level"],
+		"reorder_qty": updated["reorder_qty"]
+	}
+
+
+@frappe.whitelist()
+def update_reorder_levels_bulk(rows):
+	"""
+	Birden fazla ürün/depo için reorder level ve quantity güncelle
 	
-	# Değerleri güncelle
-	if reorder_level is not None:
-		reorder_row.warehouse_reorder_level = float(reorder_level) if reorder_level else 0
+	Satırlar tek geçişte doğrulanır; herhangi bir satır hatalıysa hiçbir değişiklik yapılmaz
+	ve satır bazında hatalar döner. Geçerliyse `tabItem Reorder` satırları tek transaction'da
+	küme bazında güncellenir / eklenir ve stok cache versiyonu bir kez artırılır.
 	
-	if reorder_qty is not None:
-		reorder_row.warehouse_reorder_qty = float(reorder_qty) if reorder_qty else 0
+	Args:
+		rows: [{"item_code", "warehouse", "reorder_level", "reorder_qty"}, ...] (JSON string veya liste)
 	
-	# Validation: Eğer reorder_level varsa reorder_qty de olmalı
-	if reorder_row.warehouse_reorder_level and not reorder_row.warehouse_reorder_qty:
-		frappe.throw(_("Min. stok seviyesi belirlendiğinde sipariş miktarı da belirlenmelidir"))
+	Returns:
+		dict: {"message", "updated": [...], "errors": [{"row", "item_code", "warehouse", "error"}, ...]}
+	"""
+	if isinstance(rows, str):
+		rows = json.loads(rows)
+	
+	# Permission kontrolü
+	user_company = validate_dealer_access()
+	
+	# Sadece kullanıcının yetkili olduğu warehouse'lar için düzenleme yapılabilir
+	warehouse_names = {w.name for w in get_user_warehouses(user_company)}
+	
+	valid_rows, errors = validate_reorder_rows(rows or [], warehouse_names)
+	if errors:
+		return {"message": _("Doğrulama hatası, değişiklik yapılmadı"), "updated": [], "errors": errors}
+	
+	updated, errors = upsert_reorder_levels(valid_rows)
+	if errors:
+		frappe.db.rollback()
+		return {"message": _("Doğrulama hatası, değişiklik yapılmadı"), "updated": [], "errors": errors}
 	
-	# Permission kontrolü: Warehouse yetkisi yukarıda kontrol edildi
-	# Her müşteri kendi deposu için düzenleme yapabilir
-	# Item'ı kaydet (sadece reorder_levels child table'ını güncelliyoruz)
-	item.flags.ignore_permissions = True  # Sadece reorder level güncellemesi için
-	item.save()
 	frappe.db.commit()
 	
 	return {
-		"message": _("Stok seviyeleri güncellendi"),
-		"reorder_level": reorder_row.warehouse_reorder_level,
-		"reorder_qty": reorder_row.warehouse_reorder_qty
+		"message": _("{0} stok seviyesi güncellendi").format(len(updated)),
+		"updated": updated,
+		"errors": []
 	}
 
 
 @frappe.whitelist()
-def search_items_for_portal(txt="", warehouse=None, page_length=20):
+def search_items_for_portal(txt="", warehouse=None, page_length=20, start=0, cursor=None):
 	"""
 	Portal kullanıcıları için ürün arama - Item doctype permission olmadan
 	Sadece belirtilen warehouse'daki ürünleri döndürür (warehouse belirtilmezse tüm yetkili warehouse'lar)
+	
+	Tüm depolar tek sorguda item_code'a göre gruplanır, stok miktarları toplanır ve sayfalama
+	gruplanmış sonuç üzerinde yapılır. Sonsuz kaydırma için cursor (önceki sayfanın next_cursor
+	değeri, yani son item_code) veya start (offset) kullanılabilir.
 	"""
 	user_company = validate_dealer_access()
 	
 	# Kullanıcının yetkili olduğu warehouse'ları al
 	user_warehouses = get_user_warehouses(user_company)
 	if not user_warehouses:
-		return {"results": []}
+		return {"results": [], "next_cursor": None, "has_more": False}
 	
 	user_warehouse_names = [w.name for w in user_warehouses]
 	
@@ -146,78 +391,53 @@ def search_items_for_portal(txt="", warehouse=None, page_length=20):
 		# Warehouse belirtilmemişse tüm yetkili warehouse'ları kullan
 		warehouse_names = user_warehouse_names
 	
+	page_length = min(cint(page_length) or 20, 100)
+	
+	# Arama metni varsa indeksten, depolarda stoğu olan ürünler arasında alaka sırasıyla ürün kodlarını al
+	ranked_codes = search_item_codes(txt, get_stocked_item_codes(warehouse_names)) if txt else None
+	if ranked_codes is not None:
+		return search_ranked_items(ranked_codes, warehouse_names, page_length, cint(start), cursor)
+	
 	# SQL ile ürünleri ara (Item doctype permission olmadan)
 	# Stok durumu sayfasındaki gibi Bin'den başla - sadece Bin'de kaydı olan ürünleri göster
-	# Çünkü stok durumu sayfasında görünen ürünler Bin'de kayıtlı
+	conditions = []
+	values = {
+		"warehouses": warehouse_names,
+		"limit": page_length + 1,
+		"start": 0 if cursor else cint(start)
+	}
 	
-	# Arama koşulu
-	search_condition = ""
 	if txt:
-		search_condition = """
-			AND (
+		conditions.append("""(
 				i.item_code LIKE %(txt)s
 				OR i.item_name LIKE %(txt)s
 				OR i.description LIKE %(txt)s
-			)
-		"""
-	
-	# Tek warehouse için direkt sorgu
-	if len(warehouse_names) == 1:
-		# Bin'den başla - stok durumu sayfasındaki gibi
-		# page_length'i integer'a çevir
-		page_length_int = int(page_length) if page_length else 20
-		items = frappe.db.sql("""
-			SELECT DISTINCT
-				b.item_code,
-				i.item_name,
-				COALESCE(b.actual_qty, 0) as actual_qty
-			FROM `tabBin` b
-			INNER JOIN `tabItem` i ON i.name = b.item_code
-			WHERE b.warehouse = %(warehouse)s
-				AND i.disabled = 0
-				AND (b.actual_qty > 0 OR b.projected_qty > 0)
-				{search_condition}
-			ORDER BY i.item_code ASC
-			LIMIT %(page_length)s
-		""".format(search_condition=search_condition), {
-			"warehouse": warehouse_names[0],
-			"txt": f"%{txt}%" if txt else "%",
-			"page_length": page_length_int
-		}, as_dict=True)
-	else:
-		# Birden fazla warehouse için (warehouse belirtilmemişse)
-		# page_length'i integer'a çevir
-		page_length_int = int(page_length) if page_length else 20
-		all_items = {}
-		for wh_name in warehouse_names:
-			wh_items = frappe.db.sql("""
-				SELECT DISTINCT
-					b.item_code,
-					i.item_name,
-					COALESCE(b.actual_qty, 0) as actual_qty
-				FROM `tabBin` b
-				INNER JOIN `tabItem` i ON i.name = b.item_code
-				WHERE b.warehouse = %(warehouse)s
-					AND i.disabled = 0
-					AND (b.actual_qty > 0 OR b.projected_qty > 0)
-					{search_condition}
-				ORDER BY i.item_code ASC
-				LIMIT %(page_length)s
-			""".format(search_condition=search_condition), {
-				"warehouse": wh_name,
-				"txt": f"%{txt}%" if txt else "%",
-				"page_length": page_length_int
-			}, as_dict=True)
-			
-			for item in wh_items:
-				if item.item_code not in all_items:
-					all_items[item.item_code] = item
-				else:
-					# Aynı ürün birden fazla warehouse'da varsa, stok miktarını topla
-					all_items[item.item_code].actual_qty += item.actual_qty
-		
-		items = list(all_items.values())
-		items = sorted(items, key=lambda x: x.item_code)[:page_length]
+			)""")
+		values["txt"] = f"%{txt}%"
+	
+	if cursor:
+		conditions.append("b.item_code > %(cursor)s")
+		values["cursor"] = cursor
+	
+	extra_conditions = "".join(f"\n\t\t\tAND {condition}" for condition in conditions)
+	
+	items = frappe.db.sql(f"""
+		SELECT
+			b.item_code,
+			i.item_name,
+			SUM(COALESCE(b.actual_qty, 0)) as actual_qty
+		FROM `tabBin` b
+		INNER JOIN `tabItem` i ON i.name = b.item_code
+		WHERE b.warehouse IN %(warehouses)s
+			AND i.disabled = 0
+			AND (b.actual_qty > 0 OR b.projected_qty > 0){extra_conditions}
+		GROUP BY b.item_code, i.item_name
+		ORDER BY b.item_code ASC
+		LIMIT %(limit)s OFFSET %(start)s
+	""", values, as_dict=True)
+	
+	has_more = len(items) > page_length
+	items = items[:page_length]
 	
 	# ERPNext search_link formatına uygun formatta döndür
 	results = []
@@ -228,7 +448,70 @@ def search_items_for_portal(txt="", warehouse=None, page_length=20):
 			f"Stock: {int(item.actual_qty)}" if item.actual_qty else "Stock: 0"
 		])
 	
-	return {"results": results}
+	return {
+		"results": results,
+		"next_cursor": items[-1].item_code if has_more else None,
+		"has_more": has_more
+	}
+
+
+def get_stocked_item_codes(warehouse_names):
+	"""Depolarda stoğu (veya beklenen stoğu) olan ürün kodları - tek Bin sorgusu"""
+	return set(frappe.db.sql_list("""
+		SELECT DISTINCT item_code
+		FROM `tabBin`
+		WHERE warehouse IN %(warehouses)s
+			AND (actual_qty > 0 OR projected_qty > 0)
+	""", {"warehouses": warehouse_names}))
+
+
+def search_ranked_items(ranked_codes, warehouse_names, page_length, start=0, cursor=None):
+	"""
+	İndeksten gelen ürünleri alaka sırasını koruyarak sayfala ve sadece sayfadakilerin stoğunu getir
+	
+	ranked_codes zaten depolarda stoğu olan ürünlerle kesiştirilmiştir (get_stocked_item_codes).
+	cursor, önceki sayfanın son item_code'udur; sıralı listede onun ardından devam edilir.
+	"""
+	if cursor:
+		positions = [index for index, item_code in enumerate(ranked_codes) if item_code == cursor]
+		start = positions[0] + 1 if positions else len(ranked_codes)
+	
+	page_codes = ranked_codes[start:start + page_length]
+	has_more = len(ranked_codes) > start + page_length
+	if not page_codes:
+		return {"results": [], "next_cursor": None, "has_more": False}
+	
+	stock = {
+		row.item_code: row
+		for row in frappe.db.sql("""
+			SELECT
+				b.item_code,
+				i.item_name,
+				SUM(COALESCE(b.actual_qty, 0)) as actual_qty
+			FROM `tabBin` b
+			INNER JOIN `tabItem` i ON i.name = b.item_code
+			WHERE b.warehouse IN %(warehouses)s
+				AND b.item_code IN %(item_codes)s
+				AND i.disabled = 0
+				AND (b.actual_qty > 0 OR b.projected_qty > 0)
+			GROUP BY b.item_code, i.item_name
+		""", {"warehouses": warehouse_names, "item_codes": page_codes}, as_dict=True)
+	}
+	
+	page = [stock[item_code] for item_code in page_codes if item_code in stock]
+	
+	return {
+		"results": [
+			[
+				item.item_code,
+				item.item_name or item.item_code,
+				f"Stock: {int(item.actual_qty)}" if item.actual_qty else "Stock: 0"
+			]
+			for item in page
+		],
+		"next_cursor": page_codes[-1] if has_more else None,
+		"has_more": has_more
+	}
 
 
 @frappe.whitelist()
@@ -277,14 +560,108 @@ def get_item_stock_info(item_code, warehouse):
 	}
 
 
+@frappe.whitelist()
+def get_items_stock_info(pairs):
+	"""
+	Birden fazla ürün/depo çifti için stok bilgisini tek seferde döndür
+	
+	get_item_stock_info'nun toplu hali - yetki bir kez kontrol edilir, ürün ve Bin bilgileri
+	iki sorguda alınır.
+	
+	Args:
+		pairs: [{"item_code": "...", "warehouse": "..."}, ...] (JSON string veya liste)
+	
+	Returns:
+		dict: {"items": [...]} - pairs ile aynı sırada, her biri get_item_stock_info şeklinde
+	"""
+	if isinstance(pairs, str):
+		pairs = json.loads(pairs)
+	
+	pairs = [(pair.get("item_code"), pair.get("warehouse")) for pair in pairs or []]
+	if not pairs:
+		return {"items": []}
+	
+	user_company = validate_dealer_access()
+	user_warehouse_names = {w.name for w in get_user_warehouses(user_company)}
+	
+	# Warehouse yetki kontrolü
+	for _item_code, warehouse in pairs:
+		if warehouse not in user_warehouse_names:
+			frappe.throw(_("Bu depo için yetkiniz bulunmamaktadır"), frappe.PermissionError)
+	
+	item_codes = list({item_code for item_code, _warehouse in pairs if item_code})
+	warehouses = list({warehouse for _item_code, warehouse in pairs})
+	
+	items = {}
+	bins = {}
+	if item_codes:
+		items = {
+			item.name: item
+			for item in frappe.get_all(
+				"Item",
+				filters={"name": ["in", item_codes]},
+				fields=["name", "item_name", "stock_uom"]
+			)
+		}
+		
+		for bin_data in frappe.get_all(
+			"Bin",
+			filters={"item_code": ["in", item_codes], "warehouse": ["in", warehouses]},
+			fields=["item_code", "warehouse", "actual_qty", "reserved_qty"]
+		):
+			bins[(bin_data.item_code, bin_data.warehouse)] = bin_data
+	
+	result = []
+	for item_code, warehouse in pairs:
+		item = items.get(item_code)
+		if not item:
+			result.append({
+				"item_code": item_code,
+				"warehouse": warehouse,
+				"item_name": "",
+				"actual_qty": 0,
+				"available_qty": 0,
+				"reserved_qty": 0,
+				"stock_uom": ""
+			})
+			continue
+		
+		bin_data = bins.get((item_code, warehouse))
+		actual_qty = flt(bin_data.actual_qty) if bin_data else 0
+		reserved_qty = flt(bin_data.reserved_qty) if bin_data else 0
+		
+		result.append({
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"item_name": item.item_name or item_code,
+			"actual_qty": actual_qty,
+			"available_qty": actual_qty - reserved_qty if bin_data else 0,
+			"reserved_qty": reserved_qty,
+			"stock_uom": item.stock_uom or ""
+		})
+	
+	return {"items": result}
+
+
 @frappe.whitelist()
 def trigger_reorder_check():
 	"""
 	Manuel olarak reorder level kontrolünü tetikle ve Material Request oluştur
 	Kullanıcının şirketi için çalışır
+	
+	Returns:
+		dict: success, message, items_found, material_requests_created,
+			material_requests_updated, items_requested
 	"""
 	user_company = validate_dealer_access()
 	
+	# Aynı şirket için günlük çalışma veya başka bir tetikleme sürüyorsa bekletme
+	if is_locked(get_reorder_lock_name(user_company)):
+		return {
+			"success": False,
+			"message": _("Bu şirket için asgari stok kontrolü şu anda çalışıyor, lütfen biraz sonra tekrar deneyin")
+		}
+	
 	try:
 		# Kullanıcının şirketi için reorder level kontrolünü çalıştır
 		# Önce kaç ürün bulunduğunu kontrol et
@@ -300,54 +677,37 @@ def trigger_reorder_check():
 				"message": _("Bu şirket için depo bulunamadı")
 			}
 		
-		warehouse_names = [w.name for w in warehouses]
-		
-		# Reorder level altına düşen ürünleri bul
-		# actual_qty kullanıyoruz çünkü stok sayfasında da actual_qty gösteriliyor
-		low_stock_items = frappe.db.sql("""
-			SELECT 
-				b.item_code,
-				i.item_name,
-				b.warehouse,
-				b.actual_qty,
-				b.projected_qty,
-				ir.warehouse_reorder_level,
-				ir.warehouse_reorder_qty,
-				ir.material_request_type
-			FROM `tabBin` b
-			INNER JOIN `tabItem` i ON i.name = b.item_code
-			INNER JOIN `tabItem Reorder` ir ON ir.parent = i.name AND ir.warehouse = b.warehouse
-			WHERE b.warehouse IN %(warehouses)s
-			AND ir.warehouse_reorder_level > 0
-			AND b.actual_qty <= ir.warehouse_reorder_level
-			AND b.actual_qty >= 0
-		""", {"warehouses": warehouse_names}, as_dict=True)
-		
-		if not low_stock_items:
-			return {
-				"success": True,
-				"message": _("Asgari stok seviyesi altında ürün bulunamadı"),
-				"items_found": 0,
-				"material_requests_created": 0
-			}
+		# Düşük stoklu ürünleri bul ve Material Request'leri oluştur / bugünkü taslaklara ekle
+		stats = run_reorder_engine(companies=[user_company])
 		
-		# Material Request oluştur
-		mr_count = create_auto_material_request(user_company, low_stock_items)
+		response = {
+			"success": True,
+			"items_found": stats["items_found"],
+			"material_requests_created": stats["material_requests_created"],
+			"material_requests_updated": stats["material_requests_updated"],
+			"items_requested": stats["items_requested"]
+		}
 		
-		if mr_count > 0:
-			return {
-				"success": True,
-				"message": _("Asgari stok kontrolü tamamlandı. {0} adet Material Request oluşturuldu.").format(mr_count),
-				"items_found": len(low_stock_items),
-				"material_requests_created": mr_count
-			}
+		if stats["locked_companies"]:
+			response.update(
+				success=False,
+				message=_("Bu şirket için asgari stok kontrolü şu anda çalışıyor, lütfen biraz sonra tekrar deneyin")
+			)
+		elif not stats["items_found"]:
+			response["message"] = _("Asgari stok seviyesi altında ürün bulunamadı")
+		elif stats["items_requested"]:
+			response["message"] = _(
+				"Asgari stok kontrolü tamamlandı. {0} ürün talep edildi: {1} yeni Material Request oluşturuldu, {2} taslak Material Request güncellendi."
+			).format(stats["items_requested"], stats["material_requests_created"], stats["material_requests_updated"])
+		elif stats["errors"]:
+			response.update(
+				success=False,
+				message=_("Asgari stok seviyesi altında {0} ürün bulundu ancak Material Request oluşturulamadı.").format(stats["items_found"])
+			)
 		else:
-			return {
-				"success": True,
-				"message": _("Asgari stok seviyesi altında {0} ürün bulundu ancak Material Request oluşturulamadı (muhtemelen bugün için zaten oluşturulmuş).").format(len(low_stock_items)),
-				"items_found": len(low_stock_items),
-				"material_requests_created": 0
-			}
+			response["message"] = _("Asgari stok seviyesi altında {0} ürün bulundu; hepsi bugün için zaten talep edilmiş.").format(stats["items_found"])
+		
+		return response
 		
 	except Exception as e:
 		frappe.log_error(f"Reorder check error: {str(e)}", "Trigger Reorder Check")
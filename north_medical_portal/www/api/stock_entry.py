@@ -1,14 +1,38 @@
 """
 Stock Entry API - Malzeme alım/çıkış işlemleri
 """
+import json
+
 import frappe
 from frappe import _
-from frappe.utils import nowdate
-from north_medical_portal.utils.helpers import validate_dealer_access, get_company_warehouses, get_user_warehouses
+from frappe.utils import cint, get_datetime, getdate, nowdate
+from north_medical_portal.utils.cursor import decode_cursor, encode_cursor
+from north_medical_portal.utils.file_import import get_uploaded_file, get_uploaded_file_digest, iter_file_rows
+from north_medical_portal.utils.helpers import validate_dealer_access, get_company_warehouses, get_user_full_names, get_user_warehouses
+from north_medical_portal.utils.idempotency import get_idempotency_cache_key, idempotent
+from north_medical_portal.utils.stock_entry import (
+	aggregate_item_qtys,
+	get_stock_uoms,
+	use_leaf_stock_account,
+	validate_and_lock_stock
+)
+from north_medical_portal.utils.stock_import import STOCK_IMPORT_MAX_ITEMS, import_stock_movements
+from north_medical_portal.utils.stock_submission import (
+	enqueue_stock_entry_submit,
+	get_submission_status as get_cached_submission_status,
+	should_submit_async
+)
+
+STOCK_ENTRY_PAGE_LENGTH = 100
+
+MAX_STOCK_ENTRY_PAGE_LENGTH = 500
+
+STOCK_ENTRY_STATUSES = {"Draft": 0, "Submitted": 1, "Cancelled": 2}
 
 
 @frappe.whitelist()
-def create_stock_entry(entry_type, items, warehouse=None, remarks=None):
+@idempotent
+def create_stock_entry(entry_type, items, warehouse=None, remarks=None, async_submit=None):
 	"""
 	Stock Entry oluştur (Material Receipt veya Material Issue)
 	
@@ -17,6 +41,7 @@ def create_stock_entry(entry_type, items, warehouse=None, remarks=None):
 		items: [{"item_code": "...", "qty": 10}, ...]
 		warehouse: Depo adı (Material Receipt için to_warehouse, Material Issue için from_warehouse)
 		remarks: Notlar
+		async_submit: 1 ise taslak kaydedilip submit arka planda yapılır; boşsa satır sayısına göre
 	"""
 	user_company = validate_dealer_access()
 	
@@ -53,7 +78,6 @@ def create_stock_entry(entry_type, items, warehouse=None, remarks=None):
 	
 	# Items ekle
 	if isinstance(items, str):
-		import json
 		items = json.loads(items)
 	
 	for item in items:
@@ -80,6 +104,10 @@ def create_stock_entry(entry_type, items, warehouse=None, remarks=None):
 	
 	stock_entry.flags.ignore_permissions = True
 	stock_entry.insert()
+	
+	if should_submit_async(stock_entry, async_submit):
+		return get_queued_response(stock_entry)
+	
 	stock_entry.submit()
 	
 	return {
@@ -90,80 +118,128 @@ def create_stock_entry(entry_type, items, warehouse=None, remarks=None):
 
 
 @frappe.whitelist()
-def get_stock_entries(entry_type=None):
-	"""Stok hareketlerini listele"""
+def get_stock_entries(entry_type=None, page_length=STOCK_ENTRY_PAGE_LENGTH, cursor=None,
+		from_date=None, to_date=None, warehouse=None, status=None):
+	"""
+	Stok hareketlerini listele - tek sorgu, (posting_date, creation) üzerinde keyset sayfalama
+	
+	Args:
+		entry_type: Sadece bu tip (opsiyonel)
+		page_length: Sayfa boyutu (en fazla MAX_STOCK_ENTRY_PAGE_LENGTH)
+		cursor: Önceki sayfanın next_cursor değeri
+		from_date, to_date: posting_date aralığı
+		warehouse: Kaynak veya hedef depo
+		status: "Draft", "Submitted" veya "Cancelled"
+	
+	Returns:
+		dict: {"stock_entries", "receipts", "issues", "next_cursor", "has_more"}
+			receipts / issues aynı sayfanın tipe göre ayrılmış halidir
+	"""
 	user_company = validate_dealer_access()
 	
-	# SQL sorgusu ile warehouse isimlerini ve items preview'ını al
+	page_length = min(cint(page_length) or STOCK_ENTRY_PAGE_LENGTH, MAX_STOCK_ENTRY_PAGE_LENGTH)
+	conditions = ["se.company = %(company)s"]
+	values = {"company": user_company, "limit": page_length + 1}
+	
 	if entry_type:
-		stock_entries = frappe.db.sql("""
-			SELECT 
-				se.name,
-				se.stock_entry_type,
-				se.purpose,
-				se.posting_date,
-				se.docstatus,
-				se.creation,
-				se.remarks,
-				se.from_warehouse,
-				se.to_warehouse,
-				se.modified_by,
-				se.owner,
-				COALESCE(w_from.warehouse_name, w_to.warehouse_name, se.from_warehouse, se.to_warehouse, '-') as warehouse_display,
-				GROUP_CONCAT(DISTINCT sed.item_name ORDER BY sed.idx SEPARATOR ', ') as items_preview
+		conditions.append("se.stock_entry_type = %(entry_type)s")
+		values["entry_type"] = entry_type
+	
+	if from_date:
+		conditions.append("se.posting_date >= %(from_date)s")
+		values["from_date"] = getdate(from_date)
+	
+	if to_date:
+		conditions.append("se.posting_date <= %(to_date)s")
+		values["to_date"] = getdate(to_date)
+	
+	if warehouse:
+		conditions.append("(se.from_warehouse = %(warehouse)s OR se.to_warehouse = %(warehouse)s)")
+		values["warehouse"] = warehouse
+	
+	if status:
+		if status not in STOCK_ENTRY_STATUSES:
+			frappe.throw(_("Geçersiz durum: {0}").format(status))
+		conditions.append("se.docstatus = %(docstatus)s")
+		values["docstatus"] = STOCK_ENTRY_STATUSES[status]
+	
+	if cursor:
+		values["cursor_date"], values["cursor_creation"], values["cursor_name"] = decode_stock_entry_cursor(cursor)
+		conditions.append("""(
+			se.posting_date < %(cursor_date)s
+			OR (se.posting_date = %(cursor_date)s AND se.creation < %(cursor_creation)s)
+			OR (se.posting_date = %(cursor_date)s AND se.creation = %(cursor_creation)s AND se.name < %(cursor_name)s)
+		)""")
+	
+	where_clause = " AND ".join(conditions)
+	
+	# Önce sadece sayfadaki belgeler seçilir, items preview sadece onlar için toplanır
+	stock_entries = frappe.db.sql(f"""
+		SELECT 
+			se.name,
+			se.stock_entry_type,
+			se.purpose,
+			se.posting_date,
+			se.docstatus,
+			se.creation,
+			se.remarks,
+			se.from_warehouse,
+			se.to_warehouse,
+			se.modified_by,
+			se.owner,
+			COALESCE(w_from.warehouse_name, w_to.warehouse_name, se.from_warehouse, se.to_warehouse, '-') as warehouse_display,
+			GROUP_CONCAT(DISTINCT sed.item_name ORDER BY sed.idx SEPARATOR ', ') as items_preview
+		FROM (
+			SELECT *
 			FROM `tabStock Entry` se
-			LEFT JOIN `tabWarehouse` w_from ON w_from.name = se.from_warehouse
-			LEFT JOIN `tabWarehouse` w_to ON w_to.name = se.to_warehouse
-			LEFT JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-			WHERE se.company = %(company)s
-				AND se.stock_entry_type = %(entry_type)s
-			GROUP BY se.name
-			ORDER BY se.posting_date DESC, se.creation DESC
-			LIMIT 100
-		""", {"company": user_company, "entry_type": entry_type}, as_dict=True)
-	else:
-		stock_entries = frappe.db.sql("""
-			SELECT 
-				se.name,
-				se.stock_entry_type,
-				se.purpose,
-				se.posting_date,
-				se.docstatus,
-				se.creation,
-				se.remarks,
-				se.from_warehouse,
-				se.to_warehouse,
-				se.modified_by,
-				se.owner,
-				COALESCE(w_from.warehouse_name, w_to.warehouse_name, se.from_warehouse, se.to_warehouse, '-') as warehouse_display,
-				GROUP_CONCAT(DISTINCT sed.item_name ORDER BY sed.idx SEPARATOR ', ') as items_preview
-			FROM `tabStock Entry` se
-			LEFT JOIN `tabWarehouse` w_from ON w_from.name = se.from_warehouse
-			LEFT JOIN `tabWarehouse` w_to ON w_to.name = se.to_warehouse
-			LEFT JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
-			WHERE se.company = %(company)s
-			GROUP BY se.name
-			ORDER BY se.posting_date DESC, se.creation DESC
-			LIMIT 100
-		""", {"company": user_company}, as_dict=True)
-	
-	# Her entry için modified_by_name ve owner_name ekle
+			WHERE {where_clause}
+			ORDER BY se.posting_date DESC, se.creation DESC, se.name DESC
+			LIMIT %(limit)s
+		) se
+		LEFT JOIN `tabWarehouse` w_from ON w_from.name = se.from_warehouse
+		LEFT JOIN `tabWarehouse` w_to ON w_to.name = se.to_warehouse
+		LEFT JOIN `tabStock Entry Detail` sed ON sed.parent = se.name
+		GROUP BY se.name
+		ORDER BY se.posting_date DESC, se.creation DESC, se.name DESC
+	""", values, as_dict=True)
+	
+	has_more = len(stock_entries) > page_length
+	stock_entries = stock_entries[:page_length]
+	
+	# modified_by_name ve owner_name - tek User sorgusu
+	full_names = get_user_full_names(
+		{entry.owner for entry in stock_entries} | {entry.modified_by for entry in stock_entries}
+	)
 	for entry in stock_entries:
-		if entry.modified_by:
-			entry.modified_by_name = frappe.utils.get_fullname(entry.modified_by)
-		else:
-			entry.modified_by_name = None
-		
-		if entry.owner:
-			entry.owner_name = frappe.utils.get_fullname(entry.owner)
-		else:
-			entry.owner_name = None
+		entry.modified_by_name = full_names.get(entry.modified_by) if entry.modified_by else None
+		entry.owner_name = full_names.get(entry.owner) if entry.owner else None
 	
-	return {"stock_entries": stock_entries}
+	return {
+		"stock_entries": stock_entries,
+		"receipts": [entry for entry in stock_entries if entry.stock_entry_type == "Material Receipt"],
+		"issues": [entry for entry in stock_entries if entry.stock_entry_type == "Material Issue"],
+		"next_cursor": encode_stock_entry_cursor(stock_entries[-1]) if has_more else None,
+		"has_more": has_more
+	}
+
+
+def encode_stock_entry_cursor(entry):
+	"""Sayfanın son belgesinden keyset cursor üret"""
+	return encode_cursor([str(entry.posting_date), str(entry.creation), entry.name])
+
+
+def decode_stock_entry_cursor(cursor):
+	"""Cursor'u (posting_date, creation, name) değerlerine çevir"""
+	key = decode_cursor(cursor, 3)
+	try:
+		return getdate(key[0]), get_datetime(key[1]), key[2]
+	except Exception:
+		frappe.throw(_("Geçersiz cursor"))
 
 
 @frappe.whitelist()
-def create_material_issue(warehouse, items, posting_date=None, remarks=None):
+@idempotent
+def create_material_issue(warehouse, items, posting_date=None, remarks=None, async_submit=None):
 	"""
 	Malzeme çıkışı oluştur - Bayilerin kendi warehouse'larından malzeme çıkışı
 	
@@ -172,6 +248,7 @@ def create_material_issue(warehouse, items, posting_date=None, remarks=None):
 		items: [{"item_code": "...", "qty": 10}, ...]
 		posting_date: İşlem tarihi (opsiyonel, varsayılan: bugün)
 		remarks: Notlar
+		async_submit: 1 ise taslak kaydedilip submit arka planda yapılır; boşsa satır sayısına göre
 	"""
 	user_company = validate_dealer_access()
 	
@@ -189,36 +266,15 @@ def create_material_issue(warehouse, items, posting_date=None, remarks=None):
 	
 	# Items parse et
 	if isinstance(items, str):
-		import json
 		items = json.loads(items)
 	
 	if not items or len(items) == 0:
 		frappe.throw(_("En az bir ürün eklenmelidir"))
 	
-	# Her ürün için stok kontrolü yap
-	for item in items:
-		item_code = item.get("item_code")
-		qty = float(item.get("qty", 0))
-		
-		if not item_code or qty <= 0:
-			frappe.throw(_("Geçersiz ürün veya miktar"))
-		
-		# Mevcut stoku kontrol et
-		bin_data = frappe.db.get_value(
-			"Bin",
-			{"item_code": item_code, "warehouse": warehouse},
-			["actual_qty", "projected_qty"],
-			as_dict=True
-		)
-		
-		if not bin_data:
-			frappe.throw(_("{0} ürünü için {1} deposunda stok bulunmamaktadır").format(item_code, warehouse))
-		
-		available_qty = bin_data.actual_qty or 0
-		if qty > available_qty:
-			frappe.throw(_("{0} ürünü için yeterli stok yok. Mevcut: {1}, İstenen: {2}").format(
-				item_code, available_qty, qty
-			))
+	# Stok kontrolü - aynı ürünün satırları toplanır, Bin satırları submit'e kadar kilitlenir
+	required_qtys = aggregate_item_qtys(items)
+	validate_and_lock_stock(warehouse, required_qtys)
+	stock_uoms = get_stock_uoms(required_qtys)
 	
 	# Stock Entry oluştur
 	stock_entry = frappe.new_doc("Stock Entry")
@@ -236,99 +292,26 @@ def create_material_issue(warehouse, items, posting_date=None, remarks=None):
 		item_code = item.get("item_code")
 		qty = float(item.get("qty", 0))
 		
-		# Item dokümanından UOM al
-		item_doc = frappe.get_doc("Item", item_code)
-		
 		stock_entry.append("items", {
 			"item_code": item_code,
 			"s_warehouse": warehouse,
 			"qty": qty,
-			"uom": item_doc.stock_uom,
+			"uom": stock_uoms.get(item_code),
 			"conversion_factor": 1
 		})
 	
-	# Warehouse account'ını kontrol et ve grup hesap ise alt hesabı bul
-	warehouse_account = wh_doc.account
-	account_changed = False
-	original_account = None
-	
-	if warehouse_account:
-		account_is_group = frappe.db.get_value("Account", warehouse_account, "is_group")
-		if account_is_group:
-			# Alt hesap bul - önce direkt child'ı kontrol et
-			child_account = frappe.db.get_value(
-				"Account",
-				{"parent_account": warehouse_account, "is_group": 0, "company": user_company},
-				"name",
-				order_by="name asc"
-			)
-			
-			# Eğer direkt child yoksa, recursive olarak alt hesap bul
-			if not child_account:
-				def find_child_account(account_name):
-					children = frappe.get_all(
-						"Account",
-						filters={"parent_account": account_name, "company": user_company},
-						fields=["name", "is_group"],
-						order_by="name asc"
-					)
-					for child in children:
-						if not child.is_group:
-							return child.name
-						else:
-							# Recursive olarak alt hesap ara
-							result = find_child_account(child.name)
-							if result:
-								return result
-					return None
-				
-				child_account = find_child_account(warehouse_account)
-			
-			if child_account:
-				# Warehouse'ın account'ını geçici olarak güncelle
-				original_account = warehouse_account
-				wh_doc.account = child_account
-				wh_doc.flags.ignore_permissions = True
-				wh_doc.save()
-				frappe.db.commit()
-				account_changed = True
-				
-				# Warehouse account map cache'ini temizle
-				if hasattr(frappe.flags, 'warehouse_account_map') and frappe.flags.warehouse_account_map:
-					if isinstance(frappe.flags.warehouse_account_map, dict):
-						if user_company in frappe.flags.warehouse_account_map:
-							if isinstance(frappe.flags.warehouse_account_map[user_company], dict):
-								if warehouse in frappe.flags.warehouse_account_map[user_company]:
-									del frappe.flags.warehouse_account_map[user_company][warehouse]
-					# Tüm cache'i temizle
-					frappe.flags.warehouse_account_map = {}
-			else:
-				frappe.throw(_("Warehouse {0} için grup hesap {1} altında grup olmayan bir hesap bulunamadı").format(
-					warehouse, warehouse_account
-				))
+	# Grup stok hesabı varsa yaprak hesap bu istek için kullanılır - Warehouse değiştirilmez
+	use_leaf_stock_account(user_company, warehouse, wh_doc.account)
 	
 	# Stock Entry'yi kaydet ve submit et
 	stock_entry.flags.ignore_permissions = True
 	stock_entry.insert()
 	
-	try:
-		stock_entry.submit()
-	finally:
-		# Submit sonrası warehouse account'ını geri al (başarılı veya başarısız olsun)
-		if account_changed and original_account:
-			wh_doc.account = original_account
-			wh_doc.flags.ignore_permissions = True
-			wh_doc.save()
-			frappe.db.commit()
-			
-			# Cache'i tekrar temizle
-			if hasattr(frappe.flags, 'warehouse_account_map') and frappe.flags.warehouse_account_map:
-				if isinstance(frappe.flags.warehouse_account_map, dict):
-					if user_company in frappe.flags.warehouse_account_map:
-						if isinstance(frappe.flags.warehouse_account_map[user_company], dict):
-							if warehouse in frappe.flags.warehouse_account_map[user_company]:
-								del frappe.flags.warehouse_account_map[user_company][warehouse]
-					frappe.flags.warehouse_account_map = {}
+	# Büyük çıkışlar arka planda submit edilir - iş stoğu kilitleyip yeniden doğrular
+	if should_submit_async(stock_entry, async_submit):
+		return get_queued_response(stock_entry)
+	
+	stock_entry.submit()
 	
 	return {
 		"name": stock_entry.name,
@@ -337,6 +320,98 @@ def create_material_issue(warehouse, items, posting_date=None, remarks=None):
 	}
 
 
+@frappe.whitelist()
+def get_submission_status(job_id):
+	"""
+	Arka planda submit edilen Stock Entry'nin durumunu getir
+	
+	Returns:
+		dict: job_id, stock_entry, status (Queued/Running/Completed/Failed), error
+	"""
+	validate_dealer_access()
+	
+	status = get_cached_submission_status(job_id)
+	if not status or status.get("user") != frappe.session.user:
+		frappe.throw(_("İş bulunamadı"), frappe.DoesNotExistError)
+	
+	return {
+		"job_id": status.get("job_id"),
+		"stock_entry": status.get("stock_entry"),
+		"status": status.get("status"),
+		"error": status.get("error")
+	}
+
+
+@frappe.whitelist()
+@idempotent(fingerprint=get_uploaded_file_digest)
+def import_stock_movements_file(file_url=None, max_items=STOCK_IMPORT_MAX_ITEMS, remarks=None):
+	"""
+	CSV/XLSX dosyasından toplu Material Receipt / Material Issue oluştur
+	
+	Satırlar (depo, hareket tipi, tarih) bazında en fazla max_items satırlık taslak Stock
+	Entry'lere bölünür ve her biri arka planda submit edilir; durum get_submission_status ile
+	job_id üzerinden takip edilir. Hatalı satırlar atlanır ve dosyadaki satır numarasıyla raporlanır.
+	
+	Beklenen kolonlar: Warehouse, Entry Type (Material Receipt / Material Issue), Item Code, Qty,
+	Posting Date (opsiyonel, varsayılan: bugün)
+	
+	Args:
+		file_url: Daha önce yüklenmiş File kaydının adresi (request'te "file" yoksa)
+		max_items: Tek Stock Entry'deki en fazla satır
+		remarks: Oluşturulan Stock Entry'lerin notu
+	
+	Returns:
+		dict: {"message", "queued", "failed", "stock_entries": [{"name", "job_id"}], "rows": [...]}
+	"""
+	# create_material_issue ile aynı yetkilendirme
+	user_company = validate_dealer_access()
+	warehouse_names = {w.name for w in get_user_warehouses(user_company)}
+	
+	max_items = max(1, min(cint(max_items) or STOCK_IMPORT_MAX_ITEMS, 500))
+	file_obj, file_name = get_uploaded_file(file_url)
+	
+	try:
+		rows = import_stock_movements(
+			iter_file_rows(file_obj, file_name),
+			user_company,
+			warehouse_names,
+			max_items=max_items,
+			remarks=remarks
+		)
+	finally:
+		file_obj.close()
+	
+	stock_entries = {}
+	for row in rows:
+		if row.stock_entry:
+			stock_entries[row.stock_entry] = row.job_id
+	
+	queued = sum(1 for row in rows if row.status == "Queued")
+	failed = len(rows) - queued
+	
+	return {
+		"message": _("{0} satır {1} stok hareketiyle kuyruğa alındı, {2} satır hatalı").format(
+			queued, len(stock_entries), failed
+		),
+		"queued": queued,
+		"failed": failed,
+		"stock_entries": [{"name": name, "job_id": job_id} for name, job_id in stock_entries.items()],
+		"rows": rows
+	}
+
+
+def get_queued_response(stock_entry):
+	"""Taslağın submit'ini kuyruğa at ve istemciye iş kimliğini dön"""
+	job_id = enqueue_stock_entry_submit(stock_entry, idempotency_cache_key=get_idempotency_cache_key())
+	
+	return {
+		"name": stock_entry.name,
+		"status": "Queued",
+		"job_id": job_id,
+		"message": _("Stok hareketi kaydedildi, arka planda işleniyor")
+	}
+
+
 @frappe.whitelist()
 def get_stock_entry_for_edit(stock_entry_name):
 	"""
@@ -423,37 +498,16 @@ def update_stock_entry(stock_entry_name, warehouse, items, posting_date=None, re
 	
 	# Items parse et
 	if isinstance(items, str):
-		import json
 		items = json.loads(items)
 	
 	if not items or len(items) == 0:
 		frappe.throw(_("En az bir ürün eklenmelidir"))
 	
-	# Her ürün için stok kontrolü yap (Material Issue için)
+	# Stok kontrolü (Material Issue için) - aynı ürünün satırları toplanır, Bin satırları submit'e kadar kilitlenir
 	if stock_entry.stock_entry_type == "Material Issue":
-		for item in items:
-			item_code = item.get("item_code")
-			qty = float(item.get("qty", 0))
-			
-			if not item_code or qty <= 0:
-				frappe.throw(_("Geçersiz ürün veya miktar"))
-			
-			# Mevcut stoku kontrol et
-			bin_data = frappe.db.get_value(
-				"Bin",
-				{"item_code": item_code, "warehouse": warehouse},
-				["actual_qty", "projected_qty"],
-				as_dict=True
-			)
-			
-			if not bin_data:
-				frappe.throw(_("{0} ürünü için {1} deposunda stok bulunmamaktadır").format(item_code, warehouse))
-			
-			available_qty = bin_data.actual_qty or 0
-			if qty > available_qty:
-				frappe.throw(_("{0} ürünü için yeterli stok yok. Mevcut: {1}, İstenen: {2}").format(
-					item_code, available_qty, qty
-				))
+		validate_and_lock_stock(warehouse, aggregate_item_qtys(items))
+	
+	stock_uoms = get_stock_uoms(item.get("item_code") for item in items if item.get("item_code"))
 	
 	# Belgeyi güncelle
 	stock_entry.from_warehouse = warehouse if stock_entry.stock_entry_type == "Material Issue" else None
@@ -476,13 +530,10 @@ def update_stock_entry(stock_entry_name, warehouse, items, posting_date=None, re
 		if not item_code or qty <= 0:
 			continue
 		
-		# Item dokümanından UOM al
-		item_doc = frappe.get_doc("Item", item_code)
-		
 		item_row = {
 			"item_code": item_code,
 			"qty": qty,
-			"uom": item_doc.stock_uom,
+			"uom": stock_uoms.get(item_code),
 			"conversion_factor": 1
 		}
 		
@@ -496,83 +547,14 @@ def update_stock_entry(stock_entry_name, warehouse, items, posting_date=None, re
 	if not stock_entry.items:
 		frappe.throw(_("En az bir ürün eklenmelidir"))
 	
-	# Warehouse account'ını kontrol et ve grup hesap ise alt hesabı bul (Material Issue için)
-	account_changed = False
-	original_account = None
-	
-	if stock_entry.stock_entry_type == "Material Issue" and wh_doc.account:
-		account_is_group = frappe.db.get_value("Account", wh_doc.account, "is_group")
-		if account_is_group:
-			# Alt hesap bul - önce direkt child'ı kontrol et
-			child_account = frappe.db.get_value(
-				"Account",
-				{"parent_account": wh_doc.account, "is_group": 0, "company": user_company},
-				"name",
-				order_by="name asc"
-			)
-			
-			# Eğer direkt child yoksa, recursive olarak alt hesap bul
-			if not child_account:
-				def find_child_account(account_name):
-					children = frappe.get_all(
-						"Account",
-						filters={"parent_account": account_name, "company": user_company},
-						fields=["name", "is_group"],
-						order_by="name asc"
-					)
-					for child in children:
-						if not child.is_group:
-							return child.name
-						else:
-							# Recursive olarak alt hesap ara
-							result = find_child_account(child.name)
-							if result:
-								return result
-					return None
-				
-				child_account = find_child_account(wh_doc.account)
-			
-			if child_account:
-				# Warehouse'ın account'ını geçici olarak güncelle
-				original_account = wh_doc.account
-				wh_doc.account = child_account
-				wh_doc.flags.ignore_permissions = True
-				wh_doc.save()
-				frappe.db.commit()
-				account_changed = True
-				
-				# Warehouse account map cache'ini temizle
-				if hasattr(frappe.flags, 'warehouse_account_map') and frappe.flags.warehouse_account_map:
-					if isinstance(frappe.flags.warehouse_account_map, dict):
-						if user_company in frappe.flags.warehouse_account_map:
-							if isinstance(frappe.flags.warehouse_account_map[user_company], dict):
-								if warehouse in frappe.flags.warehouse_account_map[user_company]:
-									del frappe.flags.warehouse_account_map[user_company][warehouse]
-					# Tüm cache'i temizle
-					frappe.flags.warehouse_account_map = {}
+	# Grup stok hesabı varsa yaprak hesap bu istek için kullanılır - Warehouse değiştirilmez (Material Issue için)
+	if stock_entry.stock_entry_type == "Material Issue":
+		use_leaf_stock_account(user_company, warehouse, wh_doc.account)
 	
 	# Belgeyi kaydet ve submit et
 	stock_entry.flags.ignore_permissions = True
 	stock_entry.save()
-	
-	try:
-		stock_entry.submit()
-	finally:
-		# Submit sonrası warehouse account'ını geri al (başarılı veya başarısız olsun)
-		if account_changed and original_account:
-			wh_doc.account = original_account
-			wh_doc.flags.ignore_permissions = True
-			wh_doc.save()
-			frappe.db.commit()
-			
-			# Cache'i tekrar temizle
-			if hasattr(frappe.flags, 'warehouse_account_map') and frappe.flags.warehouse_account_map:
-				if isinstance(frappe.flags.warehouse_account_map, dict):
-					if user_company in frappe.flags.warehouse_account_map:
-						if isinstance(frappe.flags.warehouse_account_map[user_company], dict):
-							if warehouse in frappe.flags.warehouse_account_map[user_company]:
-								del frappe.flags.warehouse_account_map[user_company][warehouse]
-					frappe.flags.warehouse_account_map = {}
+	stock_entry.submit()
 	
 	return {
 		"name": stock_entry.name,
@@ -686,7 +668,3 @@ def amend_stock_entry(stock_entry_name):
 		"status": "Draft",
 		"message": _("Belge başarıyla düzeltildi ve düzenlenebilir hale getirildi")
 	}
-
-
-
-
@@ -43,7 +43,7 @@ def get_context(context):
 	# Material Request için özel print format
 	context.print_format = "Material Request Portal"
 
-	# Material Request için özel item bilgileri
+	# Material Request için özel item bilgileri ve resimleri - ürün sayısından bağımsız sorgu sayısı
 	context.doc.items = get_more_items_info(context.doc.items, context.doc.name)
 	
 	# Hedef depo bilgisini belirle
@@ -69,13 +69,6 @@ def get_context(context):
 			# Hiç depo yok
 			context.doc.target_warehouse = None
 			context.doc.target_warehouse_display = "-"
-	
-	# Item resimlerini ekle
-	for item in context.doc.items:
-		item_image = frappe.db.get_value("Item", item.item_code, "image")
-		item.thumbnail = item_image
-		if item_image:
-			item.image_url = frappe.utils.get_url(item_image)
 
 
 def has_material_request_permission(doc):
@@ -104,34 +97,64 @@ def has_material_request_permission(doc):
 
 
 def get_more_items_info(items, material_request):
-	"""Material Request item'larına ek bilgiler ekle"""
+	"""
+	Material Request item'larına ek bilgiler ekle
+	
+	Ürün sayısından bağımsız sabit sayıda sorgu: ürün alanları (is_customer_provided_item, image),
+	açık iş emirleri ve teslim edilen miktarlar ürün listesi üzerinden tek sorguda alınır.
+	"""
 	from frappe.utils import flt
 	
-	for item in items:
-		item.customer_provided = frappe.get_value("Item", item.item_code, "is_customer_provided_item")
-		item.work_orders = frappe.db.sql(
-			"""
-			select
-				wo.name, wo.status, wo_item.consumed_qty
-			from
-				`tabWork Order Item` wo_item, `tabWork Order` wo
-			where
-				wo_item.item_code=%s
-				and wo_item.consumed_qty=0
-				and wo_item.parent=wo.name
-				and wo.status not in ('Completed', 'Cancelled', 'Stopped')
-			order by
-				wo.name asc""",
-			item.item_code,
-			as_dict=1,
+	item_codes = list({item.item_code for item in items if item.item_code})
+	if not item_codes:
+		return items
+	
+	item_details = {
+		row.name: row
+		for row in frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes]},
+			fields=["name", "is_customer_provided_item", "image"]
 		)
-		item.delivered_qty = flt(
-			frappe.db.sql(
-				"""select sum(transfer_qty)
-						from `tabStock Entry Detail` where material_request = %s
-						and item_code = %s and docstatus = 1""",
-				(material_request, item.item_code),
-			)[0][0]
+	}
+	
+	work_orders = {}
+	for row in frappe.db.sql(
+		"""
+		select
+			wo_item.item_code, wo.name, wo.status, wo_item.consumed_qty
+		from
+			`tabWork Order Item` wo_item, `tabWork Order` wo
+		where
+			wo_item.item_code in %(item_codes)s
+			and wo_item.consumed_qty=0
+			and wo_item.parent=wo.name
+			and wo.status not in ('Completed', 'Cancelled', 'Stopped')
+		order by
+			wo.name asc""",
+		{"item_codes": item_codes},
+		as_dict=1,
+	):
+		work_orders.setdefault(row.pop("item_code"), []).append(row)
+	
+	delivered_qtys = dict(
+		frappe.db.sql(
+			"""select item_code, sum(transfer_qty)
+					from `tabStock Entry Detail` where material_request = %(material_request)s
+					and item_code in %(item_codes)s and docstatus = 1
+					group by item_code""",
+			{"material_request": material_request, "item_codes": item_codes},
 		)
+	)
+	
+	for item in items:
+		details = item_details.get(item.item_code) or frappe._dict()
+		item.customer_provided = details.is_customer_provided_item
+		item.work_orders = work_orders.get(item.item_code, [])
+		item.delivered_qty = flt(delivered_qtys.get(item.item_code))
+		
+		# Item resmi
+		item.thumbnail = details.image
+		if details.image:
+			item.image_url = frappe.utils.get_url(details.image)
 	return items
-
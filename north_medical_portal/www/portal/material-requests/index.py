@@ -1,6 +1,8 @@
 """
 Malzeme Talepleri Sayfası
 """
+from urllib.parse import urlencode
+
 import frappe
 from north_medical_portal.utils.helpers import validate_dealer_access
 from north_medical_portal.www.api.material_request import get_material_requests
@@ -14,12 +16,19 @@ def get_context(context):
 	
 	user_company = validate_dealer_access()
 	
-	requests_data = get_material_requests()
+	# Keyset sayfalama (URL parametresinden)
+	requests_data = get_material_requests(cursor=frappe.form_dict.cursor or None)
+	
+	next_page_url = None
+	if requests_data.get("has_more"):
+		next_page_url = "/portal/material-requests?" + urlencode({"cursor": requests_data.get("next_cursor")})
 	
 	context.update({
 		"company": user_company,
 		"material_requests": requests_data.get("material_requests", []),
 		"has_requests": len(requests_data.get("material_requests", [])) > 0,
+		"is_paged": bool(frappe.form_dict.cursor),
+		"next_page_url": next_page_url
 	})
 
 
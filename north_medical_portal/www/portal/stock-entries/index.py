@@ -1,44 +1,44 @@
 """
 Stok Hareketleri Sayfası - Material Receipt/Issue
 """
+from urllib.parse import urlencode
+
 import frappe
 from north_medical_portal.utils.helpers import validate_dealer_access, get_company_warehouses
 from north_medical_portal.www.api.stock_entry import get_stock_entries
 
+STOCK_ENTRY_FILTERS = ("entry_type", "from_date", "to_date", "warehouse", "status")
+
 
 def get_context(context):
 	"""Sayfa context'ini hazırla"""
 	user_company = validate_dealer_access()
 	
-	# Tüm stok hareketleri
-	all_entries = get_stock_entries()
+	# Sunucu tarafı filtreler ve sayfalama (URL parametrelerinden)
+	filters = {key: frappe.form_dict.get(key) or None for key in STOCK_ENTRY_FILTERS}
 	
-	# Material Receipt'ler
-	receipts = get_stock_entries("Material Receipt")
-	
-	# Material Issue'lar
-	issues = get_stock_entries("Material Issue")
+	# Tek sorgu - receipts / issues aynı sayfadan ayrılır
+	entries = get_stock_entries(cursor=frappe.form_dict.cursor or None, **filters)
 	
 	warehouses = get_company_warehouses(user_company)
 	
+	next_page_url = None
+	if entries.get("has_more"):
+		query = {key: value for key, value in filters.items() if value}
+		query["cursor"] = entries.get("next_cursor")
+		next_page_url = "/portal/stock-entries?" + urlencode(query)
+	
 	context.update({
 		"company": user_company,
 		"warehouses": warehouses,
-		"stock_entries": all_entries.get("stock_entries", []),
-		"receipts": receipts.get("stock_entries", []),
-		"issues": issues.get("stock_entries", []),
-		"has_entries": len(all_entries.get("stock_entries", [])) > 0
+		"filters": filters,
+		"stock_entries": entries.get("stock_entries", []),
+		"receipts": entries.get("receipts", []),
+		"issues": entries.get("issues", []),
+		"has_entries": len(entries.get("stock_entries", [])) > 0,
+		"is_paged": bool(frappe.form_dict.cursor),
+		"next_page_url": next_page_url
 	})
 	
 	context.no_cache = 1
 	context.show_sidebar = True
-
-
-
-
-
-
-
-
-
-
@@ -2,9 +2,14 @@
 Stok Durumu Sayfası - Bayilerin anlık stok durumlarını gösterir
 Sadece kullanıcının yetkili olduğu warehouse'ları gösterir
 """
+from urllib.parse import urlencode
+
 import frappe
+from frappe.utils import cint
 from north_medical_portal.utils.helpers import validate_dealer_access
-from north_medical_portal.www.api.stock import get_stock_status
+from north_medical_portal.www.api.stock import get_stock_changes, get_stock_status
+
+STOCK_PAGE_LENGTH = 200
 
 
 def get_context(context):
@@ -12,32 +17,71 @@ def get_context(context):
 	# Permission kontrolü
 	user_company = validate_dealer_access()
 	
-	# API'den stok verilerini al
-	stock_data = get_stock_status()
+	# Sunucu tarafı filtreler ve sayfalama (URL parametrelerinden)
+	filters = {
+		"warehouse": frappe.form_dict.warehouse or None,
+		"item_group": frappe.form_dict.item_group or None,
+		"below_reorder": cint(frappe.form_dict.below_reorder),
+		"txt": frappe.form_dict.txt or None,
+	}
+	
+	# API'den stok verilerini al - sadece bir sayfa
+	stock_data = get_stock_status(
+		page_length=STOCK_PAGE_LENGTH,
+		cursor=frappe.form_dict.cursor or None,
+		**filters
+	)
 	
-	# Item resimlerini ekle
+	# Item resimlerini tek sorguda ekle
 	stock_items = stock_data.get("stock_data", [])
+	item_images = get_item_images([item.get("item_code") for item in stock_items])
 	for item in stock_items:
-		item_image = frappe.db.get_value("Item", item.get("item_code"), "image")
+		item_image = item_images.get(item.get("item_code"))
 		item["thumbnail"] = item_image
 		if item_image:
 			item["image_url"] = frappe.utils.get_url(item_image)
 	
+	# Sayfa bağlantıları filtreleri korur
+	filter_query = {key: value for key, value in filters.items() if value}
+	first_page_url = "/portal/stock" + ("?" + urlencode(filter_query) if filter_query else "")
+	
+	next_page_url = None
+	if stock_data.get("has_more"):
+		next_page_url = "/portal/stock?" + urlencode({**filter_query, "cursor": stock_data.get("next_cursor")})
+	
 	context.update({
 		"company": stock_data.get("company"),
 		"warehouses": stock_data.get("warehouses", []),
 		"stock_data": stock_items,
 		"has_stock_data": len(stock_items) > 0,
-		"can_edit_reorder": stock_data.get("can_edit_reorder", False)
+		"can_edit_reorder": stock_data.get("can_edit_reorder", False),
+		"filters": filters,
+		"has_filters": bool(filter_query),
+		"item_groups": get_item_groups(),
+		"is_paged": bool(frappe.form_dict.cursor),
+		"first_page_url": first_page_url,
+		"next_page_url": next_page_url,
+		# Sayfa açık kaldıkça sadece değişen satırları çekmek için başlangıç token'ı
+		"stock_changes_token": get_stock_changes().get("token")
 	})
 	
 	context.no_cache = 1
 	context.show_sidebar = True
 
 
+def get_item_images(item_codes):
+	"""Item kodu → image eşlemesini tek sorguda döndür"""
+	if not item_codes:
+		return {}
+	
+	return dict(frappe.get_all(
+		"Item",
+		filters={"name": ["in", list(set(item_codes))]},
+		fields=["name", "image"],
+		as_list=True
+	))
 
 
-
-
-
-
+def get_item_groups():
+	"""Filtre için ürün grupları - ağaç sırasıyla"""
+	return frappe.get_all("Item Group", order_by="lft asc", pluck="name")